@@ -6,8 +6,8 @@ from typing import Dict, Any, Optional, List
 class ReasoningRequest(BaseModel):
     """/request_reasoning 엔드포인트의 요청 바디"""
     query: str
-    user_id: Optional[str] = None
-    # (향후 확장) 특정 프레임이나 설정을 함께 전달 가능
+    user_id: Optional[str] = None # 작업 큐의 사용자별 우선순위/대기 한도 기준 (없으면 "anonymous")
+    # 요청별 설정. Drift-Loop 정책 키: drift_ema_decay, drift_threshold, drift_alpha, drift_enabled (drift_policy.py)
     config_overrides: Optional[Dict] = None
 
 class TaskResponse(BaseModel):
@@ -15,6 +15,8 @@ class TaskResponse(BaseModel):
     task_id: str
     status: str = "processing"
     message: str = "Reasoning task has been accepted and is processing in the background."
+    queue_position: Optional[int] = None # 작업 큐 대기 순번 (1부터)
+    estimated_wait_s: Optional[float] = None
 
 class GpePayload(BaseModel):
     """GPE 인코딩된 페이로드의 구조"""
@@ -25,6 +27,8 @@ class GpePayload(BaseModel):
 class ResultResponse(BaseModel):
     """/get_result 엔드포인트의 최종 응답"""
     task_id: str
-    status: str # "processing", "completed", "failed"
+    status: str # "queued", "processing", "completed", "failed"
     result: Optional[Any] # 작업 완료 시, GPE 페이로드 또는 최종 텍스트
     error_message: Optional[str] = None
+    queue_position: Optional[int] = None # status가 "queued"일 때만 채워짐
+    estimated_wait_s: Optional[float] = None
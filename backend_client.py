@@ -0,0 +1,135 @@
+# 파일명: backend_client.py
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import httpx
+except ImportError: # 원격 백엔드 모드에서만 필요
+    httpx = None
+
+from gpe_wire import BINARY_MEDIA_TYPE
+
+RESULT_MODE_SYNC = "sync"           # POST /reason: 추론이 끝날 때까지 한 번의 요청으로 대기
+RESULT_MODE_LONG_POLL = "long_poll" # POST /request_reasoning 후 GET /get_result?wait=...로 완료를 기다림
+
+class BackendHTTPError(RuntimeError):
+    """백엔드 서비스가 오류 상태 코드로 응답했을 때 발생합니다."""
+    def __init__(self, message: str, status_code: int, retry_after_s: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after_s = retry_after_s
+
+class BackendOverloadedError(BackendHTTPError):
+    """백엔드가 부하 차단(429/503)으로 요청을 거부했을 때 발생합니다. 장애가 아니므로 폴백으로 응답합니다."""
+
+OVERLOAD_STATUS_CODES = (429, 503)
+
+class RemoteReasoningBackend:
+    """
+    별도 서비스로 실행 중인 main_backend를 호출하는 비동기 HTTP 클라이언트.
+    - 하나의 httpx.AsyncClient를 공유하여 keep-alive 연결을 재사용합니다. (요청마다 TCP/핸드셰이크 없음)
+    - result_mode="sync"이면 POST /reason 한 번으로 결과를 받고, "long_poll"이면 작업을 제출한 뒤
+      GET /get_result?wait=...로 완료 시점에 바로 결과를 받습니다. 어느 쪽도 고정 간격 폴링 지연이 없습니다.
+    - wire_format="binary"이면 GPE 페이로드를 바이너리 프레임(gpe_bin_v1)으로 받아 JSON/base64 비용을 줄입니다.
+    """
+    def __init__(self, base_url: str, result_mode: str = RESULT_MODE_SYNC, wire_format: str = "binary",
+                 max_connections: int = 64, max_keepalive_connections: int = 32, keepalive_expiry: float = 30.0,
+                 connect_timeout: float = 2.0, long_poll_wait_s: float = 20.0):
+        if httpx is None:
+            raise ImportError("Remote backend mode requires httpx. Install it with `pip install httpx`.")
+        if result_mode not in (RESULT_MODE_SYNC, RESULT_MODE_LONG_POLL):
+            raise ValueError(f"Unknown result_mode: {result_mode}")
+        self.base_url = base_url.rstrip("/")
+        self.result_mode = result_mode
+        self.wire_format = wire_format
+        self.long_poll_wait_s = long_poll_wait_s
+        # 읽기 시간 제한은 두지 않음: 호출 시간 예산은 서킷 브레이커(call_timeout)가 관리
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(None, connect=connect_timeout),
+        )
+        self._counters = {"requests": 0, "errors": 0, "long_polls": 0}
+        self._in_flight = 0
+
+    async def reason(self, query: str, user_id: Optional[str] = None) -> Dict[str, Any] | bytes:
+        """추론을 요청하고 GPE 페이로드(dict 또는 바이너리 프레임 bytes)를 반환합니다."""
+        self._counters["requests"] += 1
+        self._in_flight += 1
+        try:
+            if self.result_mode == RESULT_MODE_SYNC:
+                return await self._reason_sync(query, user_id)
+            return await self._reason_long_poll(query, user_id)
+        except Exception:
+            self._counters["errors"] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    async def health(self) -> Dict[str, Any]:
+        response = await self._client.get("/health")
+        self._raise_for_status(response)
+        return response.json()
+
+    async def wait_until_ready(self, timeout: float = 30.0, interval: float = 0.2):
+        """백엔드의 /health가 응답할 때까지 기다립니다. (로컬 실행/배포 직후용)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if (await self.health()).get("engine_loaded"):
+                    return
+            except (httpx.TransportError, BackendHTTPError):
+                pass
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Backend at {self.base_url} did not become ready within {timeout:.0f}s.")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"base_url": self.base_url, "result_mode": self.result_mode, "in_flight": self._in_flight,
+                **self._counters}
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _reason_sync(self, query: str, user_id: Optional[str]) -> Dict[str, Any] | bytes:
+        accept = BINARY_MEDIA_TYPE if self.wire_format == "binary" else "application/json"
+        response = await self._client.post(
+            "/reason", json={"query": query, "user_id": user_id}, headers={"Accept": accept}
+        )
+        self._raise_for_status(response)
+        if response.headers.get("content-type", "").startswith(BINARY_MEDIA_TYPE):
+            return response.content # GpeDecoder가 바이너리 프레임을 그대로 해석
+        return response.json()
+
+    async def _reason_long_poll(self, query: str, user_id: Optional[str]) -> Dict[str, Any]:
+        response = await self._client.post("/request_reasoning", json={"query": query, "user_id": user_id})
+        self._raise_for_status(response)
+        task_id = response.json()["task_id"]
+        while True:
+            self._counters["long_polls"] += 1
+            response = await self._client.get(f"/get_result/{task_id}", params={"wait": self.long_poll_wait_s})
+            self._raise_for_status(response)
+            task = response.json()
+            if task["status"] == "completed":
+                return task["result"]
+            if task["status"] == "failed":
+                raise BackendHTTPError(f"Backend task {task_id} failed: {task.get('result')}", 500)
+
+    @staticmethod
+    def _raise_for_status(response: "httpx.Response"):
+        if response.status_code < 400:
+            return
+        try:
+            detail = response.json().get("detail", response.text)
+        except (ValueError, AttributeError):
+            detail = response.text
+        try:
+            retry_after = float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            retry_after = None
+        error_class = BackendOverloadedError if response.status_code in OVERLOAD_STATUS_CODES else BackendHTTPError
+        raise error_class(f"Backend responded {response.status_code}: {detail}", response.status_code, retry_after)
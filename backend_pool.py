@@ -0,0 +1,200 @@
+# 파일명: backend_pool.py
+import json
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional
+
+from reasoning_engine import MockHybridReasoningEngine
+
+# 워커 응답 메시지의 첫 바이트 (나머지는 페이로드 또는 오류 메시지)
+_STATUS_OK = 0
+_STATUS_ERROR = 1
+_READY = b"ready"
+
+class WorkerCrashedError(RuntimeError):
+    """작업 처리 중 워커 프로세스가 종료되었을 때 발생합니다. 워커는 백그라운드에서 재시작됩니다."""
+
+class ReasoningWorkerError(RuntimeError):
+    """워커 프로세스 안에서 추론이 예외로 실패했을 때 발생합니다."""
+
+class WorkerTimeoutError(RuntimeError):
+    """워커가 task_timeout 안에 응답하지 않았을 때 발생합니다. 멈춘 워커는 종료 후 재시작됩니다."""
+
+
+def _worker_main(conn: Connection, engine_kwargs: Dict[str, Any]):
+    """
+    워커 프로세스 진입점. 엔진을 한 번만 로드한 뒤 요청을 순서대로 처리합니다.
+    요청: (query, wire_format, codec) 튜플 / 응답: 상태 바이트 + GPE 바이트열 (dict를 피클링하지 않음)
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # 종료는 부모 프로세스가 관리
+    engine = MockHybridReasoningEngine(**engine_kwargs)
+    conn.send_bytes(_READY)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        query, wire_format, codec = request
+        try:
+            if wire_format == "binary":
+                body = engine.reason(query, wire_format="binary", codec=codec)
+            else:
+                body = json.dumps(engine.reason(query), separators=(",", ":")).encode("utf-8")
+            conn.send_bytes(bytes([_STATUS_OK]) + body)
+        except Exception as e:
+            conn.send_bytes(bytes([_STATUS_ERROR]) + f"{type(e).__name__}: {e}".encode("utf-8"))
+
+
+class _WorkerHandle:
+    """워커 프로세스 하나와 부모 쪽 파이프 끝"""
+    __slots__ = ("index", "process", "conn")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: multiprocessing.Process | None = None
+        self.conn: Connection | None = None
+
+
+class ReasoningWorkerPool:
+    """
+    미리 로드된(warm) MockHybridReasoningEngine 인스턴스를 가진 워커 프로세스 풀.
+    GIL을 잡는 CPU 중심 추론을 코어 수만큼 병렬로 실행합니다.
+    - 요청은 유휴 워커에게 배정되며, 모든 워커가 바쁘면 유휴 워커가 생길 때까지 대기합니다.
+    - 결과는 바이트열로 전달되므로 프로세스 경계에서 dict를 다시 피클링하지 않습니다.
+    - 처리 중 종료된 워커는 WorkerCrashedError를 발생시키고 백그라운드에서 자동 재시작됩니다.
+    - task_timeout 안에 응답하지 않는 워커는 멈춘 것으로 보고 WorkerTimeoutError를 발생시킨 뒤
+      종료/재시작합니다. 유휴 워커를 기다리는 시간도 task_timeout으로 제한합니다.
+      (호출 스레드가 무기한 기다리지 않음)
+    reason()의 시그니처는 엔진과 같으므로 asyncio.to_thread(pool.reason, ...)로 그대로 사용할 수 있습니다.
+    """
+    def __init__(self, num_workers: int = 2, engine_kwargs: Optional[Dict[str, Any]] = None,
+                 start_method: str = "spawn", ready_timeout: float = 120.0, task_timeout: Optional[float] = 30.0):
+        self.num_workers = num_workers
+        self.engine_kwargs = engine_kwargs or {}
+        self.ready_timeout = ready_timeout
+        self.task_timeout = task_timeout
+        # torch 등 스레드를 가진 라이브러리와 fork를 섞지 않도록 기본값은 spawn
+        self._context = multiprocessing.get_context(start_method)
+        self._workers: List[_WorkerHandle] = [_WorkerHandle(i) for i in range(num_workers)]
+        self._idle: "queue.Queue[_WorkerHandle]" = queue.Queue()
+        self._closed = False
+        self.restarts = 0
+        self.timeouts = 0
+
+    def start(self) -> "ReasoningWorkerPool":
+        """모든 워커를 동시에 띄우고, 각 워커의 엔진 로드가 끝날 때까지 기다립니다."""
+        for worker in self._workers:
+            self._spawn(worker)
+        for worker in self._workers:
+            self._wait_ready(worker)
+            self._idle.put(worker)
+        print(f"✅ [WorkerPool] 추론 워커 프로세스 {self.num_workers}개 준비 완료.")
+        return self
+
+    def reason(self, query: str, wire_format: str = "binary", codec: Optional[str] = None) -> Dict[str, Any] | memoryview:
+        """
+        유휴 워커에서 추론을 실행합니다. (블로킹)
+        wire_format="binary"이면 gpe_bin_v1 바이트열(memoryview)을, "json"이면 GPE 페이로드 dict를 반환합니다.
+        """
+        if self._closed:
+            raise RuntimeError("Reasoning worker pool is closed.")
+        worker = self._acquire_worker()
+        while not worker.process.is_alive(): # 유휴 상태에서 종료된 워커는 건너뛰고 재시작
+            self._restart_in_background(worker)
+            worker = self._acquire_worker()
+        try:
+            worker.conn.send((query, wire_format, codec))
+            if self.task_timeout is not None and not worker.conn.poll(self.task_timeout):
+                self.timeouts += 1
+                self._restart_in_background(worker) # 멈춘 워커를 종료하고 새로 띄움
+                raise WorkerTimeoutError(
+                    f"Reasoning worker {worker.index} did not respond within {self.task_timeout:.1f}s; restarting it."
+                )
+            message = worker.conn.recv_bytes()
+        except (EOFError, OSError) as e:
+            self._restart_in_background(worker)
+            raise WorkerCrashedError(f"Reasoning worker {worker.index} crashed: {e}") from e
+        self._idle.put(worker)
+
+        status, body = message[0], memoryview(message)[1:]
+        if status == _STATUS_ERROR:
+            raise ReasoningWorkerError(bytes(body).decode("utf-8"))
+        if wire_format == "binary":
+            return body # GpeDecoder는 memoryview를 복사 없이 해석
+        return json.loads(bytes(body))
+
+    def _acquire_worker(self) -> _WorkerHandle:
+        """유휴 워커를 가져옵니다. task_timeout 안에 유휴 워커가 없으면(재시작 실패 등) WorkerTimeoutError."""
+        try:
+            return self._idle.get(timeout=self.task_timeout)
+        except queue.Empty:
+            self.timeouts += 1
+            raise WorkerTimeoutError(
+                f"No idle reasoning worker became available within {self.task_timeout:.1f}s."
+            ) from None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "num_workers": self.num_workers,
+            "idle_workers": self._idle.qsize(),
+            "alive_workers": sum(1 for w in self._workers if w.process is not None and w.process.is_alive()),
+            "restarts": self.restarts,
+            "timeouts": self.timeouts,
+        }
+
+    def close(self, timeout: float = 5.0):
+        """워커에 종료 신호를 보내고, 시간 안에 끝나지 않으면 강제 종료합니다."""
+        self._closed = True
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except Exception:
+                pass
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+
+    def _spawn(self, worker: _WorkerHandle):
+        parent_conn, child_conn = self._context.Pipe(duplex=True)
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn, self.engine_kwargs),
+            name=f"cga-reasoning-worker-{worker.index}", daemon=True
+        )
+        process.start()
+        child_conn.close() # 자식이 죽으면 부모 쪽 recv가 EOFError를 받도록 부모의 자식 끝은 닫음
+        worker.process, worker.conn = process, parent_conn
+
+    def _wait_ready(self, worker: _WorkerHandle):
+        if not worker.conn.poll(self.ready_timeout) or worker.conn.recv_bytes() != _READY:
+            raise RuntimeError(f"Reasoning worker {worker.index} did not become ready.")
+
+    def _restart_in_background(self, worker: _WorkerHandle):
+        def restart():
+            while not self._closed:
+                print(f"🔄 [WorkerPool] 워커 {worker.index} 재시작 중...")
+                if worker.process is not None and worker.process.is_alive():
+                    worker.process.terminate()
+                worker.process.join(1.0)
+                worker.conn.close()
+                try:
+                    self._spawn(worker)
+                    self._wait_ready(worker)
+                except Exception as e:
+                    print(f"❌ [WorkerPool] 워커 {worker.index} 재시작 실패: {e}")
+                    time.sleep(1.0)
+                    continue
+                self.restarts += 1
+                self._idle.put(worker)
+                print(f"✅ [WorkerPool] 워커 {worker.index} 재시작 완료.")
+                return
+        threading.Thread(target=restart, name=f"cga-worker-restart-{worker.index}", daemon=True).start()
@@ -0,0 +1,324 @@
+# 파일명: batch_scheduler.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+import torch
+import torch.nn.functional as F
+
+from dl_are_core import DlAreCore, GenerationSession
+from drift_controller import DriftController
+
+try:
+    from transformers import DynamicCache
+except ImportError:  # 구버전 transformers는 tuple 형식의 캐시만 사용
+    DynamicCache = None
+
+
+def _to_legacy_cache(past_key_values: Any):
+    """모델이 반환한 캐시를 레이어별 (key, value) 튜플로 변환합니다."""
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+def _from_legacy_cache(legacy_cache):
+    """레이어별 (key, value) 튜플을 모델이 받는 캐시 형식으로 변환합니다."""
+    if legacy_cache is not None and DynamicCache is not None and hasattr(DynamicCache, "from_legacy_cache"):
+        return DynamicCache.from_legacy_cache(legacy_cache)
+    return legacy_cache
+
+
+class _BatchRequest:
+    """배치 안에서 디코딩 중인 단일 요청의 상태"""
+    __slots__ = ("prompt_ids", "session", "max_new_tokens", "future", "generated_ids", "seq_length", "finished")
+
+    def __init__(self, prompt_ids: List[int], session: GenerationSession, max_new_tokens: int):
+        self.prompt_ids = prompt_ids
+        self.session = session
+        self.max_new_tokens = max_new_tokens
+        self.future: Future = Future()
+        self.generated_ids: List[int] = []
+        self.seq_length = len(prompt_ids) # 패딩을 제외한 실제 토큰 수
+        self.finished = False
+
+
+class BatchGenerationScheduler:
+    """
+    DlAreCore 하나를 여러 요청이 공유하도록 하는 연속 배칭(continuous batching) 스케줄러.
+    활성 요청들을 왼쪽 패딩 + attention mask로 하나의 배치에 묶어 디코딩하며,
+    요청은 디코드 스텝 사이에 합류하거나 이탈할 수 있습니다.
+
+    - max_batch_size: 한 번에 디코딩하는 최대 시퀀스 수 (처리량 ↑)
+    - max_wait_ms: 배치가 비어 있을 때 첫 요청 이후 추가 요청을 기다리는 최대 시간 (지연 ↓)
+    """
+    def __init__(self, core: DlAreCore, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.core = core
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._pending: deque = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # 활성 배치 상태 (스케줄러 스레드 전용)
+        self._active: List[_BatchRequest] = []
+        self._past_key_values = None # 레이어별 (key, value), shape: [B, H, T, D]
+        self._attention_mask: Optional[torch.Tensor] = None # [B, T]
+        self._next_input_ids: Optional[torch.Tensor] = None # [B, 1]
+        self._drift: Optional[DriftController] = None # 행별 Drift-Loop 상태 (EMA, 정책)
+
+    # --- 공개 API ---
+    def start(self):
+        """백그라운드 디코딩 스레드를 시작합니다."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run_loop, name="dl-are-batch-scheduler", daemon=True)
+        self._thread.start()
+        print(f"✅ Batch Scheduler 시작. (max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms})")
+
+    def stop(self):
+        """스케줄러를 중지하고 남은 요청을 취소합니다."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for request in list(self._pending) + self._active:
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Batch scheduler stopped."))
+        self._pending.clear()
+        self._reset_batch()
+
+    def submit(self, prompt: str, session: GenerationSession, max_new_tokens: int = 50) -> Future:
+        """
+        생성 요청을 큐에 넣고 Future를 반환합니다.
+        결과는 DlAreCore.generate_controlled_text와 같은 형식의 딕셔너리입니다.
+        """
+        prompt_ids = self.core.tokenizer.encode(prompt)
+        if not prompt_ids:
+            raise ValueError("Prompt must contain at least one token.")
+        request = _BatchRequest(prompt_ids, session, max_new_tokens)
+        if max_new_tokens <= 0:
+            request.future.set_result(self._build_result(request))
+            return request.future
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("Batch scheduler is not running. Call start() first.")
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending_requests": len(self._pending), "active_sequences": len(self._active)}
+
+    # --- 스케줄러 루프 ---
+    def _run_loop(self):
+        while True:
+            joiners = self._collect_joiners()
+            if joiners is None:
+                return
+            try:
+                with torch.no_grad():
+                    if joiners:
+                        self._prefill(joiners)
+                    if self._active:
+                        self._decode_step()
+            except Exception as e:
+                print(f"❌ [BatchScheduler] 배치 디코딩 실패: {e}")
+                for request in self._active + joiners:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                self._reset_batch()
+
+    def _collect_joiners(self) -> Optional[List[_BatchRequest]]:
+        """이번 스텝에 합류할 요청을 모읍니다. 스케줄러가 중지되면 None을 반환합니다."""
+        with self._condition:
+            if not self._active:
+                # 배치가 비어 있으면 첫 요청을 기다린 뒤, max_wait_ms 동안 추가 요청을 모음
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return None
+                deadline = time.monotonic() + self.max_wait_ms / 1000
+                while self._running and len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(timeout=remaining)
+            if not self._running:
+                return None
+
+            free_slots = self.max_batch_size - len(self._active)
+            joiners = []
+            while self._pending and len(joiners) < free_slots:
+                joiners.append(self._pending.popleft())
+            return joiners
+
+    def _prefill(self, joiners: List[_BatchRequest]):
+        """새 요청들의 프롬프트를 한 번에 처리하고 첫 토큰을 생성한 뒤 활성 배치에 병합합니다."""
+        device = self.core.device
+        pad_id = self.core.tokenizer.pad_token_id
+        max_len = max(len(r.prompt_ids) for r in joiners)
+
+        input_ids = torch.full((len(joiners), max_len), pad_id, dtype=torch.long, device=device)
+        attention_mask = torch.zeros((len(joiners), max_len), dtype=torch.long, device=device)
+        for i, request in enumerate(joiners):
+            length = len(request.prompt_ids)
+            input_ids[i, max_len - length:] = torch.tensor(request.prompt_ids, device=device)
+            attention_mask[i, max_len - length:] = 1
+        position_ids = (attention_mask.cumsum(dim=-1) - 1).clamp(min=0)
+
+        step_start = time.perf_counter()
+        outputs = self.core.model.transformer(
+            input_ids, attention_mask=attention_mask, position_ids=position_ids, use_cache=True
+        )
+        drift = DriftController.for_sessions([r.session for r in joiners], device)
+        next_tokens = self._apply_drift_loop(joiners, outputs.last_hidden_state[:, -1, :], drift)
+        self._report_step("batch_prefill", len(joiners), step_start)
+
+        self._merge_into_batch(joiners, _to_legacy_cache(outputs.past_key_values), attention_mask, next_tokens, drift)
+        self._retire_finished()
+
+    def _decode_step(self):
+        """활성 배치 전체에 대해 새 토큰 하나씩을 입력하는 증분 디코딩 스텝"""
+        device = self.core.device
+        self._attention_mask = torch.cat(
+            [self._attention_mask, torch.ones((len(self._active), 1), dtype=torch.long, device=device)], dim=1
+        )
+        position_ids = torch.tensor([[r.seq_length] for r in self._active], dtype=torch.long, device=device)
+
+        step_start = time.perf_counter()
+        outputs = self.core.model.transformer(
+            self._next_input_ids,
+            past_key_values=_from_legacy_cache(self._past_key_values),
+            attention_mask=self._attention_mask,
+            position_ids=position_ids,
+            use_cache=True,
+        )
+        self._past_key_values = _to_legacy_cache(outputs.past_key_values)
+        for request in self._active:
+            request.seq_length += 1
+
+        next_tokens = self._apply_drift_loop(self._active, outputs.last_hidden_state[:, -1, :], self._drift)
+        self._report_step("batch_decode", len(self._active), step_start)
+        self._next_input_ids = next_tokens.unsqueeze(1)
+        self._retire_finished()
+
+    def _report_step(self, source: str, batch_size: int, step_start: float):
+        """DlAreCore에 설정된 프로파일링 콜백으로 스텝 정보를 전달합니다."""
+        hook = self.core.profiling_hook
+        if hook is not None:
+            hook({"source": source, "batch_size": batch_size, "duration_s": time.perf_counter() - step_start,
+                  "pending": len(self._pending)})
+
+    def _apply_drift_loop(self, requests: List[_BatchRequest], hidden_states: torch.Tensor,
+                          drift: DriftController) -> torch.Tensor:
+        """
+        행별 기대 벡터/EMA/정책으로 Drift-Loop를 적용하고 다음 토큰([B] 텐서)을 선택합니다.
+        기대 벡터가 없는 세션(폴백 greedy 모드)의 행은 제어 없이 탐욕 선택합니다.
+        토큰과 Drift-Loop 통계는 스텝마다 한 번의 host 동기화로 함께 읽습니다.
+        """
+        hidden_states, similarities, drifted = drift.step(hidden_states)
+        logits = self.core.model.lm_head(hidden_states)
+        next_tokens = torch.argmax(logits, dim=-1)
+
+        eos_token_id = self.core.tokenizer.eos_token_id
+        for request, (token_id, similarity, reprojected, ema) in zip(
+            requests, drift.readout(next_tokens, similarities, drifted)
+        ):
+            if similarity is not None:
+                request.session.ema_similarity = ema
+                request.session.reprojection_count += int(reprojected)
+            request.generated_ids.append(token_id)
+            if token_id == eos_token_id or len(request.generated_ids) >= request.max_new_tokens:
+                request.finished = True
+        return next_tokens
+
+    # --- 배치 캐시 관리 ---
+    def _merge_into_batch(self, joiners: List[_BatchRequest], past_key_values, attention_mask: torch.Tensor,
+                          next_tokens: torch.Tensor, drift: DriftController):
+        """새 요청의 KV 캐시를 기존 배치와 같은 길이로 왼쪽 패딩하여 배치 차원으로 이어 붙입니다."""
+        new_input_ids = next_tokens.unsqueeze(1)
+        if not self._active:
+            self._active = list(joiners)
+            self._past_key_values = past_key_values
+            self._attention_mask = attention_mask
+            self._next_input_ids = new_input_ids
+            self._drift = drift
+            return
+
+        target_len = max(self._attention_mask.shape[1], attention_mask.shape[1])
+        merged_cache = []
+        for (old_k, old_v), (new_k, new_v) in zip(self._past_key_values, past_key_values):
+            merged_cache.append((
+                torch.cat([self._left_pad(old_k, target_len), self._left_pad(new_k, target_len)], dim=0),
+                torch.cat([self._left_pad(old_v, target_len), self._left_pad(new_v, target_len)], dim=0),
+            ))
+        self._past_key_values = tuple(merged_cache)
+        self._attention_mask = torch.cat(
+            [self._left_pad(self._attention_mask, target_len), self._left_pad(attention_mask, target_len)], dim=0
+        )
+        self._next_input_ids = torch.cat([self._next_input_ids, new_input_ids], dim=0)
+        self._drift = self._drift.concat(drift)
+        self._active.extend(joiners)
+
+    @staticmethod
+    def _left_pad(tensor: torch.Tensor, target_len: int) -> torch.Tensor:
+        """시간 축(KV 캐시는 -2, attention mask는 -1)을 target_len까지 왼쪽으로 0 패딩합니다."""
+        time_dim = -2 if tensor.dim() == 4 else -1
+        pad_len = target_len - tensor.shape[time_dim]
+        if pad_len <= 0:
+            return tensor
+        pad = (0, 0, pad_len, 0) if time_dim == -2 else (pad_len, 0)
+        return F.pad(tensor, pad)
+
+    def _retire_finished(self):
+        """완료된 요청의 결과를 전달하고 배치에서 제거합니다."""
+        if not any(r.finished for r in self._active):
+            return
+        keep = [i for i, r in enumerate(self._active) if not r.finished]
+        for request in self._active:
+            if request.finished and not request.future.done():
+                request.future.set_result(self._build_result(request))
+
+        if not keep:
+            self._reset_batch()
+            return
+
+        index = torch.tensor(keep, dtype=torch.long, device=self.core.device)
+        attention_mask = self._attention_mask.index_select(0, index)
+        # 남은 행 모두가 패딩인 앞쪽 열은 잘라내어 캐시 길이를 줄임
+        start = int((attention_mask.sum(dim=0) > 0).nonzero()[0].item())
+        self._attention_mask = attention_mask[:, start:]
+        self._past_key_values = tuple(
+            (k.index_select(0, index)[:, :, start:, :], v.index_select(0, index)[:, :, start:, :])
+            for k, v in self._past_key_values
+        )
+        self._next_input_ids = self._next_input_ids.index_select(0, index)
+        self._drift = self._drift.select(keep, index)
+        self._active = [self._active[i] for i in keep]
+
+    def _reset_batch(self):
+        self._active = []
+        self._past_key_values = None
+        self._attention_mask = None
+        self._next_input_ids = None
+        self._drift = None
+
+    def _build_result(self, request: _BatchRequest) -> Dict:
+        final_text = self.core.tokenizer.decode(request.prompt_ids + request.generated_ids, skip_special_tokens=True)
+        stats = {
+            "total_tokens": len(request.generated_ids),
+            "reprojection_events": request.session.reprojection_count,
+            "final_ema_similarity": request.session.ema_similarity,
+            "drift_control": request.session.expectation_vector is not None
+        }
+        return {"final_text": final_text, "generation_stats": stats}
@@ -0,0 +1,377 @@
+# 파일명: benchmark.py
+"""
+CGA 파이프라인 종단간 벤치마크.
+
+/generate 파이프라인(run_full_pipeline_task)을 프로세스 내에서 설정한 동시성과
+쿼리 길이 분포로 실행하고, 단계별 p50/p95/p99 지연, tokens/sec,
+GPE 인코딩/디코딩 처리량과 압축률을 JSON으로 저장합니다.
+
+사용 예:
+    python benchmark.py --tiny-model --requests 64 --concurrency 8 --output bench.json
+    python benchmark.py --tiny-model --compare bench.json   # 이전 결과와 비교
+    python benchmark.py --tiny-model --config-overrides '{"drift_threshold": 0.9}'   # Drift-Loop 정책 비교
+    python benchmark.py --precision int8 --evg-precision int8 --threads 4   # 저정밀도 처리량 + fp32 대비 정확도
+"""
+import argparse
+import asyncio
+import copy
+import json
+import platform
+import random
+import subprocess
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+
+import main_orchestrator
+from backend_pool import ReasoningWorkerPool
+from batch_scheduler import BatchGenerationScheduler
+from dl_are_core import DlAreCore
+from drift_policy import DriftPolicy
+from evg import ExpectationVectorGenerator
+from evg_cache import ExpectationVectorCache
+from gpe_decoder import GpeDecoder
+from gpe_encoder import GpeEncoder
+from precision import PRECISIONS, configure_threads
+from precision_guard import compare_precision
+from reasoning_engine import MockHybridReasoningEngine
+
+WORDS = (
+    "graph knowledge entity relation causal inference model latent context vector drift "
+    "reasoning evidence hypothesis concept semantic memory retrieval token policy energy"
+).split()
+
+# --- 통계 유틸리티 ---
+def percentile(values: List[float], p: float) -> float:
+    """선형 보간 백분위수 (p: 0~100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+def make_query_sampler(spec: str, seed: int) -> Callable[[], str]:
+    """
+    쿼리 길이(단어 수) 분포 명세를 해석합니다.
+    "fixed:N", "uniform:A:B", "choice:A,B,C", "lognormal:MU:SIGMA"
+    """
+    rng = random.Random(seed)
+    kind, _, args = spec.partition(":")
+    if kind == "fixed":
+        n = int(args)
+        length = lambda: n
+    elif kind == "uniform":
+        a, b = (int(x) for x in args.split(":"))
+        length = lambda: rng.randint(a, b)
+    elif kind == "choice":
+        options = [int(x) for x in args.split(",")]
+        length = lambda: rng.choice(options)
+    elif kind == "lognormal":
+        mu, sigma = (float(x) for x in args.split(":"))
+        length = lambda: max(1, min(256, int(rng.lognormvariate(mu, sigma))))
+    else:
+        raise ValueError(f"Unknown query length distribution: {spec}")
+    return lambda: " ".join(rng.choice(WORDS) for _ in range(length()))
+
+# --- 오프라인용 소형 구성 요소 ---
+class _ByteTokenizer:
+    """GPT-2 토크나이저를 내려받을 수 없을 때 사용하는 바이트 단위 토크나이저 (id 256 = EOS)"""
+    eos_token = "<|endoftext|>"
+    eos_token_id = 256
+    vocab_size = 257
+
+    def __init__(self):
+        self.pad_token = self.eos_token
+        self.pad_token_id = self.eos_token_id
+
+    def encode(self, text: str, return_tensors: Optional[str] = None):
+        ids = list(text.encode("utf-8"))
+        return torch.tensor([ids], dtype=torch.long) if return_tensors == "pt" else ids
+
+    def decode(self, ids, skip_special_tokens: bool = False) -> str:
+        return bytes(int(i) for i in ids if int(i) < 256).decode("utf-8", errors="replace")
+
+class _HashingEncoder:
+    """SentenceTransformer 대신 사용하는 결정적 해싱 임베딩 (바이트 bigram + 고정 랜덤 투영)"""
+    def __init__(self, dim: int, seed: int = 0):
+        generator = torch.Generator().manual_seed(seed)
+        self.dim = dim
+        self.projection = torch.randn(4096, dim, generator=generator)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts: List[str], convert_to_tensor: bool = True, show_progress_bar: bool = False,
+               batch_size: int = 32) -> torch.Tensor:
+        features = torch.zeros(len(texts), 4096)
+        for i, text in enumerate(texts):
+            data = text.encode("utf-8")[:2048] # 실제 인코더처럼 최대 길이에서 절단
+            for a, b in zip(data, data[1:]):
+                features[i, (a * 31 + b) % 4096] += 1
+        return torch.nn.functional.normalize(features @ self.projection, dim=-1)
+
+def build_tiny_frontend(n_layer: int, n_embd: int, seed: int, evg_cache: Optional[ExpectationVectorCache]) -> DlAreCore:
+    """무작위 초기화된 소형 GPT-2와 해싱 인코더로 DlAreCore를 구성합니다. (네트워크 불필요)"""
+    from transformers import GPT2Config, GPT2LMHeadModel, GPT2Tokenizer
+
+    torch.manual_seed(seed)
+    try:
+        tokenizer = GPT2Tokenizer.from_pretrained("gpt2", local_files_only=True)
+    except Exception:
+        tokenizer = _ByteTokenizer()
+    config = GPT2Config(
+        vocab_size=len(tokenizer) if hasattr(tokenizer, "__len__") else tokenizer.vocab_size,
+        n_positions=1024, n_embd=n_embd, n_layer=n_layer, n_head=max(1, n_embd // 64),
+        bos_token_id=tokenizer.eos_token_id, eos_token_id=tokenizer.eos_token_id,
+    )
+    model = GPT2LMHeadModel(config)
+    # Drift-Loop가 은닉 상태와 기대 벡터를 비교하므로 인코더 차원을 n_embd에 맞춤
+    evg = ExpectationVectorGenerator(model_name="hashing-encoder", cache=evg_cache, encoder=_HashingEncoder(n_embd, seed))
+    return DlAreCore(model_name="tiny-random-gpt2", tokenizer=tokenizer, model=model, evg=evg)
+
+def build_low_precision_frontend(reference: DlAreCore, generator_precision: str, evg_precision: str) -> DlAreCore:
+    """기준(fp32) 엔진의 모델/인코더 사본을 지정한 정밀도로 변환한 엔진을 만듭니다."""
+    evg = reference.evg
+    if evg_precision != "fp32":
+        evg = ExpectationVectorGenerator(
+            evg.model_name, evg.device, cache=evg.cache, encoder=copy.deepcopy(evg.encoder), precision=evg_precision
+        )
+    return DlAreCore(
+        model_name=f"{generator_precision} copy", tokenizer=reference.tokenizer, model=copy.deepcopy(reference.model),
+        evg=evg, fallback_mode=reference.fallback_mode, precision=generator_precision
+    )
+
+# --- 벤치마크 본체 ---
+async def run_pipeline_load(num_requests: int, concurrency: int, sample_query: Callable[[], str],
+                            policy: DriftPolicy) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    per_request: List[Dict[str, Any]] = []
+
+    async def one_request(index: int):
+        async with semaphore:
+            query = sample_query()
+            task_id = f"bench_{index:05d}"
+            start = time.perf_counter()
+            await main_orchestrator.run_full_pipeline_task(task_id, query, policy=policy)
+            end_to_end = time.perf_counter() - start
+            record = main_orchestrator.tasks.get(task_id) or {}
+            # 단계별 시간은 오케스트레이터가 작업 레코드에 기록한 값을 사용
+            timings: Dict[str, float] = dict(record.get("timings") or {})
+            timings["end_to_end"] = end_to_end
+            result = record.get("result") if isinstance(record.get("result"), dict) else {}
+            per_request.append({
+                "status": record.get("status"),
+                "query_words": len(query.split()),
+                "tokens": result.get("generation_stats", {}).get("total_tokens", 0),
+                "reprojections": result.get("generation_stats", {}).get("reprojection_events", 0),
+                "timings": timings,
+            })
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_request(i) for i in range(num_requests)))
+    wall_time = time.perf_counter() - wall_start
+
+    stages = sorted({stage for r in per_request for stage in r["timings"]})
+    completed = [r for r in per_request if r["status"] == "completed"]
+    total_tokens = sum(r["tokens"] for r in completed)
+    generation_time = sum(r["timings"].get("generation", 0.0) for r in completed)
+    return {
+        "wall_time_s": wall_time,
+        "requests": num_requests,
+        "completed": len(completed),
+        "failed": num_requests - len(completed),
+        "throughput_rps": len(completed) / wall_time if wall_time > 0 else 0.0,
+        "tokens_total": total_tokens,
+        "tokens_per_sec": total_tokens / wall_time if wall_time > 0 else 0.0,
+        "tokens_per_sec_per_request": total_tokens / generation_time if generation_time > 0 else 0.0,
+        "reprojections_per_token": sum(r["reprojections"] for r in completed) / total_tokens if total_tokens else 0.0,
+        "stage_latency_s": {
+            stage: summarize([r["timings"][stage] for r in per_request if stage in r["timings"]])
+            for stage in stages
+        },
+    }
+
+def run_gpe_benchmark(sample_query: Callable[[], str], num_payloads: int, codec: Optional[str]) -> Dict[str, Any]:
+    """GPE 인코딩/디코딩 처리량과 압축률 (JSON 봉투, 바이너리 형식, 지연 디코딩)"""
+    engine = MockHybridReasoningEngine(load_delay=0.0, reasoning_delay=0.0)
+    encoder, decoder = GpeEncoder(), GpeDecoder()
+    results = [engine.build_reasoning_result(sample_query()) for _ in range(num_payloads)]
+    original_bytes = sum(len(json.dumps(r.get("records", [])).encode("utf-8")) for r in results)
+
+    def timed(fn: Callable[[], Any]) -> float:
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    report: Dict[str, Any] = {"payloads": num_payloads, "original_bytes": original_bytes}
+    json_payloads: List[Dict[str, Any]] = []
+    encode_time = timed(lambda: json_payloads.extend(encoder.encode(r) for r in results))
+    encoded_bytes = sum(len(json.dumps(p, separators=(",", ":")).encode("utf-8")) for p in json_payloads)
+    decode_time = timed(lambda: [decoder.decode(p) for p in json_payloads])
+    lazy_time = timed(lambda: [sum(1 for _ in decoder.decode_lazy(p).records) for p in json_payloads])
+    report["json"] = _codec_report(original_bytes, encoded_bytes, encode_time, decode_time, num_payloads)
+    report["json"]["lazy_decode_mb_per_s"] = original_bytes / 1e6 / lazy_time if lazy_time > 0 else 0.0
+    report["json"]["compression_ratio_p50"] = percentile(
+        [p["metadata"].get("compression_ratio", 0.0) for p in json_payloads], 50
+    )
+
+    binary_payloads: List[bytes] = []
+    encode_time = timed(lambda: binary_payloads.extend(encoder.encode_binary(r, codec=codec) for r in results))
+    decode_time = timed(lambda: [decoder.decode(p) for p in binary_payloads])
+    report["binary"] = _codec_report(
+        original_bytes, sum(len(p) for p in binary_payloads), encode_time, decode_time, num_payloads
+    )
+    return report
+
+def _codec_report(original_bytes: int, encoded_bytes: int, encode_time: float, decode_time: float,
+                  count: int) -> Dict[str, float]:
+    return {
+        "encoded_bytes": encoded_bytes,
+        "compression_ratio": 1 - encoded_bytes / original_bytes if original_bytes else 0.0,
+        "encode_mb_per_s": original_bytes / 1e6 / encode_time if encode_time > 0 else 0.0,
+        "decode_mb_per_s": original_bytes / 1e6 / decode_time if decode_time > 0 else 0.0,
+        "encode_ops_per_s": count / encode_time if encode_time > 0 else 0.0,
+        "decode_ops_per_s": count / decode_time if decode_time > 0 else 0.0,
+    }
+
+def environment_info() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """두 결과의 단계별 p50/p95와 tokens/sec 변화를 출력합니다."""
+    print(f"📊 비교 기준: {baseline.get('environment', {}).get('git_commit')} → {current['environment']['git_commit']}")
+    for stage, stats in current["pipeline"]["stage_latency_s"].items():
+        base = baseline.get("pipeline", {}).get("stage_latency_s", {}).get(stage)
+        if not base:
+            continue
+        for key in ("p50", "p95"):
+            change = (stats[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+            print(f"   {stage:>18} {key}: {base[key]*1000:9.1f}ms → {stats[key]*1000:9.1f}ms ({change:+.1f}%)")
+    base_tps = baseline.get("pipeline", {}).get("tokens_per_sec", 0.0)
+    tps = current["pipeline"]["tokens_per_sec"]
+    print(f"   {'tokens/sec':>18}: {base_tps:9.1f} → {tps:9.1f}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="CGA pipeline benchmark")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--query-length", default="uniform:3:20", help="fixed:N | uniform:A:B | choice:A,B | lognormal:MU:SIGMA")
+    parser.add_argument("--backend-delay", type=float, default=1.5, help="모의 백엔드 추론 시간(초)")
+    parser.add_argument("--backend-workers", type=int, default=0, help="0보다 크면 추론 워커 프로세스 풀 사용")
+    parser.add_argument("--tiny-model", action="store_true", help="무작위 초기화 소형 GPT-2 사용 (오프라인)")
+    parser.add_argument("--tiny-layers", type=int, default=2)
+    parser.add_argument("--tiny-embd", type=int, default=128)
+    parser.add_argument("--max-batch-size", type=int, default=main_orchestrator.GENERATION_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=main_orchestrator.GENERATION_MAX_WAIT_MS)
+    parser.add_argument("--config-overrides", type=json.loads, default=None,
+                        help='요청 config_overrides JSON (예: \'{"drift_threshold": 0.9, "drift_alpha": 0.2}\')')
+    parser.add_argument("--result-cache", action="store_true",
+                        help="쿼리 결과 캐시 사용 (기본: 꺼짐. 켜면 반복 표본 쿼리가 캐시 적중으로 측정됨, 동시 요청 합치기는 항상 유지)")
+    parser.add_argument("--gpe-payloads", type=int, default=200)
+    parser.add_argument("--codec", default=None, help="바이너리 GPE 코덱 (기본: 사용 가능한 가장 빠른 코덱)")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--precision", choices=PRECISIONS, default="fp32", help="생성 모델 정밀도")
+    parser.add_argument("--evg-precision", choices=PRECISIONS, default="fp32", help="EVG 인코더 정밀도")
+    parser.add_argument("--guard-tokens", type=int, default=20, help="정확도 점검 시 표본당 생성 토큰 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    if args.threads:
+        configure_threads(args.threads)
+
+    print("🚀 벤치마크 구성 요소 로드 중...")
+    if args.backend_workers > 0:
+        main_orchestrator.glassbox_backend = ReasoningWorkerPool(
+            args.backend_workers, engine_kwargs={"load_delay": 0.0, "reasoning_delay": args.backend_delay}
+        ).start()
+    else:
+        main_orchestrator.glassbox_backend = MockHybridReasoningEngine(load_delay=0.0, reasoning_delay=args.backend_delay)
+    evg_cache = ExpectationVectorCache()
+    if args.tiny_model:
+        frontend = build_tiny_frontend(args.tiny_layers, args.tiny_embd, args.seed, evg_cache)
+    else:
+        frontend = DlAreCore(model_name="gpt2", evg_cache=evg_cache)
+    precision_report = None
+    if args.precision != "fp32" or args.evg_precision != "fp32":
+        # fp32 엔진을 기준으로 정확도 손실을 측정한 뒤 저정밀도 엔진으로 부하를 실행
+        reference = frontend
+        frontend = build_low_precision_frontend(reference, args.precision, args.evg_precision)
+        precision_report = compare_precision(reference, frontend, max_new_tokens=args.guard_tokens)
+        del reference
+        print(f"🔹 정확도 점검: cosine(min)={precision_report['expectation_cosine']['min']:.4f}, "
+              f"token agreement={precision_report['token_agreement']['mean']:.3f}, passed={precision_report['passed']}")
+    main_orchestrator.dl_are_frontend = frontend
+    main_orchestrator.generation_scheduler = BatchGenerationScheduler(
+        frontend, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms
+    )
+    main_orchestrator.generation_scheduler.start()
+    if not args.result_cache: # 반복 쿼리가 캐시 적중으로 측정되어 지연이 낮게 보이지 않도록 기본은 끔
+        main_orchestrator.gpe_cache.max_entries = 0
+        main_orchestrator.result_cache.max_entries = 0
+
+    try:
+        print(f"🔹 파이프라인 부하: {args.requests} requests, concurrency={args.concurrency}, "
+              f"result cache={'on' if args.result_cache else 'off'}")
+        pipeline = asyncio.run(
+            run_pipeline_load(args.requests, args.concurrency, make_query_sampler(args.query_length, args.seed),
+                              DriftPolicy.from_overrides(args.config_overrides))
+        )
+    finally:
+        main_orchestrator.generation_scheduler.stop()
+        if isinstance(main_orchestrator.glassbox_backend, ReasoningWorkerPool):
+            main_orchestrator.glassbox_backend.close()
+
+    print(f"🔹 GPE 인코딩/디코딩: {args.gpe_payloads} payloads")
+    gpe = run_gpe_benchmark(make_query_sampler(args.query_length, args.seed + 1), args.gpe_payloads, args.codec)
+
+    report = {
+        "environment": environment_info(),
+        "config": vars(args),
+        "pipeline": pipeline,
+        "gpe": gpe,
+        "evg_cache": evg_cache.stats(),
+        "precision": precision_report,
+        "result_cache": {"gpe": main_orchestrator.gpe_cache.stats(), "result": main_orchestrator.result_cache.stats()},
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for stage, stats in pipeline["stage_latency_s"].items():
+        print(f"   {stage:>18}: p50={stats['p50']*1000:.1f}ms p95={stats['p95']*1000:.1f}ms p99={stats['p99']*1000:.1f}ms")
+    print(f"   tokens/sec={pipeline['tokens_per_sec']:.1f}, completed={pipeline['completed']}/{pipeline['requests']}")
+    print(f"✅ 결과 저장: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare_reports(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# 파일명: circuit_breaker.py
+import asyncio
+import functools
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreakerOpenError(Exception):
+    """브레이커가 열려 있어 호출을 시도하지 않고 즉시 거부했을 때 발생합니다."""
+
+class CallTimeoutError(Exception):
+    """호출이 시간 예산(call_timeout)을 넘겼을 때 발생합니다. 실패로 집계됩니다."""
+
+
+class CircuitBreaker:
+    """
+    asyncio용 서킷 브레이커.
+    - 최근 window_size번의 호출 결과를 롤링 윈도우로 유지하고, 실패(예외, 시간 초과,
+      slow_call_threshold를 넘긴 느린 호출)가 failure_threshold번 이상이면 브레이커를 엽니다.
+    - 열린 동안에는 호출하지 않고 즉시 CircuitBreakerOpenError를 발생시킵니다.
+    - recovery_timeout이 지나면 half-open 상태에서 한 번의 시험 호출만 허용하고,
+      성공하면 닫고 실패하면 다시 엽니다.
+    - hedge_quantile을 지정하면, 호출이 최근 성공 지연의 해당 분위수(예: p95)를 넘길 때
+      같은 호출을 한 번 더 보내 먼저 성공한 결과를 사용합니다.
+    - ignored_exceptions에 속하는 예외(대상 서비스의 부하 차단 응답 등)는 그대로 전파하되 실패로 집계하지 않습니다.
+    데코레이터(@breaker) 또는 await breaker.call(func, ...)로 사용합니다.
+    """
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30.0, window_size: int = 20,
+                 call_timeout: Optional[float] = None, slow_call_threshold: Optional[float] = None,
+                 hedge_quantile: Optional[float] = None, hedge_min_samples: int = 20, latency_window: int = 200,
+                 ignored_exceptions: Tuple[type, ...] = ()):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.call_timeout = call_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.ignored_exceptions = ignored_exceptions
+
+        self.state = CLOSED
+        self._window: Deque[bool] = deque(maxlen=window_size) # True = 성공
+        self._latencies: Deque[float] = deque(maxlen=latency_window) # 성공 호출 지연(초)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._counters = {"calls": 0, "failures": 0, "timeouts": 0, "rejected": 0, "hedges": 0, "hedge_wins": 0,
+                          "ignored": 0}
+
+    def __call__(self, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await self.call(func, *args, **kwargs)
+        wrapper.breaker = self
+        return wrapper
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        probe = self._before_call()
+        self._counters["calls"] += 1
+        start = time.perf_counter()
+        recorded = False
+        try:
+            try:
+                if self.call_timeout is None:
+                    result = await self._run(func, args, kwargs, hedge=not probe)
+                else:
+                    result = await asyncio.wait_for(self._run(func, args, kwargs, hedge=not probe), self.call_timeout)
+            except asyncio.TimeoutError:
+                # 주의: asyncio.to_thread로 실행 중인 작업은 취소되지 않고 스레드에서 끝까지 실행됨
+                self._counters["timeouts"] += 1
+                recorded = self._record(False, probe)
+                raise CallTimeoutError(f"Backend call exceeded the {self.call_timeout:.1f}s budget.") from None
+            except self.ignored_exceptions:
+                self._counters["ignored"] += 1 # 실패로 집계하지 않음 (시험 호출이었다면 다음 호출이 다시 시험)
+                raise
+            except Exception:
+                recorded = self._record(False, probe)
+                raise
+            latency = time.perf_counter() - start
+            slow = self.slow_call_threshold is not None and latency > self.slow_call_threshold
+            if not slow:
+                self._latencies.append(latency)
+            recorded = self._record(not slow, probe)
+            return result
+        finally:
+            if probe and not recorded: # 시험 호출이 취소됨 -> 다음 호출이 다시 시험
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "window_failures": sum(1 for ok in self._window if not ok),
+            "window_size": len(self._window),
+            "latency_p95_s": self._latency_quantile(0.95),
+            **self._counters,
+        }
+
+    def _before_call(self) -> bool:
+        """호출 가능 여부를 판단합니다. half-open 시험 호출이면 True를 반환합니다."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                self._counters["rejected"] += 1
+                raise CircuitBreakerOpenError("Circuit breaker is open.")
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self._counters["rejected"] += 1
+                raise CircuitBreakerOpenError("Circuit breaker is half-open; a probe call is in flight.")
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def _record(self, success: bool, probe: bool) -> bool:
+        if not success:
+            self._counters["failures"] += 1
+        if probe:
+            self._probe_in_flight = False
+            if success:
+                self.state = CLOSED
+                self._window.clear()
+                print("✅ [CircuitBreaker] 시험 호출 성공. 브레이커를 닫습니다.")
+            else:
+                self._open()
+            return True
+        self._window.append(success)
+        if self.state == CLOSED and sum(1 for ok in self._window if not ok) >= self.failure_threshold:
+            self._open()
+        return True
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        print(f"🚨 [CircuitBreaker] 브레이커가 열렸습니다. {self.recovery_timeout:g}초 후 시험 호출을 허용합니다.")
+
+    def _latency_quantile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_quantile is None or len(self._latencies) < self.hedge_min_samples:
+            return None
+        return self._latency_quantile(self.hedge_quantile)
+
+    async def _run(self, func: Callable[..., Awaitable[Any]], args: Tuple[Any, ...], kwargs: Dict[str, Any],
+                   hedge: bool) -> Any:
+        delay = self._hedge_delay() if hedge else None
+        if delay is None:
+            return await func(*args, **kwargs)
+
+        primary = asyncio.ensure_future(func(*args, **kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            # 지연 분위수를 넘김 -> 같은 호출을 한 번 더 보내 먼저 성공한 결과를 사용
+            self._counters["hedges"] += 1
+            secondary = asyncio.ensure_future(func(*args, **kwargs))
+            pending = {primary, secondary}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self._counters["hedge_wins"] += 1
+                        return task.result()
+            return primary.result() # 둘 다 실패 -> 원래 호출의 예외를 전파
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,111 @@
+# 파일명: component_loader.py
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+class ComponentNotReadyError(RuntimeError):
+    """아직 로드되지 않았거나 로드에 실패한 구성 요소를 사용하려 할 때 발생합니다."""
+
+
+class _Component:
+    __slots__ = ("name", "loader", "depends_on", "state", "value", "error", "load_seconds", "done")
+
+    def __init__(self, name: str, loader: Callable[..., Any], depends_on: Sequence[str]):
+        self.name = name
+        self.loader = loader
+        self.depends_on = tuple(depends_on)
+        self.state = PENDING
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.done = threading.Event()
+
+
+class ComponentLoader:
+    """
+    서비스 구성 요소(모델, 엔진, 스케줄러 등)를 백그라운드 스레드에서 병렬로 로드합니다.
+    각 구성 요소는 자신의 스레드에서 의존 대상이 준비되기를 기다린 뒤 로드되며,
+    로더 함수는 depends_on 순서대로 의존 구성 요소의 값을 인자로 받습니다.
+    의존 대상이 실패하면 해당 구성 요소도 실패로 표시됩니다.
+    """
+    def __init__(self):
+        self._components: Dict[str, _Component] = {}
+        self._started = False
+
+    def register(self, name: str, loader: Callable[..., Any], depends_on: Sequence[str] = ()):
+        if self._started:
+            raise RuntimeError("Cannot register components after start().")
+        self._components[name] = _Component(name, loader, depends_on)
+
+    def start(self):
+        """모든 구성 요소의 로드를 시작하고 즉시 반환합니다."""
+        if self._started:
+            return
+        for component in self._components.values():
+            missing = [dep for dep in component.depends_on if dep not in self._components]
+            if missing:
+                raise ValueError(f"Component '{component.name}' depends on unknown components: {missing}")
+        self._started = True
+        for component in self._components.values():
+            threading.Thread(
+                target=self._load, args=(component,), name=f"cga-load-{component.name}", daemon=True
+            ).start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """모든 구성 요소의 로드가 끝날 때까지(성공 또는 실패) 기다립니다. 시간 안에 끝나면 True."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for component in self._components.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not component.done.wait(remaining):
+                return False
+        return True
+
+    def get(self, name: str) -> Any:
+        component = self._components[name]
+        if component.state != READY:
+            raise ComponentNotReadyError(f"Component '{name}' is {component.state}.")
+        return component.value
+
+    def is_ready(self, name: Optional[str] = None) -> bool:
+        if name is not None:
+            return self._components[name].state == READY
+        return bool(self._components) and all(c.state == READY for c in self._components.values())
+
+    def not_ready(self) -> List[str]:
+        return [name for name, c in self._components.items() if c.state != READY]
+
+    def has_failures(self) -> bool:
+        return any(c.state == FAILED for c in self._components.values())
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """구성 요소별 상태 (/health 응답용)"""
+        return {
+            name: {"state": c.state, "load_seconds": c.load_seconds, "error": c.error}
+            for name, c in self._components.items()
+        }
+
+    def _load(self, component: _Component):
+        try:
+            for dep in component.depends_on:
+                self._components[dep].done.wait()
+            failed = [dep for dep in component.depends_on if self._components[dep].state != READY]
+            if failed:
+                raise ComponentNotReadyError(f"dependencies failed: {failed}")
+
+            component.state = LOADING
+            start = time.perf_counter()
+            component.value = component.loader(*(self._components[dep].value for dep in component.depends_on))
+            component.load_seconds = time.perf_counter() - start
+            component.state = READY
+            print(f"✅ [Startup] '{component.name}' 로드 완료 ({component.load_seconds:.2f}s)")
+        except Exception as e:
+            component.error = f"{type(e).__name__}: {e}"
+            component.state = FAILED
+            print(f"❌ [Startup] '{component.name}' 로드 실패: {e}")
+        finally:
+            component.done.set()
@@ -1,75 +1,271 @@
 # 파일명: dl_are_core.py
+import os
+import time
 import torch
-import torch.nn.functional as F
-from transformers import GPT2Tokenizer, GPT2LMHeadModel
-from typing import Tuple, Dict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING: # transformers는 실제로 모델을 내려받을 때만 import (서비스 시작 시간 단축)
+    from transformers import GPT2LMHeadModel
 
 from gpe_decoder import GpeDecoder
 from evg import ExpectationVectorGenerator
+from evg_cache import ExpectationVectorCache
+from drift_controller import DriftController
+from drift_policy import DEFAULT_DRIFT_POLICY, DriftPolicy
+from precision import FP32, apply_precision
+
+INITIAL_EMA_SIMILARITY = 0.98 # EMA 초기값
+
+# 폴백 페이로드(fallback_v1.0) 처리 방식
+#   "greedy": 기대 벡터를 만들지 않고 Drift-Loop 없이 탐욕 디코딩 (부하 상황에서 가장 저렴)
+#   "embed" : raw_context를 결론처럼 임베딩하여 Drift-Loop를 그대로 적용
+FALLBACK_MODE = "greedy"
+
+def is_fallback_payload(gpe_payload: Any) -> bool:
+    return isinstance(gpe_payload, dict) and str(gpe_payload.get("payload_type", "")).startswith("fallback")
+
+def load_generator_model(model_name: str = "gpt2", snapshot_path: Optional[str] = None) -> Tuple[Any, "GPT2LMHeadModel"]:
+    """
+    생성 모델의 (tokenizer, model)을 로드합니다.
+    snapshot_path에 같은 model_name의 스냅샷이 있으면 from_pretrained 대신 스냅샷을 mmap으로 바로 읽고,
+    없으면 사전 학습 가중치를 로드한 뒤 다음 시작을 위해 스냅샷을 저장합니다.
+    """
+    if snapshot_path and os.path.exists(snapshot_path):
+        try:
+            snapshot = _load_snapshot(snapshot_path)
+            if snapshot.get("model_name") == model_name:
+                print(f"✅ 모델 스냅샷에서 로드: {snapshot_path}")
+                return snapshot["tokenizer"], snapshot["model"]
+            print(f"WARNING: 스냅샷의 모델({snapshot.get('model_name')})이 {model_name}과 달라 무시합니다.")
+        except Exception as e:
+            print(f"WARNING: 모델 스냅샷 로드 실패 ({e}). 사전 학습 가중치에서 로드합니다.")
+
+    from transformers import GPT2Tokenizer, GPT2LMHeadModel
+    tokenizer = GPT2Tokenizer.from_pretrained(model_name)
+    model = GPT2LMHeadModel.from_pretrained(model_name)
+    if snapshot_path:
+        save_generator_snapshot(tokenizer, model, snapshot_path, model_name)
+    return tokenizer, model
+
+def save_generator_snapshot(tokenizer: Any, model: "GPT2LMHeadModel", path: str, model_name: str = "gpt2"):
+    """tokenizer와 model 객체를 하나의 파일로 직렬화합니다. (임시 파일에 쓴 뒤 교체)"""
+    tmp_path = f"{path}.tmp"
+    torch.save({"model_name": model_name, "tokenizer": tokenizer, "model": model}, tmp_path)
+    os.replace(tmp_path, path)
+    print(f"💾 모델 스냅샷 저장: {path}")
+
+def _load_snapshot(path: str) -> Dict[str, Any]:
+    try:
+        # mmap: 가중치를 한 번에 복사하지 않고 페이지 단위로 읽음
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=False)
+    except TypeError: # 구버전 torch는 mmap/weights_only 인자를 지원하지 않음
+        return torch.load(path, map_location="cpu")
+
+class GenerationSession:
+    """
+    단일 생성 요청의 Drift-Loop 제어 상태.
+    요청마다 별도의 세션을 사용하므로 하나의 DlAreCore를 여러 스레드가 동시에 공유할 수 있습니다.
+    expectation_vector가 None이면(폴백 greedy 모드) Drift-Loop 없이 탐욕 디코딩합니다.
+    policy는 요청별 Drift-Loop 파라미터(EMA 계수, 임계값, alpha)입니다.
+    """
+    __slots__ = ("expectation_vector", "ema_similarity", "reprojection_count", "policy")
+
+    def __init__(self, expectation_vector: torch.Tensor | None, ema_similarity: float = INITIAL_EMA_SIMILARITY,
+                 policy: DriftPolicy | None = None):
+        self.expectation_vector = expectation_vector
+        self.ema_similarity = ema_similarity
+        self.reprojection_count = 0
+        self.policy = policy or DEFAULT_DRIFT_POLICY
 
 class DlAreCore:
     """
     GPE 페이로드를 받아 기대 벡터를 설정하고,
     DRIFT-LOOP를 통해 환각을 제어하며 텍스트를 생성합니다.
     """
-    def __init__(self, model_name: str = "gpt2", device: str = 'cpu'):
+    def __init__(self, model_name: str = "gpt2", device: str = 'cpu',
+                 evg_cache: ExpectationVectorCache | None = None,
+                 tokenizer=None, model: "GPT2LMHeadModel | None" = None,
+                 evg: ExpectationVectorGenerator | None = None, fallback_mode: str = FALLBACK_MODE,
+                 precision: str = FP32):
+        # tokenizer/model/evg를 직접 넘기면 사전 학습 가중치를 내려받지 않음 (벤치마크용 소형 모델 등)
+        # precision: 생성 모델 정밀도 "fp32"/"int8"/"bf16". 넘겨받은 model은 제자리에서 변환됨 (precision.py)
+        if fallback_mode not in ("greedy", "embed"):
+            raise ValueError(f"Unknown fallback_mode: {fallback_mode}")
         self.device = device
-        self.tokenizer = GPT2Tokenizer.from_pretrained(model_name)
-        self.model = GPT2LMHeadModel.from_pretrained(model_name).to(self.device)
+        self.fallback_mode = fallback_mode
+        if tokenizer is None or model is None:
+            loaded_tokenizer, loaded_model = load_generator_model(model_name)
+            tokenizer = tokenizer if tokenizer is not None else loaded_tokenizer
+            model = model if model is not None else loaded_model
+        self.tokenizer = tokenizer
+        self.model = model.to(self.device)
         self.model.eval()
+        self.model, self.precision = apply_precision(self.model, precision, self.device)
         if self.tokenizer.pad_token is None:
             self.tokenizer.pad_token = self.tokenizer.eos_token
         
         self.gpe_decoder = GpeDecoder()
-        self.evg = ExpectationVectorGenerator(device=self.device)
+        self.evg = evg if evg is not None else ExpectationVectorGenerator(device=self.device, cache=evg_cache)
         
+        # initialize_with_gpe()로 설정되는 기본 상태 (세션 없이 호출하는 단일 요청용)
         self.expectation_vector: torch.Tensor | None = None
-        self.ema_similarity = 0.98 # EMA 초기값
+        self.ema_similarity = INITIAL_EMA_SIMILARITY
+
+        # 디코드 스텝마다 호출되는 프로파일링 콜백 (step, batch_size, duration_s 등을 담은 딕셔너리를 받음)
+        self.profiling_hook: Optional[Callable[[Dict[str, Any]], None]] = None
         
-        print(f"✅ DL-ARE Core 초기화 완료. Generator: {model_name}")
+        print(f"✅ DL-ARE Core 초기화 완료. Generator: {model_name} ({self.precision})")
+
+    def build_expectation_vector(self, gpe_payload: Dict) -> torch.Tensor:
+        """GPE 페이로드를 디코딩하여 기대 벡터(E)를 만듭니다. 인스턴스 상태는 변경하지 않습니다."""
+        # 지연 디코딩: 레코드는 EVG가 순회할 때 점진적으로 압축 해제/파싱됨
+        decoded_data = self.gpe_decoder.decode_lazy(gpe_payload)
+        return self.evg.build_from_decoded_gpe(decoded_data)
 
     def initialize_with_gpe(self, gpe_payload: Dict):
         """GPE 페이로드로 제어기를 초기화합니다."""
-        decoded_data = self.gpe_decoder.decode(gpe_payload)
-        self.expectation_vector = self.evg.build_from_decoded_gpe(decoded_data)
-        self.ema_similarity = 0.98 # 새 컨텍스트마다 EMA 리셋
+        self.expectation_vector = self.build_expectation_vector(gpe_payload)
+        self.ema_similarity = INITIAL_EMA_SIMILARITY # 새 컨텍스트마다 EMA 리셋
         print(f"🔹 DL-ARE가 새로운 기대 벡터(E)로 초기화되었습니다. (Norm: {self.expectation_vector.norm().item():.2f})")
 
+    def create_session(self, gpe_payload: Dict, timings: Dict[str, float] | None = None,
+                       policy: DriftPolicy | None = None) -> GenerationSession:
+        """
+        GPE 페이로드로부터 요청 전용 생성 세션을 만듭니다. 인스턴스 상태는 변경하지 않습니다.
+        timings가 주어지면 'gpe_decode'와 'evg_embedding' 소요 시간(초)을 기록합니다.
+        (지연 디코딩이므로 레코드 파싱 비용은 'evg_embedding'에 포함됨)
+        policy.enabled가 False이거나, fallback_mode가 "greedy"일 때 폴백 페이로드가 들어오면
+        디코딩/임베딩 없이 제어 없는 세션을 반환합니다.
+        """
+        if self._skip_expectation(gpe_payload, policy):
+            return GenerationSession(None, policy=policy)
+        start = time.perf_counter()
+        decoded_data = self.gpe_decoder.decode_lazy(gpe_payload)
+        decoded_at = time.perf_counter()
+        expectation_vector = self.evg.build_from_decoded_gpe(decoded_data)
+        if timings is not None:
+            timings["gpe_decode"] = decoded_at - start
+            timings["evg_embedding"] = time.perf_counter() - decoded_at
+        return GenerationSession(expectation_vector, policy=policy)
+
+    def create_sessions(self, gpe_payloads: List[Dict],
+                        policies: List[DriftPolicy | None] | None = None) -> List[GenerationSession]:
+        """여러 GPE 페이로드의 세션을 한 번의 EVG 인코더 호출로 만듭니다."""
+        policies = policies or [None] * len(gpe_payloads)
+        skip = [self._skip_expectation(payload, policy) for payload, policy in zip(gpe_payloads, policies)]
+        decoded_list = [self.gpe_decoder.decode_lazy(p) for p, s in zip(gpe_payloads, skip) if not s]
+        vectors = iter(self.evg.build_many(decoded_list))
+        return [GenerationSession(None if s else next(vectors), policy=policy) for s, policy in zip(skip, policies)]
+
+    def _skip_expectation(self, gpe_payload: Dict, policy: DriftPolicy | None) -> bool:
+        """기대 벡터를 만들 필요가 없는지 (Drift-Loop 비활성 정책 또는 greedy 폴백)"""
+        if policy is not None and not policy.enabled:
+            return True
+        return self.fallback_mode == "greedy" and is_fallback_payload(gpe_payload)
+
     @torch.no_grad()
-    def generate_controlled_text(self, prompt: str, max_new_tokens: int = 50) -> Dict:
-        if self.expectation_vector is None:
-            raise ValueError("DL-ARE is not initialized. Call initialize_with_gpe() first.")
+    def generate_controlled_text(self, prompt: str, max_new_tokens: int = 50, use_cache: bool = True,
+                                 session: GenerationSession | None = None) -> Dict:
+        """
+        Drift-Loop 제어 하에 텍스트를 생성합니다.
+        use_cache=True이면 past_key_values를 재사용하여 매 스텝 새 토큰 하나만 모델에 입력합니다.
+        session이 주어지면 인스턴스 상태 대신 세션의 기대 벡터/EMA를 사용합니다.
+        """
+        result = None
+        for event in self.stream_controlled_text(prompt, max_new_tokens, use_cache, session, emit_tokens=False):
+            result = event
+        return {"final_text": result["final_text"], "generation_stats": result["generation_stats"]}
 
-        input_ids = self.tokenizer.encode(prompt, return_tensors='pt').to(self.device)
-        generated_ids = list(input_ids[0].cpu().numpy())
-        reprojection_count = 0
+    @torch.no_grad()
+    def stream_controlled_text(self, prompt: str, max_new_tokens: int = 50, use_cache: bool = True,
+                               session: GenerationSession | None = None,
+                               emit_tokens: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        generate_controlled_text의 제너레이터 버전.
+        매 스텝 {"type": "token", ...} 이벤트(토큰 텍스트와 Drift-Loop 통계)를 내보내고,
+        마지막에 최종 결과를 담은 {"type": "done", ...} 이벤트를 내보냅니다.
+        """
+        legacy_state = session is None
+        if legacy_state:
+            if self.expectation_vector is None:
+                raise ValueError("DL-ARE is not initialized. Call initialize_with_gpe() first.")
+            session = GenerationSession(self.expectation_vector, self.ema_similarity)
+
+        prompt_ids = self.tokenizer.encode(prompt)
+        new_ids: List[int] = []
+        emitted_text = ""
+        for step, (token_id, similarity, reprojected) in enumerate(
+            self._decode_steps(prompt_ids, max_new_tokens, use_cache, session)
+        ):
+            new_ids.append(token_id)
+            if not emit_tokens:
+                continue
+            # 바이트 단위 BPE 토큰이 완성된 문자를 이룰 때까지 텍스트 방출을 미룸
+            text = self.tokenizer.decode(new_ids, skip_special_tokens=True)
+            delta = "" if text.endswith("\ufffd") else text[len(emitted_text):]
+            if delta:
+                emitted_text = text
+            yield {
+                "type": "token",
+                "step": step,
+                "token_id": token_id,
+                "text": delta,
+                "similarity": similarity,
+                "ema_similarity": session.ema_similarity,
+                "reprojected": reprojected,
+            }
 
-        for _ in range(max_new_tokens):
-            outputs = self.model(input_ids, output_hidden_states=True)
-            hidden_state = outputs.hidden_states[-1][:, -1, :]
+        if legacy_state:
+            self.ema_similarity = session.ema_similarity
+        final_text = self.tokenizer.decode(prompt_ids + new_ids, skip_special_tokens=True)
+        stats = {
+            "total_tokens": len(new_ids),
+            "reprojection_events": session.reprojection_count,
+            "final_ema_similarity": session.ema_similarity,
+            "drift_control": session.expectation_vector is not None
+        }
+        yield {"type": "done", "final_text": final_text, "generation_stats": stats}
+
+    def _decode_steps(self, prompt_ids: List[int], max_new_tokens: int, use_cache: bool,
+                      session: GenerationSession) -> Iterator[Tuple[int, Optional[float], bool]]:
+        """
+        Drift-Loop 디코딩 루프. 매 스텝 (토큰 id, 코사인 유사도, 재투영 여부)를 내보냅니다.
+        세션에 기대 벡터가 없으면 유사도 계산 없이 탐욕 디코딩합니다. (유사도는 None)
+        Drift-Loop 연산은 DriftController가 텐서로 수행하며, host 동기화는 스텝마다 한 번입니다.
+        """
+        controller = DriftController.for_sessions([session], self.device)
+        input_ids = torch.tensor([prompt_ids], dtype=torch.long, device=self.device)
+        past_key_values = None
+        hook = self.profiling_hook
+
+        for step in range(max_new_tokens):
+            step_start = time.perf_counter() if hook is not None else 0.0
+            if use_cache:
+                # 증분 디코딩: 캐시된 K/V에 새 토큰만 이어 붙이고 마지막 레이어 은닉 상태만 계산
+                outputs = self.model.transformer(input_ids, past_key_values=past_key_values, use_cache=True)
+                past_key_values = outputs.past_key_values
+                hidden_state = outputs.last_hidden_state[:, -1, :]
+            else:
+                outputs = self.model(input_ids, output_hidden_states=True)
+                hidden_state = outputs.hidden_states[-1][:, -1, :]
             
             # Drift-Loop
-            similarity = F.cosine_similarity(hidden_state, self.expectation_vector.unsqueeze(0)).item()
-            self.ema_similarity = 0.8 * self.ema_similarity + 0.2 * similarity # EMA 업데이트
-            
-            if self.ema_similarity < 0.97: # 드리프트 감지
-                reprojection_count += 1
-                alpha = 0.1
-                hidden_state = (1 - alpha) * hidden_state + alpha * self.expectation_vector.unsqueeze(0)
-            
+            hidden_state, similarities, drifted = controller.step(hidden_state)
             logits = self.model.lm_head(hidden_state)
             next_token_id = torch.argmax(logits, dim=-1)
+            token_id, similarity, reprojected, ema = controller.readout(next_token_id, similarities, drifted)[0]
+            if similarity is not None:
+                session.ema_similarity = ema
+                session.reprojection_count += int(reprojected)
+            if hook is not None:
+                hook({"source": "single", "step": step, "batch_size": 1,
+                      "duration_s": time.perf_counter() - step_start, "reprojections": int(reprojected)})
             
-            generated_ids.append(next_token_id.item())
-            input_ids = torch.cat([input_ids, next_token_id.unsqueeze(0)], dim=1)
+            yield token_id, similarity, reprojected
+            if use_cache:
+                input_ids = next_token_id.unsqueeze(0)
+            else:
+                input_ids = torch.cat([input_ids, next_token_id.unsqueeze(0)], dim=1)
 
-            if next_token_id.item() == self.tokenizer.eos_token_id:
+            if token_id == self.tokenizer.eos_token_id:
                 break
-        
-        final_text = self.tokenizer.decode(generated_ids, skip_special_tokens=True)
-        stats = {
-            "total_tokens": len(generated_ids) - input_ids.shape[1],
-            "reprojection_events": reprojection_count,
-            "final_ema_similarity": self.ema_similarity
-        }
-        return {"final_text": final_text, "generation_stats": stats}
@@ -0,0 +1,114 @@
+# 파일명: drift_controller.py
+from typing import Any, List, Optional, Sequence, Tuple
+
+import torch
+import torch.nn.functional as F
+
+
+class DriftController:
+    """
+    배치 행별 Drift-Loop 상태를 텐서로 유지하는 제어기.
+    유사도 계산, EMA 갱신, 임계값 판정, 재투영(blending)을 모두 행 단위 텐서 연산으로 수행하고,
+    스텝 결과(다음 토큰, 유사도, 재투영 여부, EMA)는 readout()에서 한 번의 host 동기화로 꺼냅니다.
+    기대 벡터가 없는 행(폴백 greedy, drift_enabled=False)은 제어하지 않습니다.
+    EMA/감쇠/임계값은 float64로 유지하여 파이썬 float로 계산하던 단일 요청 경로와 같은 값과 임계값 판정을 냅니다.
+    """
+    def __init__(self, expectation_vectors: Optional[torch.Tensor], ema: torch.Tensor, decay: torch.Tensor,
+                 threshold: torch.Tensor, alpha: torch.Tensor, controlled: torch.Tensor, controlled_rows: List[bool]):
+        self.expectation_vectors = expectation_vectors # [B, D] (제어하지 않는 행은 0), 모든 행이 비제어면 None
+        self.ema = ema                 # [B]
+        self.decay = decay             # [B]
+        self.threshold = threshold     # [B]
+        self.alpha = alpha             # [B]
+        self.controlled = controlled   # [B] bool
+        self.controlled_rows = controlled_rows # controlled의 파이썬 사본 (동기화 없이 사용)
+
+    @classmethod
+    def for_sessions(cls, sessions: Sequence[Any], device: Any) -> "DriftController":
+        """GenerationSession 목록(각각 expectation_vector, ema_similarity, policy 보유)으로 제어기를 만듭니다."""
+        controlled_rows = [s.expectation_vector is not None and s.policy.enabled for s in sessions]
+        vectors = [s.expectation_vector for s, c in zip(sessions, controlled_rows) if c]
+        expectation_vectors = None
+        if vectors:
+            dim = vectors[0].shape[-1]
+            expectation_vectors = torch.stack([
+                s.expectation_vector.to(device) if c else torch.zeros(dim, device=device)
+                for s, c in zip(sessions, controlled_rows)
+            ])
+
+        def column(values: List[float]) -> torch.Tensor:
+            return torch.tensor(values, dtype=torch.float64, device=device)
+        return cls(
+            expectation_vectors,
+            column([s.ema_similarity for s in sessions]),
+            column([s.policy.ema_decay for s in sessions]),
+            column([s.policy.threshold for s in sessions]),
+            column([s.policy.alpha for s in sessions]),
+            torch.tensor(controlled_rows, dtype=torch.bool, device=device),
+            controlled_rows,
+        )
+
+    def step(self, hidden_states: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        [B, D] 은닉 상태에 Drift-Loop를 적용합니다. host 동기화 없이
+        (보정된 은닉 상태, 유사도 [B], 재투영 여부 [B])를 반환합니다.
+        """
+        if self.expectation_vectors is None:
+            zeros = torch.zeros(hidden_states.shape[0], dtype=torch.float64, device=hidden_states.device)
+            return hidden_states, zeros, zeros.bool()
+        if self.expectation_vectors.dtype != hidden_states.dtype:
+            self.expectation_vectors = self.expectation_vectors.to(hidden_states.dtype)
+
+        # 유사도는 모델 정밀도로 계산하고 (.item()과 같은 값) EMA 갱신은 float64로 수행
+        similarity = F.cosine_similarity(hidden_states, self.expectation_vectors, dim=-1).double()
+        updated_ema = self.decay * self.ema + (1 - self.decay) * similarity # EMA 업데이트
+        self.ema = torch.where(self.controlled, updated_ema, self.ema)
+
+        reprojected = self.controlled & (self.ema < self.threshold) # 드리프트 감지
+        alpha = self.alpha.to(hidden_states.dtype).unsqueeze(1)
+        blended = hidden_states + alpha * (self.expectation_vectors - hidden_states) # (1 - a) * h + a * E
+        return torch.where(reprojected.unsqueeze(1), blended, hidden_states), similarity, reprojected
+
+    def readout(self, next_tokens: torch.Tensor, similarity: torch.Tensor,
+                reprojected: torch.Tensor) -> List[Tuple[int, Optional[float], bool, float]]:
+        """행별 (토큰 id, 유사도, 재투영 여부, EMA)를 한 번의 host 동기화로 꺼냅니다. (비제어 행의 유사도는 None)"""
+        # 토큰 id는 float64로 정확히 표현되므로 하나의 텐서로 묶어 한 번에 복사
+        packed = torch.stack([next_tokens.double(), similarity, reprojected.double(), self.ema]).tolist()
+        return [
+            (int(token), similarity if controlled else None, bool(drifted), ema)
+            for token, similarity, drifted, ema, controlled in zip(*packed, self.controlled_rows)
+        ]
+
+    def concat(self, other: "DriftController") -> "DriftController":
+        """배치에 합류한 행들의 제어 상태를 뒤에 이어 붙입니다."""
+        vectors = None
+        if self.expectation_vectors is not None or other.expectation_vectors is not None:
+            dim = (self.expectation_vectors if self.expectation_vectors is not None else other.expectation_vectors).shape[-1]
+            vectors = torch.cat([self._vectors_or_zeros(dim, other), other._vectors_or_zeros(dim, self)], dim=0)
+        return DriftController(
+            vectors,
+            torch.cat([self.ema, other.ema]),
+            torch.cat([self.decay, other.decay]),
+            torch.cat([self.threshold, other.threshold]),
+            torch.cat([self.alpha, other.alpha]),
+            torch.cat([self.controlled, other.controlled]),
+            self.controlled_rows + other.controlled_rows,
+        )
+
+    def select(self, keep: List[int], index: torch.Tensor) -> "DriftController":
+        """배치에 남는 행(keep, 같은 순서의 index 텐서)만 남깁니다."""
+        return DriftController(
+            None if self.expectation_vectors is None else self.expectation_vectors.index_select(0, index),
+            self.ema.index_select(0, index),
+            self.decay.index_select(0, index),
+            self.threshold.index_select(0, index),
+            self.alpha.index_select(0, index),
+            self.controlled.index_select(0, index),
+            [self.controlled_rows[i] for i in keep],
+        )
+
+    def _vectors_or_zeros(self, dim: int, reference: "DriftController") -> torch.Tensor:
+        if self.expectation_vectors is not None:
+            return self.expectation_vectors
+        like = reference.expectation_vectors
+        return torch.zeros((len(self.controlled_rows), dim), dtype=like.dtype, device=like.device)
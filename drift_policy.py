@@ -0,0 +1,56 @@
+# 파일명: drift_policy.py
+import math
+from typing import Any, Dict, Optional, Tuple
+
+class DriftPolicy:
+    """
+    Drift-Loop 제어 파라미터.
+    - ema_decay: EMA 갱신 계수 (ema = decay * ema + (1 - decay) * similarity)
+    - threshold: EMA가 이 값보다 작으면 드리프트로 보고 재투영
+    - alpha: 재투영 시 기대 벡터 쪽으로 섞는 비율
+    - enabled: False이면 기대 벡터 없이 탐욕 디코딩 (품질 대신 속도)
+    """
+    __slots__ = ("ema_decay", "threshold", "alpha", "enabled")
+
+    # ReasoningRequest.config_overrides 키 -> 속성 이름
+    OVERRIDE_KEYS = {
+        "drift_ema_decay": "ema_decay",
+        "drift_threshold": "threshold",
+        "drift_alpha": "alpha",
+        "drift_enabled": "enabled",
+    }
+
+    def __init__(self, ema_decay: float = 0.8, threshold: float = 0.97, alpha: float = 0.1, enabled: bool = True):
+        if not 0.0 <= ema_decay < 1.0:
+            raise ValueError("drift_ema_decay must be in [0, 1).")
+        if not -1.0 <= threshold <= 1.0:
+            raise ValueError("drift_threshold must be in [-1, 1].")
+        if not 0.0 <= alpha <= 1.0:
+            raise ValueError("drift_alpha must be in [0, 1].")
+        self.ema_decay = float(ema_decay)
+        self.threshold = float(threshold)
+        self.alpha = float(alpha)
+        self.enabled = bool(enabled)
+
+    @classmethod
+    def from_overrides(cls, overrides: Optional[Dict[str, Any]], base: Optional["DriftPolicy"] = None) -> "DriftPolicy":
+        """config_overrides의 drift_* 키로 기본 정책을 덮어쓴 새 정책을 만듭니다. 잘못된 값은 ValueError."""
+        base = base or DEFAULT_DRIFT_POLICY
+        values = base.to_dict()
+        for key, attr in cls.OVERRIDE_KEYS.items():
+            if overrides and key in overrides:
+                values[attr] = overrides[key]
+        for attr in ("ema_decay", "threshold", "alpha"):
+            if isinstance(values[attr], bool) or not isinstance(values[attr], (int, float)) or not math.isfinite(values[attr]):
+                raise ValueError(f"drift_{attr} must be a finite number.")
+        if not isinstance(values["enabled"], bool):
+            raise ValueError("drift_enabled must be a boolean.")
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ema_decay": self.ema_decay, "threshold": self.threshold, "alpha": self.alpha, "enabled": self.enabled}
+
+    def cache_key(self) -> Tuple[float, float, float, bool]:
+        return (self.ema_decay, self.threshold, self.alpha, self.enabled)
+
+DEFAULT_DRIFT_POLICY = DriftPolicy()
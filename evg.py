@@ -1,48 +1,174 @@
 # 파일명: evg.py
 import torch
-from sentence_transformers import SentenceTransformer
-from typing import Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from evg_cache import ExpectationVectorCache
+from precision import FP32, apply_precision
+
+CONCLUSION_WEIGHT = 0.6 # 결론에 높은 가중치
+RECORDS_WEIGHT = 0.4
+# 레코드 요약: 중복 레코드는 한 번만 인코딩하고 (횟수 x relevance)로 가중합니다.
+# 고유 레코드를 인코더 최대 길이 안에 들어가는 청크로 묶어 인코딩하므로, 잘려 나가는 레코드 없이
+# 인코딩 비용은 페이로드 크기가 아니라 고유 내용의 양에 비례합니다.
+RECORD_CHUNK_MAX_CHARS = 800 # MiniLM 최대 길이(256 토큰) 안에 들어가는 청크 길이
+MAX_UNIQUE_RECORDS = 512     # 고유 레코드가 이보다 많으면 가중치 상위만 사용 (인코딩 비용 상한)
+# 기대 벡터 계산 방식이 바뀌면 올려서 이전 캐시(디스크 포함) 항목을 사용하지 않게 함
+EXPECTATION_VECTOR_VERSION = 2
+
+def summarize_records(records: Iterable[Dict[str, Any]], max_unique: int = MAX_UNIQUE_RECORDS) -> List[Tuple[str, float]]:
+    """
+    레코드를 한 번 순회하며 같은 내용의 레코드를 합쳐 (텍스트, 가중치) 목록을 만듭니다. (가중치 내림차순)
+    텍스트는 relevance를 제외한 값들이고, 가중치는 같은 텍스트를 가진 레코드들의 relevance 합
+    (relevance가 없으면 1)이므로 반복된 레코드일수록, 관련도가 높을수록 커집니다.
+    """
+    weights: Dict[str, float] = {}
+    for record in records or []:
+        text = " ".join(str(v) for k, v in record.items() if k != "relevance")
+        if not text:
+            continue
+        relevance = record.get("relevance", 1.0)
+        if isinstance(relevance, bool) or not isinstance(relevance, (int, float)):
+            relevance = 1.0
+        weights[text] = weights.get(text, 0.0) + max(0.0, float(relevance))
+    return sorted(weights.items(), key=lambda item: item[1], reverse=True)[:max_unique]
+
+def chunk_records(summary: List[Tuple[str, float]], max_chars: int = RECORD_CHUNK_MAX_CHARS) -> List[Tuple[str, float]]:
+    """요약된 레코드를 max_chars 이하의 청크로 묶어 (청크 텍스트, 가중치 합) 목록을 반환합니다."""
+    chunks: List[Tuple[str, float]] = []
+    texts: List[str] = []
+    length = 0
+    weight = 0.0
+    for text, record_weight in summary:
+        if texts and length + len(text) + 2 > max_chars:
+            chunks.append(("; ".join(texts), weight))
+            texts, length, weight = [], 0, 0.0
+        texts.append(text)
+        length += len(text) + 2
+        weight += record_weight
+    if texts:
+        chunks.append(("; ".join(texts), weight))
+    return chunks
 
 class ExpectationVectorGenerator:
     """
     구조적 컨텍스트를 단일한 '기대 벡터(E)'로 변환합니다.
     """
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', device: str = 'cpu'):
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', device: str = 'cpu',
+                 cache: Optional[ExpectationVectorCache] = None, encoder=None, precision: str = FP32):
+        # encoder: SentenceTransformer와 같은 encode()/get_sentence_embedding_dimension()을 가진 객체 (선택)
+        # precision: "fp32"(기본), "int8"(동적 양자화), "bf16" (precision.py)
         self.device = device
-        self.encoder = SentenceTransformer(model_name, device=self.device)
-        print(f"✅ EVG 초기화 완료. Encoder: {model_name}")
+        self.model_name = model_name
+        if encoder is None:
+            # sentence_transformers는 import 비용이 크므로 인코더를 직접 로드할 때만 import
+            from sentence_transformers import SentenceTransformer
+            encoder = SentenceTransformer(model_name, device=self.device)
+        self.encoder, self.precision = apply_precision(encoder, precision, self.device)
+        # 정밀도마다 벡터가 조금씩 다르므로 캐시 항목을 섞지 않음
+        self.cache_namespace = f"{model_name}/v{EXPECTATION_VECTOR_VERSION}"
+        if self.precision != FP32:
+            self.cache_namespace += f"@{self.precision}"
+        self.cache = cache
+        print(f"✅ EVG 초기화 완료. Encoder: {model_name} ({self.precision})")
 
     @torch.no_grad()
     def build_from_decoded_gpe(self, decoded_data: Dict) -> torch.Tensor:
         """
-        디코딩된 GPE 데이터로부터 기대 벡터를 생성합니다.
+        디코딩된 GPE 데이터(딕셔너리 또는 LazyDecodedGpe)로부터 기대 벡터를 생성합니다.
+        캐시가 설정된 경우 같은 내용의 데이터는 인코더를 다시 실행하지 않습니다.
         """
-        conclusion = decoded_data.get("conclusion", "")
-        records = decoded_data.get("records", [])
+        if self.cache is None:
+            return self._encode_decoded_gpe(decoded_data)
 
-        # 텍스트 정보 수집
-        all_texts = []
-        weights = []
+        key = ExpectationVectorCache.make_key(decoded_data, namespace=self.cache_namespace)
+        cached_vector = self.cache.get(key, device=self.device)
+        if cached_vector is not None:
+            return cached_vector
+        vector = self._encode_decoded_gpe(decoded_data)
+        self.cache.put(key, vector)
+        return vector
 
-        if conclusion:
-            all_texts.append(conclusion)
-            weights.append(0.6) # 결론에 높은 가중치
+    @torch.no_grad()
+    def build_many(self, decoded_list: List[Dict], batch_size: int = 64) -> List[torch.Tensor]:
+        """
+        여러 디코딩된 GPE 데이터의 기대 벡터를 한 번의 인코더 호출로 생성합니다.
+        모든 결론/레코드 텍스트를 길이순으로 정렬해 함께 인코딩한 뒤 페이로드별 가중 평균으로 되돌립니다.
+        """
+        results: List[Optional[torch.Tensor]] = [None] * len(decoded_list)
+        keys: List[Optional[str]] = [None] * len(decoded_list)
 
-        if records:
-            # 모든 레코드의 텍스트 값을 추출하여 하나의 문자열로 결합
-            record_texts = " ".join([str(v) for r in records for v in r.values()])
-            all_texts.append(record_texts)
-            weights.append(0.4)
-            
+        # 1. 캐시 조회 및 페이로드별 텍스트 수집 (동일 텍스트는 한 번만 인코딩)
+        unique_texts: Dict[str, int] = {}
+        plans = [] # (payload index, text indices, weights)
+        for i, decoded_data in enumerate(decoded_list):
+            if self.cache is not None:
+                keys[i] = ExpectationVectorCache.make_key(decoded_data, namespace=self.cache_namespace)
+                cached_vector = self.cache.get(keys[i], device=self.device)
+                if cached_vector is not None:
+                    results[i] = cached_vector
+                    continue
+            texts, weights = self._collect_texts(decoded_data)
+            if not texts:
+                results[i] = torch.zeros(self.encoder.get_sentence_embedding_dimension(), device=self.device)
+                continue
+            indices = [unique_texts.setdefault(text, len(unique_texts)) for text in texts]
+            plans.append((i, indices, weights))
+
+        # 2. 길이순 정렬 후 단일 인코딩 호출
+        if unique_texts:
+            texts = list(unique_texts)
+            order = sorted(range(len(texts)), key=lambda j: len(texts[j]), reverse=True)
+            sorted_embeddings = self.encoder.encode(
+                [texts[j] for j in order], batch_size=batch_size, convert_to_tensor=True, show_progress_bar=False
+            )
+            embeddings = torch.empty_like(sorted_embeddings)
+            embeddings[torch.tensor(order, device=sorted_embeddings.device)] = sorted_embeddings
+
+            # 3. 페이로드별 가중 평균으로 분배
+            for i, indices, weights in plans:
+                results[i] = self._pool(embeddings[indices], weights)
+                if self.cache is not None:
+                    self.cache.put(keys[i], results[i])
+
+        return results
+
+    def _encode_decoded_gpe(self, decoded_data: Dict) -> torch.Tensor:
+        all_texts, weights = self._collect_texts(decoded_data)
         if not all_texts:
             return torch.zeros(self.encoder.get_sentence_embedding_dimension(), device=self.device)
 
         # 임베딩 및 가중 평균
         embeddings = self.encoder.encode(all_texts, convert_to_tensor=True, show_progress_bar=False)
-        
+        return self._pool(embeddings, weights)
+
+    def _collect_texts(self, decoded_data: Dict) -> Tuple[List[str], List[float]]:
+        """
+        디코딩된 데이터에서 인코딩할 텍스트와 가중치를 수집합니다.
+        결론과 레코드 청크들의 가중치 합이 각각 CONCLUSION_WEIGHT, RECORDS_WEIGHT가 됩니다.
+        """
+        conclusion = decoded_data.get("conclusion", "")
+        # records는 리스트 또는 지연 디코딩 뷰의 이터레이터일 수 있음 (한 번만 순회)
+        chunks = chunk_records(summarize_records(decoded_data.get("records", [])))
+
+        all_texts = []
+        weights = []
+        if conclusion:
+            all_texts.append(conclusion)
+            weights.append(CONCLUSION_WEIGHT)
+
+        total_weight = sum(weight for _, weight in chunks)
+        for text, weight in chunks:
+            all_texts.append(text)
+            # relevance가 모두 0이면 청크를 균등하게 반영
+            weights.append(RECORDS_WEIGHT * (weight / total_weight if total_weight > 0 else 1 / len(chunks)))
+        return all_texts, weights
+
+    def _pool(self, embeddings: torch.Tensor, weights: List[float]) -> torch.Tensor:
+        """임베딩들을 가중 평균한 뒤 L2 정규화합니다. (저정밀도 인코더의 출력도 fp32 벡터로 반환)"""
+        embeddings = embeddings.float()
         if len(weights) == embeddings.shape[0]:
             weighted_avg_vector = torch.nn.functional.normalize(
-                torch.sum(embeddings * torch.tensor(weights, device=self.device).view(-1, 1), dim=0),
+                torch.sum(embeddings * torch.tensor(weights, device=embeddings.device).view(-1, 1), dim=0),
                 p=2, dim=0
             )
         else: # 가중치 적용이 어려운 경우 단순 평균
@@ -0,0 +1,279 @@
+# 파일명: evg_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+
+try:
+    import fcntl
+except ImportError: # Windows: 경로별 프로세스 잠금 없이 동작 (한 프로세스만 사용해야 함)
+    fcntl = None
+
+class ExpectationVectorCache:
+    """
+    디코딩된 GPE 데이터의 내용 해시를 키로 하는 기대 벡터(E) 캐시.
+    메모리 계층은 LRU + TTL이며 max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다.
+    disk_path가 주어지면 벡터를 memory-mapped float32 배열에 함께 저장하여 재시작 후에도 캐시를 재사용합니다.
+    디스크 계층은 경로 하나를 한 프로세스만 사용할 수 있습니다. 이미 다른 프로세스가 잠근 경로이면
+    경고를 출력하고 메모리 계층만 사용합니다. (여러 uvicorn 워커는 워커별로 다른 경로를 지정)
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600.0,
+                 disk_path: Optional[str] = None, disk_capacity: int = 4096):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[torch.Tensor, float]]" = OrderedDict() # key -> (vector, created_at)
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock() # 디스크 계층 전용 (메모리 계층 조회와 분리)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._disk: Optional[_DiskVectorStore] = None
+        if disk_path:
+            try:
+                self._disk = _DiskVectorStore(disk_path, disk_capacity)
+            except DiskCacheLockedError as e:
+                print(f"WARNING: {e} EVG 디스크 캐시 없이 메모리 캐시만 사용합니다.")
+
+    @staticmethod
+    def make_key(decoded_data: Any, namespace: str = "") -> str:
+        """
+        캐시 키(SHA-256). 지연 디코딩 뷰(LazyDecodedGpe)에 인코딩된 페이로드의 digest가 있으면
+        그것으로 키를 만들어 캐시 적중 시 레코드를 전혀 압축 해제/파싱하지 않습니다.
+        딕셔너리(또는 digest가 없는 뷰)는 정규화된 JSON 내용을 레코드 단위로 해시합니다.
+        """
+        digest = getattr(decoded_data, "digest", None)
+        if digest:
+            return hashlib.sha256(f"{namespace}\x00payload\x00{digest}".encode("utf-8")).hexdigest()
+        if isinstance(decoded_data, dict):
+            context = {k: v for k, v in decoded_data.items() if k != "records"}
+        else:
+            context = decoded_data.context
+        hasher = hashlib.sha256(f"{namespace}\x00".encode("utf-8"))
+        hasher.update(json.dumps(context, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+        for record in decoded_data.get("records", []) or []:
+            hasher.update(b"\n")
+            hasher.update(json.dumps(record, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def get(self, key: str, device: str = "cpu") -> Optional[torch.Tensor]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                self._remove(key)
+                self.evictions += 1
+            if self._disk is None:
+                self.misses += 1
+                return None
+
+        # 디스크 계층은 메모리 계층 잠금을 놓은 뒤 조회 (디스크 기록/압축이 메모리 조회를 막지 않도록)
+        with self._disk_lock:
+            disk_entry = self._disk.get(key)
+        if disk_entry is not None and now - disk_entry[1] <= self.ttl_seconds:
+            array, created_at = disk_entry
+            vector = torch.from_numpy(array).to(device)
+            with self._lock:
+                if key not in self._entries: # 그 사이 다른 스레드가 넣었으면 그대로 둠
+                    self._insert(key, vector, created_at)
+                self.hits += 1
+            return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, vector: torch.Tensor):
+        created_at = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._insert(key, vector, created_at)
+        if self._disk is not None:
+            # 디스크 기록은 메모리 계층의 잠금 밖에서 수행 (다른 요청의 캐시 조회를 막지 않음)
+            array = vector.detach().to("cpu", torch.float32).numpy()
+            with self._disk_lock:
+                self._disk.put(key, array, created_at)
+
+    def close(self):
+        """디스크 계층의 memmap을 flush하고 인덱스 로그를 닫습니다."""
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "memory_bytes": self._current_bytes,
+                "disk_entries": len(self._disk) if self._disk is not None else 0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def _insert(self, key: str, vector: torch.Tensor, created_at: float):
+        size = vector.element_size() * vector.numel()
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (vector, created_at)
+        self._current_bytes += size
+        while self._current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        vector, _ = self._entries.pop(key)
+        self._current_bytes -= vector.element_size() * vector.numel()
+
+
+class DiskCacheLockedError(RuntimeError):
+    """디스크 캐시 경로를 이미 다른 프로세스가 사용 중일 때 발생합니다."""
+
+
+class _DiskVectorStore:
+    """
+    고정 크기 float32 memmap(<path>.f32)과 추가 전용 인덱스 로그(<path>.index.jsonl)로 구성된 디스크 계층.
+    - 인덱스 로그의 첫 줄은 {"capacity", "dim"} 헤더이고, 이후 한 줄에 하나씩 [key, slot, created_at]를 덧붙입니다.
+      삽입마다 인덱스 전체를 다시 쓰지 않으며, 로그가 용량의 COMPACT_FACTOR배를 넘으면 현재 항목만 남기고 압축합니다.
+    - memmap은 삽입마다 flush하지 않습니다. (쓰기는 OS 페이지 캐시에 남고, 압축/close 때 flush)
+    슬롯이 가득 차면 가장 오래 전에 기록된 슬롯을 재사용합니다.
+    슬롯 배정은 프로세스 메모리에만 있으므로 경로 하나는 한 프로세스만 사용해야 합니다.
+    <path>.lock에 배타적 파일 잠금(fcntl)을 걸고, 이미 잠겨 있으면 DiskCacheLockedError를 발생시킵니다.
+    """
+    COMPACT_FACTOR = 4
+
+    def __init__(self, path: str, capacity: int):
+        self.vectors_path = f"{path}.f32"
+        self.index_path = f"{path}.index.jsonl"
+        self.capacity = capacity
+        self.dim: Optional[int] = None
+        self._slots: "OrderedDict[str, Tuple[int, float]]" = OrderedDict() # key -> (slot, created_at), 기록 순서
+        self._array: Optional[np.memmap] = None
+        self._log = None
+        self._log_lines = 0
+        self._lock_file = self._acquire_path_lock(f"{path}.lock")
+
+        if os.path.exists(self.index_path) and os.path.exists(self.vectors_path):
+            try:
+                self._replay_index()
+                if self.dim is not None:
+                    self._array = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+                    self._rewrite_index() # 시작 시 한 번 압축 (잘린 마지막 줄이 있어도 이후 기록이 이어지도록)
+                    print(f"🔹 EVG 디스크 캐시 로드 완료. ({len(self._slots)} entries)")
+            except (OSError, ValueError, KeyError, TypeError):
+                self._slots.clear()
+                self.dim = None # 손상된 인덱스는 무시하고 새로 만듦
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @staticmethod
+    def _acquire_path_lock(lock_path: str):
+        lock_file = open(lock_path, "a")
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise DiskCacheLockedError(
+                f"EVG disk cache '{lock_path}' is in use by another process (use one path per process)."
+            ) from None
+        return lock_file
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, float]]:
+        entry = self._slots.get(key)
+        if entry is None or self._array is None:
+            return None
+        slot, created_at = entry
+        return np.array(self._array[slot]), created_at
+
+    def put(self, key: str, vector: np.ndarray, created_at: float):
+        if self._array is None:
+            self.dim = int(vector.shape[0])
+            self._array = np.memmap(self.vectors_path, dtype=np.float32, mode="w+", shape=(self.capacity, self.dim))
+            self._rewrite_index()
+        if vector.shape[0] != self.dim:
+            return
+
+        if key in self._slots:
+            slot, _ = self._slots.pop(key)
+        elif len(self._slots) < self.capacity:
+            slot = len(self._slots) # 슬롯은 재사용될 뿐 비워지지 않으므로 0..n-1이 사용 중
+        else:
+            _, (slot, _) = self._slots.popitem(last=False)
+
+        self._array[slot] = vector
+        self._slots[key] = (slot, created_at)
+        self._log.write(json.dumps([key, slot, created_at]) + "\n")
+        self._log.flush() # 파이썬 버퍼만 비움 (fsync 없음)
+        self._log_lines += 1
+        if self._log_lines > self.COMPACT_FACTOR * self.capacity:
+            self._rewrite_index()
+
+    def close(self):
+        if self._array is not None:
+            self._array.flush()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._lock_file is not None:
+            self._lock_file.close() # 파일을 닫으면 잠금도 해제됨
+            self._lock_file = None
+
+    def _replay_index(self):
+        """인덱스 로그를 처음부터 재생합니다. 같은 슬롯을 나중에 쓴 키가 이전 키를 대체합니다."""
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("capacity") != self.capacity:
+                return
+            slot_keys: Dict[int, str] = {}
+            for line in f:
+                try:
+                    key, slot, created_at = json.loads(line)
+                except ValueError: # 기록 도중 종료되어 잘린 마지막 줄
+                    break
+                previous_key = slot_keys.get(slot)
+                if previous_key is not None and previous_key != key:
+                    self._slots.pop(previous_key, None)
+                self._slots.pop(key, None)
+                self._slots[key] = (slot, created_at)
+                slot_keys[slot] = key
+                self._log_lines += 1
+            self.dim = header["dim"]
+
+    def _rewrite_index(self):
+        """현재 항목만으로 인덱스 로그를 새로 씁니다. (벡터를 먼저 flush하여 인덱스가 앞서지 않도록 함)"""
+        self._array.flush()
+        if self._log is not None:
+            self._log.close()
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"capacity": self.capacity, "dim": self.dim}) + "\n")
+            for key, (slot, created_at) in self._slots.items():
+                f.write(json.dumps([key, slot, created_at]) + "\n")
+        os.replace(tmp_path, self.index_path)
+        self._log = open(self.index_path, "a", encoding="utf-8")
+        self._log_lines = len(self._slots)
@@ -1,17 +1,70 @@
 # 파일명: gpe_decoder.py
 import json
 import gzip
+import hashlib
+import zlib
 import base64
-from typing import Dict, Any, List
+import codecs
+from itertools import islice
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple, Union
+
+from gpe_wire import BytesLike, is_binary_payload, unpack_binary_payload
+
+STREAM_CHUNK_SIZE = 64 * 1024 # 지연 디코딩 시 한 번에 base64/gzip 해제하는 입력 크기
+
+class LazyDecodedGpe:
+    """
+    GpeDecoder.decode_lazy()가 반환하는 지연 디코딩 뷰.
+    conclusion 등 레코드 외 필드는 즉시 사용할 수 있고, records는 접근할 때마다
+    페이로드를 처음부터 점진적으로 압축 해제/파싱하는 새 이터레이터를 반환합니다.
+    digest는 인코딩된 페이로드의 해시로, 레코드를 읽지 않고 캐시 키로 쓸 수 있습니다. (payload_digest)
+    """
+    __slots__ = ("context", "has_records", "digest", "_records_factory")
+
+    def __init__(self, context: Dict[str, Any], records_factory: Callable[[], Iterator[Dict[str, Any]]],
+                 has_records: bool = True, digest: Optional[str] = None):
+        self.context = context
+        self.has_records = has_records
+        self.digest = digest
+        self._records_factory = records_factory
+
+    @property
+    def conclusion(self) -> Optional[str]:
+        return self.context.get("conclusion")
+
+    @property
+    def records(self) -> Iterator[Dict[str, Any]]:
+        return self._records_factory()
+
+    def iter_records(self, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """레코드를 스트리밍합니다. limit이 주어지면 앞에서부터 그 개수까지만 파싱합니다."""
+        return islice(self._records_factory(), limit)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """디코딩된 딕셔너리와 같은 방식으로 접근할 수 있도록 합니다. ('records'는 이터레이터)"""
+        if key == "records":
+            return self.records
+        return self.context.get(key, default)
+
+    def materialize(self) -> Dict[str, Any]:
+        """GpeDecoder.decode()와 같은 형태의 딕셔너리로 전부 읽어 들입니다."""
+        data = dict(self.context)
+        if self.has_records:
+            data["records"] = list(self.records)
+        return data
 
 class GpeDecoder:
     """
     GPE 페이로드를 디코딩하여 원본 구조적 데이터를 재구성합니다.
     """
-    def decode(self, gpe_payload: Dict[str, Any]) -> Dict[str, Any]:
+    def decode(self, gpe_payload: Union[Dict[str, Any], BytesLike]) -> Dict[str, Any]:
         """
         입력된 GPE 페이로드를 분석하고 원본 데이터로 재구성합니다.
+        바이너리 프레임 형식(bytes/memoryview)도 받을 수 있습니다.
         """
+        if is_binary_payload(gpe_payload):
+            return self._decode_binary(gpe_payload).materialize()
+
         payload_type = gpe_payload.get("payload_type", "")
         generative_payload = gpe_payload.get("generative_payload", {})
 
@@ -20,6 +73,11 @@ class GpeDecoder:
             compressed_data = generative_payload.get("data_b64_gz", "")
             return self._decompress_data(compressed_data)
         
+        elif payload_type == "gpe_v1.1":
+            # 템플릿(컬럼형) 인코딩: 고유 행을 복원한 뒤 시드 규칙으로 원래 순서를 재현
+            seed, template = self._template_body(generative_payload)
+            return self._rebuild_from_template(template, seed)
+
         elif payload_type == "gpe_v1.0":
             # GPE 규칙이 포함된 경우
             seed = generative_payload.get("seed", [])
@@ -31,12 +89,116 @@ class GpeDecoder:
             for rule in seed:
                 if rule.get("op") == "repeat":
                     # data_context의 'records'를 'count'만큼 반복 (여기서는 이미 반복된 데이터를 받았다고 가정)
-                    reconstructed_data["records"] = data_context
-                    reconstructed_data["conclusion"] = data_context.get("conclusion")
+                    # (v1.0 인코더는 레코드 리스트만 압축하므로 conclusion이 없을 수 있음)
+                    if isinstance(data_context, list):
+                        reconstructed_data["records"] = data_context
+                    else:
+                        reconstructed_data["records"] = data_context.get("records", [])
+                        reconstructed_data["conclusion"] = data_context.get("conclusion")
             return reconstructed_data
+
+        elif payload_type.startswith("fallback"):
+            # 폴백 페이로드: 구조적 데이터 대신 raw_context를 결론처럼 사용
+            return self._fallback_context(generative_payload)
             
         return {}
 
+    def decode_lazy(self, gpe_payload: Union[Dict[str, Any], BytesLike]) -> LazyDecodedGpe:
+        """
+        decode()의 지연 버전. 전체 레코드 리스트를 메모리에 만들지 않고,
+        레코드를 순회할 때 필요한 만큼만 압축 해제하고 파싱합니다.
+        반환된 뷰의 digest에는 인코딩된 페이로드의 해시가 채워집니다.
+        """
+        view = self._lazy_view(gpe_payload)
+        view.digest = payload_digest(gpe_payload)
+        return view
+
+    def _lazy_view(self, gpe_payload: Union[Dict[str, Any], BytesLike]) -> LazyDecodedGpe:
+        if is_binary_payload(gpe_payload):
+            return self._decode_binary(gpe_payload)
+
+        payload_type = gpe_payload.get("payload_type", "")
+        generative_payload = gpe_payload.get("generative_payload", {})
+
+        if "compressed_json" in payload_type:
+            return self._lazy_from_compressed(generative_payload.get("data_b64_gz", ""))
+
+        elif payload_type == "gpe_v1.1":
+            seed, template = self._template_body(generative_payload)
+            return LazyDecodedGpe(
+                dict(template.get("context", {})), lambda: self._iter_template_records(template, seed)
+            )
+
+        elif payload_type == "gpe_v1.0":
+            seed = generative_payload.get("seed", [])
+            if not any(rule.get("op") == "repeat" for rule in seed):
+                return LazyDecodedGpe({}, lambda: iter(()), has_records=False)
+            return self._lazy_from_compressed(generative_payload.get("data_context_b64_gz", ""))
+
+        elif payload_type.startswith("fallback"):
+            return LazyDecodedGpe(self._fallback_context(generative_payload), lambda: iter(()), has_records=False)
+
+        return LazyDecodedGpe({}, lambda: iter(()), has_records=False)
+
+    def _template_body(self, generative_payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """템플릿 페이로드의 (시드, 템플릿). 압축된 본문(body_b64_gz)과 압축하지 않은 형식을 모두 받습니다."""
+        if "body_b64_gz" in generative_payload:
+            generative_payload = self._decompress_data(generative_payload["body_b64_gz"])
+        return generative_payload.get("seed", []), generative_payload.get("template", {})
+
+    def _fallback_context(self, generative_payload: Dict[str, Any]) -> Dict[str, Any]:
+        raw_context = generative_payload.get("raw_context")
+        return {"conclusion": raw_context} if raw_context else {}
+
+    def _decode_binary(self, buffer: BytesLike) -> LazyDecodedGpe:
+        """바이너리 프레임 페이로드를 해석합니다. 템플릿 페이로드의 레코드는 지연 전개됩니다."""
+        try:
+            payload_type, _, body = unpack_binary_payload(buffer)
+        except Exception:
+            return LazyDecodedGpe({}, lambda: iter(()), has_records=False) # 디코딩 실패 시 빈 뷰 반환
+
+        if payload_type == "gpe_v1.1" and isinstance(body, dict):
+            seed = body.get("seed", [])
+            template = body.get("template", {})
+            return LazyDecodedGpe(
+                dict(template.get("context", {})), lambda: self._iter_template_records(template, seed)
+            )
+        if "compressed_json" in payload_type and isinstance(body, dict):
+            records = body.get("records")
+            context = {k: v for k, v in body.items() if k != "records"}
+            return LazyDecodedGpe(context, lambda: iter(records or ()), has_records=records is not None)
+        return LazyDecodedGpe({}, lambda: iter(()), has_records=False)
+
+    def _rebuild_from_template(self, template: Dict[str, Any], seed: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """스키마와 컬럼 배열로 고유 행을 만들고, 시드 규칙(repeat/rle)에 따라 레코드 목록을 재구성합니다."""
+        reconstructed_data = dict(template.get("context", {}))
+        reconstructed_data["records"] = list(self._iter_template_records(template, seed))
+        return reconstructed_data
+
+    def _iter_template_records(self, template: Dict[str, Any], seed: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        schema = template.get("schema", [])
+        columns = [self._decode_column(column) for column in template.get("columns", [])]
+        unique_rows = list(zip(*columns)) if columns else [()] * template.get("rows", 0)
+        for i in self._iter_row_indices(seed, len(unique_rows)):
+            yield dict(zip(schema, unique_rows[i]))
+
+    def _iter_row_indices(self, seed: List[Dict[str, Any]], num_unique: int) -> Iterator[int]:
+        """시드 규칙(repeat/rle)을 고유 행 인덱스 스트림으로 펼칩니다."""
+        for rule in seed:
+            if rule.get("op") == "repeat":
+                period = rule.get("period", num_unique)
+                return (i % period for i in range(rule.get("count", 0)))
+            elif rule.get("op") == "rle":
+                return (index for index, run in rule.get("runs", []) for _ in range(run))
+        return iter(())
+
+    def _decode_column(self, column: Dict[str, Any]) -> List[Any]:
+        """타입 컬럼을 값 목록으로 복원합니다. (사전 인코딩된 문자열 컬럼 포함)"""
+        if "dict" in column:
+            dictionary = column["dict"]
+            return [dictionary[code] for code in column.get("codes", [])]
+        return column.get("values", [])
+
     def _decompress_data(self, encoded_data: str) -> Dict[str, Any]:
         """Base64 디코딩 -> gzip 압축 해제 -> JSON 파싱"""
         if not encoded_data:
@@ -47,3 +209,156 @@ class GpeDecoder:
             return json.loads(decompressed_json.decode('utf-8'))
         except Exception:
             return {} # 디코딩 실패 시 빈 객체 반환
+
+    def _lazy_from_compressed(self, encoded_data: str) -> LazyDecodedGpe:
+        """
+        압축된 JSON을 앞에서부터 스캔해 'records' 배열 앞의 필드만 먼저 읽습니다.
+        'records' 뒤에 오는 필드는 conclusion 등으로 필요할 때만 한 번 더 스캔합니다.
+        """
+        context: Dict[str, Any] = {}
+        records_found = False
+        try:
+            for kind, key, value in _scan_top_level(_iter_decompressed_text(encoded_data)):
+                if kind == "field":
+                    context[key] = value
+                else:
+                    records_found = True
+                    break
+            if records_found and "conclusion" not in context:
+                for kind, key, value in _scan_top_level(_iter_decompressed_text(encoded_data), skip_records=True):
+                    if kind == "field":
+                        context.setdefault(key, value)
+        except Exception:
+            return LazyDecodedGpe({}, lambda: iter(()), has_records=False) # 디코딩 실패 시 빈 뷰 반환
+
+        def records_factory() -> Iterator[Dict[str, Any]]:
+            if not records_found:
+                return
+            try:
+                for kind, _, value in _scan_top_level(_iter_decompressed_text(encoded_data)):
+                    if kind == "record":
+                        yield value
+                    elif kind == "records_end":
+                        return
+            except Exception:
+                return
+        return LazyDecodedGpe(context, records_factory, has_records=records_found)
+
+
+def payload_digest(gpe_payload: Union[Dict[str, Any], BytesLike]) -> str:
+    """
+    인코딩된 GPE 페이로드의 SHA-256 해시. 압축된 본문을 그대로 해시하므로 압축 해제/파싱이 필요 없습니다.
+    같은 내용이라도 인코딩(형식, 코덱)이 다르면 다른 값이 됩니다. metadata는 해시에 포함하지 않습니다.
+    """
+    if is_binary_payload(gpe_payload):
+        return hashlib.sha256(gpe_payload).hexdigest()
+    hasher = hashlib.sha256(gpe_payload.get("payload_type", "").encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(json.dumps(gpe_payload.get("generative_payload", {}), sort_keys=True,
+                             separators=(",", ":"), default=str).encode("utf-8"))
+    return hasher.hexdigest()
+
+def _iter_decompressed_text(encoded_data: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """base64 문자열을 청크 단위로 디코딩하고 gzip을 점진적으로 해제하여 텍스트 조각을 내보냅니다."""
+    if not encoded_data:
+        return
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) # gzip 헤더 처리
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    step = chunk_size - chunk_size % 4 # base64는 4문자 단위로 끊어야 함
+    for start in range(0, len(encoded_data), step):
+        text = text_decoder.decode(decompressor.decompress(base64.b64decode(encoded_data[start:start + step])))
+        if text:
+            yield text
+    yield text_decoder.decode(decompressor.flush(), final=True)
+
+
+class _JsonStreamScanner:
+    """텍스트 조각 스트림 위에서 JSON 값을 하나씩 읽는 최소한의 증분 스캐너"""
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._buffer = ""
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """다음 조각을 버퍼에 추가합니다. 이미 읽은 앞부분은 버립니다."""
+        for chunk in self._chunks:
+            self._buffer = self._buffer[self._pos:] + chunk
+            self._pos = 0
+            return True
+        return False
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in self._WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def next_char(self) -> str:
+        char = self.peek()
+        self._pos += 1
+        return char
+
+    def read_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 숫자는 버퍼 경계에서 잘렸을 수 있으므로 끝에 닿았다면 더 읽고 다시 파싱
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+def _scan_top_level(chunks: Iterator[str], skip_records: bool = False) -> Iterator[Tuple[str, Optional[str], Any]]:
+    """
+    최상위 JSON을 스캔하며 ("field", key, value), ("record", None, record), ("records_end", None, None)
+    이벤트를 내보냅니다. 최상위가 배열이면 그 원소들을 레코드로 취급합니다. (v1.0 data_context)
+    """
+    scanner = _JsonStreamScanner(chunks)
+    first = scanner.peek()
+    if first == "[":
+        yield from _scan_array(scanner, skip_records)
+        return
+    if scanner.next_char() != "{":
+        raise ValueError("GPE payload is not a JSON object or array")
+    if scanner.peek() == "}":
+        return
+    while True:
+        key = scanner.read_value()
+        if scanner.next_char() != ":":
+            raise ValueError("Malformed JSON object")
+        if key == "records" and scanner.peek() == "[":
+            yield from _scan_array(scanner, skip_records)
+        else:
+            yield "field", key, scanner.read_value()
+        separator = scanner.next_char()
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError("Malformed JSON object")
+
+def _scan_array(scanner: _JsonStreamScanner, skip_records: bool) -> Iterator[Tuple[str, Optional[str], Any]]:
+    scanner.next_char() # '['
+    if scanner.peek() == "]":
+        scanner.next_char()
+    else:
+        while True:
+            record = scanner.read_value()
+            if not skip_records:
+                yield "record", None, record
+            separator = scanner.next_char()
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError("Malformed JSON array")
+    yield "records_end", None, None
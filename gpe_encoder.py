@@ -2,56 +2,170 @@
 import json
 import gzip
 import base64
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+from gpe_wire import pack_binary_payload
 
 class GpeEncoder:
     """
     구조적 데이터를 GPE 페이로드로 인코딩합니다.
-    (간소화된 버전: 반복 규칙만 감지)
+    모든 레코드가 같은 키를 가지면 템플릿(컬럼형) 인코딩을 사용합니다:
+    하나의 키 스키마 + 고유 행에 대한 컬럼별 타입 배열 + 행 순서를 재현하는 시드 규칙(repeat/rle).
+    JSON 페이로드에서는 시드와 템플릿을 함께 gzip+base64로 압축하여(body_b64_gz) 고유 행이 많아도
+    단순 압축보다 커지지 않도록 합니다. 바이너리 프레임은 본문 전체를 프레임 코덱으로 압축합니다.
     """
     def encode(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         입력된 딕셔너리 데이터를 분석하고 GPE 페이로드로 변환합니다.
         """
+        template_payload = self._encode_template(data)
+        encoded_data = None
+        if template_payload is not None:
+            body_b64_gz = self._compress_data(template_payload["generative_payload"])
+            metadata = dict(template_payload["metadata"])
+            # 고유 행이 대부분이면 행 중복 제거 이득이 작으므로 단순 압축과 크기를 비교해 작은 쪽을 사용
+            if metadata["unique_rows"] * 2 > len(data.get("records", [])):
+                encoded_data = self._compress_data(data)
+            if encoded_data is None or len(body_b64_gz) < len(encoded_data):
+                metadata["encoded_size_bytes"] = len(body_b64_gz)
+                original_size = metadata["original_size_bytes"]
+                metadata["compression_ratio"] = 1 - (len(body_b64_gz) / original_size) if original_size > 0 else 0
+                return {
+                    "payload_type": template_payload["payload_type"],
+                    "generative_payload": {"body_b64_gz": body_b64_gz},
+                    "metadata": metadata,
+                }
+
+        # 반복 패턴을 찾지 못했거나 템플릿이 더 작지 않은 경우, 단순 압축만 적용
+        if encoded_data is None:
+            encoded_data = self._compress_data(data)
+        return {
+            "payload_type": "gpe_v1.0_compressed_json",
+            "generative_payload": {"data_b64_gz": encoded_data},
+            "metadata": {"original_size_bytes": self._original_size(data)}
+        }
+
+    def encode_binary(self, data: Dict[str, Any], codec: Optional[str] = None, level: int = 6) -> bytes:
+        """
+        encode()와 같은 분석을 거쳐 바이너리 프레임 형식(gpe_bin_v1)의 바이트열을 만듭니다.
+        base64/gzip 대신 선택한 코덱(zlib 레벨, 또는 설치된 경우 lz4/zstd)으로 한 번만 압축합니다.
+        """
+        template_payload = self._encode_template(data)
+        if template_payload is not None:
+            return pack_binary_payload(
+                template_payload["payload_type"], template_payload["generative_payload"],
+                template_payload["metadata"], codec=codec, level=level
+            )
+        return pack_binary_payload(
+            "gpe_v1.0_compressed_json", data, {"original_size_bytes": self._original_size(data)},
+            codec=codec, level=level
+        )
+
+    def _original_size(self, data: Dict[str, Any]) -> int:
+        return len(json.dumps(data.get("records", [])).encode('utf-8'))
+
+    def _encode_template(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        모든 레코드가 같은 키를 가지면 압축 전 템플릿 페이로드(generative_payload에 seed/template)를,
+        아니면 None을 반환합니다. encoded_size_bytes는 압축 전 JSON 크기입니다.
+        """
         # 여기서는 data가 'records' 키를 가진 리스트를 포함한다고 가정
         records = data.get("records", [])
-        original_size = len(json.dumps(records).encode('utf-8'))
 
         # 반복 규칙 감지 (간단한 예: 모든 레코드가 동일한 키를 가질 때)
         if records and all(isinstance(r, dict) for r in records):
-            first_keys = set(records[0].keys())
-            if all(set(r.keys()) == first_keys for r in records):
-                seed = [{
-                    "op": "repeat",
-                    "count": len(records),
-                    "instruction": {"op": "instantiate_from_template", "template_id": "common_template"}
-                }]
-                encoded_data = self._compress_data(records)
-                encoded_size = len(json.dumps(seed).encode()) + len(encoded_data)
+            schema = list(records[0].keys())
+            first_keys = set(schema)
+            if all(r.keys() == first_keys for r in records):
+                original_size = self._original_size(data)
+                unique_rows, row_indices = self._deduplicate_rows(records, schema)
+                seed = [self._build_row_rule(row_indices, len(unique_rows))]
+                template = {
+                    "schema": schema,
+                    "rows": len(unique_rows),
+                    "columns": [self._encode_column([row[i] for row in unique_rows]) for i in range(len(schema))],
+                    "context": {k: v for k, v in data.items() if k != "records"}, # conclusion 등 레코드 외 필드
+                }
+                seed_size = len(json.dumps(seed, separators=(",", ":")).encode())
+                encoded_size = seed_size + len(json.dumps(template, separators=(",", ":")).encode())
 
                 return {
-                    "payload_type": "gpe_v1.0",
+                    "payload_type": "gpe_v1.1",
                     "generative_payload": {
                         "seed": seed,
-                        "data_context_b64_gz": encoded_data
+                        "template": template
                     },
                     "metadata": {
                         "original_size_bytes": original_size,
-                        "encoded_seed_size_bytes": len(json.dumps(seed).encode()),
+                        "encoded_seed_size_bytes": seed_size,
+                        "encoded_size_bytes": encoded_size,
+                        "unique_rows": len(unique_rows),
                         "compression_ratio": 1 - (encoded_size / original_size) if original_size > 0 else 0
                     }
                 }
+        return None
 
-        # 반복 패턴을 찾지 못한 경우, 단순 압축만 적용
-        encoded_data = self._compress_data(data)
-        return {
-            "payload_type": "gpe_v1.0_compressed_json",
-            "generative_payload": {"data_b64_gz": encoded_data},
-            "metadata": {"original_size_bytes": original_size}
-        }
+    def _deduplicate_rows(self, records: List[Dict[str, Any]], schema: List[str]) -> Tuple[List[tuple], List[int]]:
+        """동일한 행을 하나로 합치고, 원래 순서를 고유 행 인덱스 목록으로 반환합니다."""
+        row_ids: Dict[Any, int] = {}
+        unique_rows: List[tuple] = []
+        row_indices: List[int] = []
+        for record in records:
+            row = tuple(record[k] for k in schema)
+            # 1 == True == 1.0이므로 값의 타입도 키에 포함해야 서로 다른 행이 합쳐지지 않음
+            try:
+                key = tuple((type(value), value) for value in row)
+                hash(key)
+            except TypeError: # list/dict 값은 JSON으로 비교 (JSON은 1/true/1.0을 구분)
+                key = json.dumps(row, default=str)
+            index = row_ids.get(key)
+            if index is None:
+                index = row_ids[key] = len(unique_rows)
+                unique_rows.append(row)
+            row_indices.append(index)
+        return unique_rows, row_indices
+
+    def _build_row_rule(self, row_indices: List[int], num_unique: int) -> Dict[str, Any]:
+        """
+        행 순서를 재현하는 시드 규칙을 만듭니다.
+        고유 행 목록이 주기적으로 반복되면 'repeat', 그렇지 않으면 (행, 반복 길이) 쌍의 'rle'을 사용합니다.
+        """
+        # 고유 행은 첫 등장 순서로 번호가 매겨지므로, 주기 반복이라면 주기는 고유 행 수와 같음
+        if all(index == i % num_unique for i, index in enumerate(row_indices)):
+            return {
+                "op": "repeat",
+                "count": len(row_indices),
+                "period": num_unique,
+                "instruction": {"op": "instantiate_from_template", "template_id": "common_template"}
+            }
+
+        runs: List[List[int]] = []
+        for index in row_indices:
+            if runs and runs[-1][0] == index:
+                runs[-1][1] += 1
+            else:
+                runs.append([index, 1])
+        return {"op": "rle", "count": len(row_indices), "runs": runs}
+
+    def _encode_column(self, values: List[Any]) -> Dict[str, Any]:
+        """컬럼 값들의 타입을 판별하고, 반복되는 문자열은 사전(dictionary) 인코딩합니다."""
+        if all(isinstance(v, bool) for v in values):
+            return {"type": "bool", "values": values}
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            return {"type": "int", "values": values}
+        if all(isinstance(v, float) for v in values):
+            return {"type": "float", "values": values}
+        if all(isinstance(v, str) for v in values):
+            dictionary: Dict[str, int] = {}
+            codes = [dictionary.setdefault(v, len(dictionary)) for v in values]
+            if len(dictionary) < len(values):
+                return {"type": "str", "dict": list(dictionary), "codes": codes}
+            return {"type": "str", "values": values}
+        return {"type": "json", "values": values}
 
     def _compress_data(self, data: Any) -> str:
         """데이터를 JSON 직렬화 -> gzip 압축 -> base64 인코딩"""
         json_str = json.dumps(data)
-        compressed = gzip.compress(json_str.encode('utf-8'))
+        # mtime=0: gzip 헤더에 시각을 넣지 않아 같은 데이터는 항상 같은 바이트열이 됨 (payload_digest 캐시 키)
+        compressed = gzip.compress(json_str.encode('utf-8'), mtime=0)
         return base64.b64encode(compressed).decode('utf-8')
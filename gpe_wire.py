@@ -0,0 +1,127 @@
+# 파일명: gpe_wire.py
+import json
+import struct
+import zlib
+from typing import Any, Dict, Tuple, Union
+
+# --- 선택적 고속 코덱 ---
+# 'pip install lz4 zstandard'가 설치되어 있으면 사용하고, 없으면 zlib만 사용합니다.
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 바이너리 GPE 프레임 형식 (네트워크 바이트 순서)
+#   header: magic(4s) | version(B) | codec(B) | frame_count(H)
+#   frame : kind(B) | stored_length(I) | raw_length(I) | body(stored_length bytes)
+BINARY_PAYLOAD_TYPE = "gpe_bin_v1"
+BINARY_MEDIA_TYPE = "application/vnd.cga.gpe+binary"
+MAGIC = b"GPEB"
+VERSION = 1
+_HEADER = struct.Struct("!4sBBH")
+_FRAME = struct.Struct("!BII")
+
+FRAME_META = 1 # 비압축 JSON: {"payload_type", "metadata"}
+FRAME_BODY = 2 # 코덱으로 압축된 JSON: generative_payload 또는 원본 데이터
+
+CODEC_IDS = {"none": 0, "zlib": 1, "lz4": 2, "zstd": 3}
+CODEC_NAMES = {v: k for k, v in CODEC_IDS.items()}
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+def available_codecs() -> Tuple[str, ...]:
+    """현재 환경에서 사용 가능한 코덱 목록"""
+    codecs = ["none", "zlib"]
+    if lz4_frame is not None:
+        codecs.append("lz4")
+    if zstandard is not None:
+        codecs.append("zstd")
+    return tuple(codecs)
+
+def default_codec() -> str:
+    """사용 가능한 가장 빠른 코덱 (zstd > lz4 > zlib)"""
+    if zstandard is not None:
+        return "zstd"
+    if lz4_frame is not None:
+        return "lz4"
+    return "zlib"
+
+def is_binary_payload(payload: Any) -> bool:
+    return isinstance(payload, (bytes, bytearray, memoryview))
+
+def _compress(codec: str, data: bytes, level: int) -> bytes:
+    if codec == "none":
+        return data
+    if codec == "zlib":
+        return zlib.compress(data, level)
+    if codec == "lz4":
+        return lz4_frame.compress(data, compression_level=level)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported GPE codec: {codec}")
+
+def _decompress(codec: str, data: memoryview, raw_length: int) -> BytesLike:
+    """memoryview를 그대로 코덱에 넘겨 중간 복사 없이 압축을 해제합니다."""
+    if codec == "none":
+        return data
+    if codec == "zlib":
+        return zlib.decompress(data, bufsize=max(raw_length, 1))
+    if codec == "lz4":
+        return lz4_frame.decompress(data)
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_length)
+    raise ValueError(f"Unsupported GPE codec: {codec}")
+
+def pack_binary_payload(payload_type: str, body: Any, metadata: Dict[str, Any],
+                        codec: str | None = None, level: int = 6) -> bytes:
+    """GPE 페이로드 구성 요소를 길이 접두 프레임 형식의 바이트열로 직렬화합니다."""
+    codec = codec or default_codec()
+    if codec not in available_codecs():
+        raise ValueError(f"GPE codec '{codec}' is not available. Available: {available_codecs()}")
+
+    meta_bytes = json.dumps({"payload_type": payload_type, "metadata": metadata}, separators=(",", ":")).encode("utf-8")
+    raw_body = json.dumps(body, separators=(",", ":")).encode("utf-8")
+    body_bytes = _compress(codec, raw_body, level)
+
+    parts = [_HEADER.pack(MAGIC, VERSION, CODEC_IDS[codec], 2)]
+    for kind, stored, raw_length in ((FRAME_META, meta_bytes, len(meta_bytes)), (FRAME_BODY, body_bytes, len(raw_body))):
+        parts.append(_FRAME.pack(kind, len(stored), raw_length))
+        parts.append(stored)
+    return b"".join(parts)
+
+def unpack_binary_payload(buffer: BytesLike) -> Tuple[str, Dict[str, Any], Any]:
+    """
+    바이너리 GPE 페이로드를 (payload_type, metadata, body)로 해석합니다.
+    프레임 경계는 memoryview 슬라이스로만 다루므로 입력 버퍼를 복사하지 않습니다.
+    """
+    view = memoryview(buffer)
+    magic, version, codec_id, frame_count = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a GPE binary payload")
+    codec = CODEC_NAMES.get(codec_id)
+    if codec is None:
+        raise ValueError(f"Unknown GPE codec id: {codec_id}")
+
+    offset = _HEADER.size
+    meta: Dict[str, Any] = {}
+    body: Any = None
+    for _ in range(frame_count):
+        kind, stored_length, raw_length = _FRAME.unpack_from(view, offset)
+        offset += _FRAME.size
+        frame = view[offset:offset + stored_length]
+        if len(frame) != stored_length:
+            raise ValueError("Truncated GPE binary payload")
+        offset += stored_length
+
+        if kind == FRAME_META:
+            meta = json.loads(bytes(frame))
+        elif kind == FRAME_BODY:
+            decompressed = _decompress(codec, frame, raw_length)
+            body = json.loads(decompressed if isinstance(decompressed, bytes) else bytes(decompressed))
+        # 알 수 없는 프레임은 하위 호환을 위해 건너뜀
+
+    return meta.get("payload_type", ""), meta.get("metadata", {}), body
@@ -0,0 +1,157 @@
+# 파일명: local_backend_harness.py
+"""
+원격 백엔드 모드 점검용 하네스.
+
+main_backend를 로컬 uvicorn 프로세스로 띄운 뒤 RemoteReasoningBackend로
+sync(POST /reason), long_poll(GET /get_result?wait=...) 방식과 기존의 고정 간격 폴링을
+같은 동시성으로 실행하여, 결과 페이로드가 정상적으로 디코딩되는지와 방식별 지연을 비교합니다.
+
+사용 예:
+    python local_backend_harness.py --requests 32 --concurrency 8
+    python local_backend_harness.py --keep-running   # 백엔드를 띄워 둔 채 오케스트레이터를 연결해 볼 때
+        CGA_BACKEND_MODE=remote CGA_BACKEND_URL=http://127.0.0.1:8001 uvicorn main_orchestrator:app --port 8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from backend_client import RESULT_MODE_LONG_POLL, RESULT_MODE_SYNC, RemoteReasoningBackend
+from gpe_decoder import GpeDecoder
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_backend(port: int, workers: int, queue_workers: int) -> subprocess.Popen:
+    """main_backend를 uvicorn 하위 프로세스로 실행합니다."""
+    env = dict(os.environ, CGA_QUEUE_WORKERS=str(queue_workers))
+    command = [sys.executable, "-m", "uvicorn", "main_backend:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    if workers > 1:
+        env.setdefault("CGA_TASK_STORE", "sqlite") # 롱 폴링/결과 조회가 워커 간에 공유되도록
+    print(f"🚀 백엔드 시작: {' '.join(command)}")
+    return subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    return {
+        "p50": ordered[int(0.50 * (len(ordered) - 1))],
+        "p95": ordered[int(0.95 * (len(ordered) - 1))],
+        "max": ordered[-1],
+    }
+
+async def fixed_interval_poll(client: httpx.AsyncClient, query: str, interval: float) -> Dict[str, Any]:
+    """기존 방식: 작업을 제출한 뒤 interval초마다 결과를 조회"""
+    response = await client.post("/request_reasoning", json={"query": query})
+    response.raise_for_status()
+    task_id = response.json()["task_id"]
+    while True:
+        await asyncio.sleep(interval)
+        task = (await client.get(f"/get_result/{task_id}")).json()
+        if task["status"] == "completed":
+            return task["result"]
+        if task["status"] == "failed":
+            raise RuntimeError(f"Backend task {task_id} failed: {task.get('result')}")
+
+async def run_mode(name: str, call, num_requests: int, concurrency: int) -> Dict[str, Any]:
+    decoder = GpeDecoder()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def one(index: int):
+        async with semaphore:
+            query = f"harness query {index} about causal graph evidence"
+            start = time.perf_counter()
+            try:
+                payload = await call(query)
+                latencies.append(time.perf_counter() - start)
+                if not decoder.decode(payload).get("records"):
+                    errors.append(f"{query}: decoded payload has no records")
+            except Exception as e:
+                errors.append(f"{query}: {type(e).__name__}: {e}")
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(num_requests)))
+    wall_time = time.perf_counter() - wall_start
+    report = {"completed": len(latencies), "errors": errors[:5], "error_count": len(errors),
+              "wall_time_s": wall_time, "latency_s": summarize(latencies)}
+    latency = report["latency_s"]
+    print(f"   {name:>12}: completed={len(latencies)}/{num_requests} p50={latency['p50']*1000:.0f}ms "
+          f"p95={latency['p95']*1000:.0f}ms wall={wall_time:.2f}s errors={len(errors)}")
+    return report
+
+async def run_harness(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    sync_client = RemoteReasoningBackend(base_url, result_mode=RESULT_MODE_SYNC, max_connections=args.concurrency)
+    long_poll_client = RemoteReasoningBackend(base_url, result_mode=RESULT_MODE_LONG_POLL,
+                                              max_connections=args.concurrency)
+    polling_client = httpx.AsyncClient(base_url=base_url, timeout=None)
+    try:
+        await sync_client.wait_until_ready(timeout=args.ready_timeout)
+        print("✅ 백엔드 준비 완료. 방식별 부하 실행...")
+        results = {
+            "sync": await run_mode("sync", sync_client.reason, args.requests, args.concurrency),
+            "long_poll": await run_mode("long_poll", long_poll_client.reason, args.requests, args.concurrency),
+            "fixed_poll": await run_mode(
+                f"poll@{args.poll_interval:g}s",
+                lambda query: fixed_interval_poll(polling_client, query, args.poll_interval),
+                args.requests, args.concurrency,
+            ),
+        }
+        results["clients"] = {"sync": sync_client.stats(), "long_poll": long_poll_client.stats()}
+        return results
+    finally:
+        await sync_client.aclose()
+        await long_poll_client.aclose()
+        await polling_client.aclose()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="로컬 main_backend + 원격 백엔드 클라이언트 점검")
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--port", type=int, default=0, help="0이면 빈 포트 사용 (--keep-running이면 8001)")
+    parser.add_argument("--backend-workers", type=int, default=1, help="uvicorn 워커 수")
+    parser.add_argument("--queue-workers", type=int, default=4, help="백엔드 작업 큐 워커 수")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="비교용 고정 간격 폴링 주기(초)")
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--keep-running", action="store_true", help="점검 후 백엔드를 종료하지 않음 (Ctrl+C로 종료)")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    port = args.port or (8001 if args.keep_running else _free_port())
+    base_url = f"http://127.0.0.1:{port}"
+    backend = start_backend(port, args.backend_workers, args.queue_workers)
+    try:
+        results = asyncio.run(run_harness(base_url, args))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"✅ 결과 저장: {args.output}")
+        failed = sum(results[mode]["error_count"] for mode in ("sync", "long_poll", "fixed_poll"))
+        if args.keep_running:
+            print(f"🔹 백엔드 실행 중: {base_url}  (CGA_BACKEND_MODE=remote CGA_BACKEND_URL={base_url})")
+            backend.wait()
+        if failed:
+            sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.terminate()
+        try:
+            backend.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            backend.kill()
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,34 @@
 # 파일명: main_backend.py
 import asyncio
+import math
+import os
+import time
 import uuid
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Awaitable, Callable, Optional
 
 from reasoning_engine import MockHybridReasoningEngine
+from backend_pool import ReasoningWorkerPool
+from task_store import TaskStore, create_task_store
+from work_queue import PriorityWorkQueue, QueueRejectedError, parse_user_priorities
+from api_models import ReasoningRequest
+from gpe_wire import BINARY_MEDIA_TYPE
 
 # --- API 데이터 모델 ---
-class ReasoningRequest(BaseModel):
-    query: str
-
 class TaskResponse(BaseModel):
     task_id: str
     status: str
+    queue_position: Optional[int] = None
+    estimated_wait_s: Optional[float] = None
 
 class ResultResponse(BaseModel):
     task_id: str
     status: str
     result: Any | None = None
+    queue_position: Optional[int] = None
+    estimated_wait_s: Optional[float] = None
 
 # --- 시스템 초기화 ---
 app = FastAPI(
@@ -26,54 +36,182 @@ app = FastAPI(
     version="3.0"
 )
 
-# 전역 변수로 추론 엔진과 작업 결과를 저장 (실제 프로덕션에서는 Redis 등 사용)
-reasoning_engine: MockHybridReasoningEngine | None = None
-tasks: Dict[str, Any] = {}
+# 전역 변수로 추론 엔진과 작업 결과를 저장
+# CGA_TASK_STORE=sqlite로 설정하면 여러 uvicorn 워커가 하나의 SQLite(WAL) 파일을 공유합니다.
+reasoning_engine: MockHybridReasoningEngine | ReasoningWorkerPool | None = None
+tasks: TaskStore = create_task_store(
+    os.getenv("CGA_TASK_STORE", "memory"),
+    path=os.getenv("CGA_TASK_STORE_PATH", "cga_backend_tasks.db"),
+    ttl_seconds=float(os.getenv("CGA_TASK_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("CGA_TASK_MAX_ENTRIES", "10000")),
+)
+
+# CGA_BACKEND_MODE=process이면 엔진을 미리 로드한 워커 프로세스 풀로 추론을 코어 수만큼 병렬 실행합니다.
+BACKEND_MODE = os.getenv("CGA_BACKEND_MODE", "thread")
+BACKEND_PROCESS_WORKERS = int(os.getenv("CGA_BACKEND_WORKERS", str(os.cpu_count() or 2)))
+# 워커 프로세스가 이 시간(초) 안에 응답하지 않으면 멈춘 것으로 보고 재시작합니다.
+BACKEND_TASK_TIMEOUT_S = float(os.getenv("CGA_BACKEND_TASK_TIMEOUT_S", "30"))
+
+# 추론 작업 큐. 추론은 CPU를 많이 쓰므로 동시에 실행할 워커 수를 제한합니다.
+work_queue = PriorityWorkQueue(
+    num_workers=int(os.getenv("CGA_QUEUE_WORKERS", str(BACKEND_PROCESS_WORKERS if BACKEND_MODE == "process" else 2))),
+    max_depth=int(os.getenv("CGA_QUEUE_MAX_DEPTH", "64")),
+    max_per_user=int(os.getenv("CGA_QUEUE_MAX_PER_USER", "16")),
+    user_priorities=parse_user_priorities(os.getenv("CGA_USER_PRIORITIES", "")),
+    on_job_failed=lambda task_id, message: tasks.set(task_id, {"status": "failed", "result": message}),
+)
+
+# 롱 폴링: GET /get_result/{task_id}?wait=초 는 작업이 끝나거나 wait초가 지날 때까지 응답을 미룹니다.
+MAX_LONG_POLL_S = 30.0
+# 다른 워커 프로세스가 실행 중인 작업(공유 SQLite 저장소)은 이 간격으로 저장소를 다시 확인
+LONG_POLL_STORE_INTERVAL_S = 0.1
+_completion_events: Dict[str, asyncio.Event] = {} # 이 프로세스에서 실행 중인 작업의 완료 이벤트
 
 @app.on_event("startup")
 def startup_event():
     """애플리케이션 시작 시 추론 엔진을 로드합니다."""
     global reasoning_engine
-    reasoning_engine = MockHybridReasoningEngine()
+    if BACKEND_MODE == "process":
+        reasoning_engine = ReasoningWorkerPool(
+            num_workers=BACKEND_PROCESS_WORKERS, task_timeout=BACKEND_TASK_TIMEOUT_S
+        ).start()
+    else:
+        reasoning_engine = MockHybridReasoningEngine()
+    work_queue.start()
     print("✅ GlassBox Reasoning Engine이 성공적으로 로드되었습니다.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await work_queue.stop()
+    if isinstance(reasoning_engine, ReasoningWorkerPool):
+        reasoning_engine.close()
+
 # --- 비동기 작업 함수 ---
 def run_reasoning_task(task_id: str, query: str):
     """백그라운드에서 추론 및 인코딩을 수행하는 함수"""
     print(f"🔹 [Task: {task_id}] 백그라운드 추론 작업 시작...")
-    tasks[task_id] = {"status": "processing"}
+    tasks.set(task_id, {"status": "processing"})
     try:
-        result = reasoning_engine.reason(query)
-        tasks[task_id] = {"status": "completed", "result": result}
+        result = reasoning_engine.reason(query, wire_format="json") # 결과는 JSON으로 저장/응답
+        tasks.set(task_id, {"status": "completed", "result": result})
         print(f"✅ [Task: {task_id}] 작업 완료. 결과가 저장되었습니다.")
     except Exception as e:
-        tasks[task_id] = {"status": "failed", "result": str(e)}
+        tasks.set(task_id, {"status": "failed", "result": str(e)})
         print(f"❌ [Task: {task_id}] 작업 실패: {e}")
 
+def submit_job(task_id: str, job: Callable[[], Awaitable[Any]], user_id: Optional[str]) -> int:
+    """작업을 큐에 넣고 대기 순번을 반환합니다. 받아들일 수 없으면 Retry-After와 함께 429/503으로 거부합니다."""
+    try:
+        return work_queue.submit(task_id, job, user_id=user_id)
+    except QueueRejectedError as e:
+        raise HTTPException(
+            status_code=e.status_code, detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after_s)))}
+        )
+
 # --- API 엔드포인트 ---
+@app.post("/reason")
+async def reason_sync(request: ReasoningRequest, http_request: Request):
+    """
+    추론 요청을 작업 큐에 넣고 완료될 때까지 기다려 GPE 페이로드를 바로 반환합니다. (폴링 없음)
+    오케스트레이터의 원격 백엔드 모드가 keep-alive 연결로 호출합니다.
+    Accept 헤더에 BINARY_MEDIA_TYPE이 있으면 바이너리 프레임(gpe_bin_v1)으로 응답합니다.
+    """
+    wire_format = "binary" if BINARY_MEDIA_TYPE in http_request.headers.get("accept", "") else "json"
+    result: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def job():
+        # Starlette는 일반 핸들러를 연결 종료 시 취소하지 않으므로, 대기 중에 호출자가 포기한
+        # 요청(연결 종료, 헤지 취소)은 실행 직전에 연결 상태를 확인해 건너뜀
+        if await http_request.is_disconnected():
+            result.set_exception(ConnectionAbortedError("Client disconnected before the job started."))
+            return
+        try:
+            payload = await asyncio.to_thread(reasoning_engine.reason, request.query, wire_format=wire_format)
+        except Exception as e:
+            if not result.done():
+                result.set_exception(e)
+            return
+        if not result.done():
+            result.set_result(payload)
+
+    submit_job(f"task_{uuid.uuid4().hex[:8]}", job, request.user_id)
+    try:
+        payload = await result
+    except ConnectionAbortedError:
+        return Response(status_code=499) # 응답을 받을 클라이언트가 없음 (로그용 상태 코드)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reasoning failed: {e}")
+    if wire_format == "binary":
+        return Response(content=bytes(payload), media_type=BINARY_MEDIA_TYPE)
+    return payload
+
 @app.post("/request_reasoning", response_model=TaskResponse, status_code=202)
-async def request_reasoning(request: ReasoningRequest, background_tasks: BackgroundTasks):
+async def request_reasoning(request: ReasoningRequest):
     """
-    추론 요청을 접수하고, 백그라운드에서 작업을 시작합니다.
-    즉시 task_id를 반환합니다.
+    추론 요청을 작업 큐에 넣고 즉시 task_id와 대기 순번을 반환합니다.
+    큐가 가득 차면 503, 사용자별 한도를 넘으면 429를 반환합니다.
     """
     task_id = f"task_{uuid.uuid4().hex[:8]}"
-    background_tasks.add_task(run_reasoning_task, task_id, request.query)
-    return TaskResponse(task_id=task_id, status="accepted")
+    done = asyncio.Event()
+
+    async def job():
+        try:
+            await asyncio.to_thread(run_reasoning_task, task_id, request.query)
+        finally:
+            done.set()
+            _completion_events.pop(task_id, None)
+
+    position = submit_job(task_id, job, request.user_id)
+    _completion_events[task_id] = done
+    estimated_wait_s = work_queue.estimated_wait_s(position)
+    tasks.set(task_id, {"status": "queued", "queue_position": position, "estimated_wait_s": estimated_wait_s})
+    return TaskResponse(task_id=task_id, status="accepted", queue_position=position, estimated_wait_s=estimated_wait_s)
 
 @app.get("/get_result/{task_id}", response_model=ResultResponse)
-async def get_result(task_id: str):
+async def get_result(task_id: str, wait: float = 0.0):
     """
     task_id를 사용하여 작업 상태 및 결과를 조회합니다.
+    wait(초, 최대 MAX_LONG_POLL_S)를 주면 작업이 끝날 때까지 응답을 미루는 롱 폴링으로 동작하며,
+    작업이 끝나는 즉시 응답합니다. 시간 안에 끝나지 않으면 현재 상태를 반환합니다.
     """
     task = tasks.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return ResultResponse(task_id=task_id, status=task["status"], result=task.get("result"))
+    if wait > 0 and task["status"] in ("queued", "processing"):
+        task = await _wait_for_task(task_id, min(wait, MAX_LONG_POLL_S)) or task
+    queue_position = estimated_wait_s = None
+    if task["status"] == "queued":
+        queue_position = work_queue.position(task_id) or task.get("queue_position")
+        estimated_wait_s = (
+            work_queue.estimated_wait_s(queue_position) if queue_position else task.get("estimated_wait_s")
+        )
+    return ResultResponse(
+        task_id=task_id, status=task["status"], result=task.get("result"),
+        queue_position=queue_position, estimated_wait_s=estimated_wait_s
+    )
+
+async def _wait_for_task(task_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """작업이 끝나거나 timeout이 지날 때까지 기다린 뒤 작업 레코드를 다시 읽습니다."""
+    done = _completion_events.get(task_id)
+    if done is not None:
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return tasks.get(task_id)
+
+    # 다른 워커 프로세스가 실행 중인 작업: 공유 저장소를 짧은 간격으로 확인
+    deadline = time.monotonic() + timeout
+    while True:
+        task = tasks.get(task_id)
+        if task is None or task["status"] not in ("queued", "processing") or time.monotonic() >= deadline:
+            return task
+        await asyncio.sleep(LONG_POLL_STORE_INTERVAL_S)
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "engine_loaded": reasoning_engine is not None}
+    return {"status": "ok", "engine_loaded": reasoning_engine is not None, "work_queue": work_queue.stats()}
 
 # --- 로컬 테스트를 위한 실행 코드 ---
 # 이 코드는 uvicorn을 사용하여 직접 실행할 수 있습니다.
@@ -1,52 +1,57 @@
 # 파일명: main_orchestrator.py
 
 import asyncio
+import json
+import math
+import os
+import threading
 import uuid
 import time
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from contextlib import contextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
-
-# --- 서킷 브레이커 라이브러리 import ---
-# 실제 환경에서는 'pip install resilience4py' 설치가 필요합니다.
-# 여기서는 시뮬레이션을 위해 모의 객체를 사용합니다.
-try:
-    from resilience import circuit_breaker, CircuitBreaker, CircuitBreakerOpenError
-except ImportError:
-    # 라이브러리가 없을 경우를 위한 모의 객체
-    print("WARNING: 'resilience4py' not found. Using mock CircuitBreaker.")
-    class CircuitBreakerOpenError(Exception): pass
-    class CircuitBreaker:
-        def __init__(self, failure_threshold=3, recovery_timeout=30): pass
-        def __call__(self, func):
-            async def wrapper(*args, **kwargs): return await func(*args, **kwargs)
-            return wrapper
-    def circuit_breaker(failure_threshold=3, recovery_timeout=30):
-        def decorator(func):
-            async def wrapper(*args, **kwargs): return await func(*args, **kwargs)
-            return wrapper
-        return decorator
-
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Callable, Iterator, Optional, Tuple
 
 # --- 모든 컴포넌트 import ---
 # 각 모듈이 별도 파일로 존재한다고 가정
+# torch/transformers/sentence_transformers를 쓰는 모듈은 구성 요소 로더 스레드에서 import하여
+# 워커 프로세스 시작과 /health 응답이 무거운 import를 기다리지 않도록 함
 from reasoning_engine import MockHybridReasoningEngine
-from dl_are_core import DlAreCore
+from backend_pool import ReasoningWorkerPool
+from backend_client import BackendOverloadedError, RemoteReasoningBackend
+from component_loader import ComponentLoader
+from task_store import TaskStore, create_task_store
+from metrics import registry as metrics_registry
+from circuit_breaker import CircuitBreaker, CircuitBreakerOpenError, CallTimeoutError
+from work_queue import PriorityWorkQueue, QueueRejectedError, parse_user_priorities
+from result_cache import ResultCache
+from api_models import ReasoningRequest
+from drift_policy import DEFAULT_DRIFT_POLICY, DriftPolicy
 
-# --- API 데이터 모델 정의 ---
-class ReasoningRequest(BaseModel):
-    query: str
+if TYPE_CHECKING:
+    from dl_are_core import DlAreCore
+    from evg import ExpectationVectorGenerator
+    from evg_cache import ExpectationVectorCache
+    from batch_scheduler import BatchGenerationScheduler
 
+# --- API 데이터 모델 정의 ---
 class TaskResponse(BaseModel):
     task_id: str
     status: str
     message: str
+    queue_position: Optional[int] = None
+    estimated_wait_s: Optional[float] = None
 
 class ResultResponse(BaseModel):
     task_id: str
-    status: str
+    status: str # "queued", "processing", "completed", "failed"
     result: Any | None = None
     error_message: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None # 단계별 소요 시간(초)
+    cache: Optional[Dict[str, str]] = None # 단계별 캐시 결과 ("hit", "coalesced", "miss", "skipped")
+    queue_position: Optional[int] = None # status가 "queued"일 때만 채워짐
+    estimated_wait_s: Optional[float] = None
 
 # --- 시스템 전역 객체 초기화 ---
 app = FastAPI(
@@ -56,102 +61,666 @@ app = FastAPI(
 
 # 백엔드/프론트엔드 엔진 및 태스크 저장소 초기화
 # (실제 프로덕션에서는 이들을 별도의 마이크로서비스 및 Redis로 대체)
-glassbox_backend: MockHybridReasoningEngine | None = None
-dl_are_frontend: DlAreCore | None = None
-tasks: Dict[str, Any] = {}
+glassbox_backend: MockHybridReasoningEngine | ReasoningWorkerPool | RemoteReasoningBackend | None = None
+dl_are_frontend: "DlAreCore | None" = None
+generation_scheduler: "BatchGenerationScheduler | None" = None
+evg_cache: "ExpectationVectorCache | None" = None
+
+# 시작 모드: "blocking"(기본, 모든 구성 요소를 로드한 뒤 요청을 받음) 또는
+# "background"(즉시 요청을 받고 구성 요소는 백그라운드에서 병렬 로드, 준비 전 요청은 503)
+STARTUP_MODE = os.getenv("CGA_STARTUP_MODE", "blocking")
+# 생성 모델 스냅샷 경로. 지정하면 첫 시작 때 저장하고 이후 from_pretrained 대신 스냅샷에서 로드
+GENERATOR_MODEL_NAME = "gpt2"
+GENERATOR_SNAPSHOT_PATH: Optional[str] = os.getenv("CGA_MODEL_SNAPSHOT")
+components = ComponentLoader()
+
+# 작업 저장소 (CGA_TASK_STORE=sqlite로 설정하면 여러 uvicorn 워커가 결과를 공유)
+tasks: TaskStore = create_task_store(
+    os.getenv("CGA_TASK_STORE", "memory"),
+    path=os.getenv("CGA_TASK_STORE_PATH", "cga_orchestrator_tasks.db"),
+    ttl_seconds=float(os.getenv("CGA_TASK_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("CGA_TASK_MAX_ENTRIES", "10000")),
+)
+
+# 백엔드 실행 모드: "thread"(기본, 프로세스 내 엔진), "process"(엔진을 미리 로드한 워커 프로세스 풀),
+# "remote"(별도 서비스로 실행 중인 main_backend를 keep-alive HTTP 연결 풀로 호출, 두 계층을 따로 확장)
+# process/remote 모드에서는 GPE 페이로드를 바이너리 형식(gpe_bin_v1) 바이트열로 받아 그대로 디코딩합니다.
+BACKEND_MODE = os.getenv("CGA_BACKEND_MODE", "thread")
+BACKEND_PROCESS_WORKERS = int(os.getenv("CGA_BACKEND_WORKERS", str(os.cpu_count() or 2)))
+BACKEND_URL = os.getenv("CGA_BACKEND_URL", "http://127.0.0.1:8001")
+# 원격 결과 수신 방식: "sync"(POST /reason 한 번으로 대기) 또는 "long_poll"(제출 후 GET /get_result?wait=...)
+BACKEND_RESULT_MODE = os.getenv("CGA_BACKEND_RESULT_MODE", "sync")
+BACKEND_MAX_CONNECTIONS = int(os.getenv("CGA_BACKEND_MAX_CONNECTIONS", "64"))
+
+# 배치 생성 스케줄러 설정 (처리량/지연 트레이드오프)
+GENERATION_MAX_BATCH_SIZE = 8
+GENERATION_MAX_WAIT_MS = 10.0
+
+# CPU 추론 정밀도 (precision.py): "fp32"(기본), "int8"(Linear 동적 양자화), "bf16"(bf16 가속 CPU에서만, 아니면 fp32)
+GENERATOR_PRECISION = os.getenv("CGA_GENERATOR_PRECISION", "fp32")
+EVG_PRECISION = os.getenv("CGA_EVG_PRECISION", "fp32")
+# 프로세스(uvicorn 워커)별 torch 스레드 수. 워커를 여러 개 띄우면 (코어 수 / 워커 수)로 설정 (0: torch 기본값)
+TORCH_NUM_THREADS = int(os.getenv("CGA_TORCH_THREADS", "0"))
+# 저정밀도 사용 시 시작할 때 fp32 대비 정확도를 점검하고, 기준(precision_guard.py) 미달이면 fp32로 되돌림
+PRECISION_GUARD = os.getenv("CGA_PRECISION_GUARD") == "1"
+precision_report: Optional[Dict[str, Any]] = None # 정확도 점검 결과 (/health)
+
+# 폴백 페이로드 생성 방식: "greedy"(Drift-Loop 없이 탐욕 디코딩) 또는 "embed"(raw_context 임베딩)
+FALLBACK_GENERATION_MODE = os.getenv("CGA_FALLBACK_MODE", "greedy")
+
+# 기대 벡터 캐시 설정 (CGA_EVG_CACHE_PATH를 지정하면 <경로>.f32/<경로>.index.jsonl에 저장하여 재시작 후에도 캐시 유지)
+# 디스크 캐시 경로는 프로세스 하나만 사용할 수 있음. uvicorn 워커를 여러 개 띄우면 잠금을 얻은 워커만 디스크 계층을 쓰고
+# 나머지는 메모리 계층만 사용 (워커별로 다른 경로를 지정하려면 워커마다 다른 환경 변수로 실행)
+EVG_CACHE_MAX_BYTES = int(os.getenv("CGA_EVG_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EVG_CACHE_TTL_SECONDS = float(os.getenv("CGA_EVG_CACHE_TTL_SECONDS", "3600"))
+EVG_CACHE_DISK_PATH: Optional[str] = os.getenv("CGA_EVG_CACHE_PATH") or None
+
+# 생성 길이 (결과 캐시 키에 포함)
+GENERATION_MAX_NEW_TOKENS = 100
+
+# 쿼리 결과 캐시: 백엔드 추론과 생성은 쿼리에 대해 결정적이므로 같은 쿼리의 결과를 재사용합니다.
+# GPE 페이로드 단계와 최종 생성 단계를 따로 캐시하며, 동시에 들어온 같은 쿼리는 한 번만 실행합니다.
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("CGA_RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("CGA_RESULT_CACHE_TTL_SECONDS", "600"))
+gpe_cache = ResultCache(max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+result_cache = ResultCache(max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+
+# 백엔드 서킷 브레이커 설정
+# 최근 BREAKER_WINDOW_SIZE번 중 BREAKER_FAILURE_THRESHOLD번 실패(예외, 시간 초과, 느린 호출)하면 열리고,
+# 열린 동안에는 백엔드를 기다리지 않고 즉시 폴백 페이로드로 응답합니다.
+# 원격 백엔드의 부하 차단 응답(429/503)은 장애가 아니므로 실패로 집계하지 않고 폴백으로만 응답합니다.
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_WINDOW_SIZE = 20
+BREAKER_RECOVERY_TIMEOUT = 60.0
+BACKEND_CALL_TIMEOUT_S = float(os.getenv("CGA_BACKEND_TIMEOUT_S", "10.0"))
+BACKEND_SLOW_CALL_S = float(os.getenv("CGA_BACKEND_SLOW_CALL_S", "5.0"))
+# 헤지 요청: 호출이 최근 성공 지연의 p95를 넘기면 같은 요청을 한 번 더 보냄 (CGA_BACKEND_HEDGE=1)
+BACKEND_HEDGE_QUANTILE: Optional[float] = 0.95 if os.getenv("CGA_BACKEND_HEDGE") == "1" else None
+
+backend_breaker = CircuitBreaker(
+    failure_threshold=BREAKER_FAILURE_THRESHOLD, recovery_timeout=BREAKER_RECOVERY_TIMEOUT,
+    window_size=BREAKER_WINDOW_SIZE, call_timeout=BACKEND_CALL_TIMEOUT_S,
+    slow_call_threshold=BACKEND_SLOW_CALL_S, hedge_quantile=BACKEND_HEDGE_QUANTILE,
+    ignored_exceptions=(BackendOverloadedError,),
+)
+
+# 작업 큐 (요청 수락 제어). 워커 수는 생성 배치가 채워질 수 있도록 배치 크기에 맞춤.
+# CGA_USER_PRIORITIES="alice:0,batch_job:2" (작을수록 먼저 처리, 기본 1)
+work_queue = PriorityWorkQueue(
+    num_workers=int(os.getenv("CGA_QUEUE_WORKERS", str(GENERATION_MAX_BATCH_SIZE))),
+    max_depth=int(os.getenv("CGA_QUEUE_MAX_DEPTH", "64")),
+    max_per_user=int(os.getenv("CGA_QUEUE_MAX_PER_USER", "16")),
+    user_priorities=parse_user_priorities(os.getenv("CGA_USER_PRIORITIES", "")),
+    on_job_failed=lambda task_id, message: tasks.set(task_id, {"status": "failed", "result": message}),
+)
+
+# --- 메트릭 (/metrics) ---
+STAGE_LATENCY = metrics_registry.histogram("cga_stage_latency_seconds", "Pipeline stage latency in seconds")
+TOKENS_GENERATED = metrics_registry.histogram(
+    "cga_tokens_generated", "Tokens generated per request", buckets=(1, 5, 10, 25, 50, 75, 100, 200)
+)
+REPROJECTION_EVENTS = metrics_registry.histogram(
+    "cga_reprojection_events", "Drift-Loop reprojection events per request", buckets=(0, 1, 5, 10, 25, 50, 100)
+)
+QUEUE_DEPTH = metrics_registry.histogram(
+    "cga_generation_queue_depth", "Generation queue depth observed at submit", buckets=(0, 1, 2, 4, 8, 16, 32, 64)
+)
+TASKS_TOTAL = metrics_registry.counter("cga_tasks_total", "Finished pipeline tasks by status")
+BACKEND_FALLBACKS = metrics_registry.counter("cga_backend_fallbacks_total", "Requests served in fallback mode by reason")
+metrics_registry.gauge("cga_backend_breaker_open", "1 if the backend circuit breaker is not closed",
+                       lambda: float(backend_breaker.state != "closed"))
+CACHE_LOOKUPS = metrics_registry.counter("cga_result_cache_lookups_total", "Result cache lookups by stage and outcome")
+REQUESTS_SHED = metrics_registry.counter("cga_requests_shed_total", "Requests rejected by admission control")
+metrics_registry.gauge("cga_work_queue_depth", "Tasks waiting in the work queue", lambda: work_queue.stats()["depth"])
+metrics_registry.gauge("cga_work_queue_busy", "Work queue workers running a task", lambda: work_queue.stats()["busy_workers"])
+DECODE_STEP_LATENCY = metrics_registry.histogram(
+    "cga_decode_step_seconds", "Decode step latency in seconds (CGA_PROFILE_DECODE=1)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+)
+
+# --- 구성 요소 로더 (의존 관계가 없는 것끼리 병렬 로드) ---
+#   backend ─────────────────────────────┐
+#   evg ──────────────┬─> frontend ─> scheduler
+#   generator_model ──┘
+def _load_backend():
+    global glassbox_backend
+    if BACKEND_MODE == "process":
+        # 브레이커가 호출을 포기한 뒤에도 워커를 기다리는 스레드가 남지 않도록 같은 시간 예산을 적용
+        glassbox_backend = ReasoningWorkerPool(
+            num_workers=BACKEND_PROCESS_WORKERS, task_timeout=BACKEND_CALL_TIMEOUT_S
+        ).start()
+    elif BACKEND_MODE == "remote":
+        # 연결은 첫 호출 때 맺어지며, 백엔드가 아직 떠 있지 않아도 서킷 브레이커/폴백이 처리
+        glassbox_backend = RemoteReasoningBackend(
+            BACKEND_URL, result_mode=BACKEND_RESULT_MODE, max_connections=BACKEND_MAX_CONNECTIONS
+        )
+    else:
+        glassbox_backend = MockHybridReasoningEngine()
+    return glassbox_backend
+
+def _load_evg() -> "ExpectationVectorGenerator":
+    global evg_cache
+    from evg import ExpectationVectorGenerator
+    from evg_cache import ExpectationVectorCache
+    evg_cache = ExpectationVectorCache(
+        max_bytes=EVG_CACHE_MAX_BYTES, ttl_seconds=EVG_CACHE_TTL_SECONDS, disk_path=EVG_CACHE_DISK_PATH
+    )
+    # 정확도 점검을 하면 fp32 인코더를 기준으로 남겨 두고 저정밀도 사본은 frontend 로드 때 만듦
+    return ExpectationVectorGenerator(cache=evg_cache, precision="fp32" if PRECISION_GUARD else EVG_PRECISION)
+
+def _load_generator_model():
+    from dl_are_core import load_generator_model
+    return load_generator_model(GENERATOR_MODEL_NAME, snapshot_path=GENERATOR_SNAPSHOT_PATH)
+
+def _load_frontend(evg: "ExpectationVectorGenerator", generator) -> "DlAreCore":
+    global dl_are_frontend
+    from dl_are_core import DlAreCore
+    tokenizer, model = generator
+    if PRECISION_GUARD and (GENERATOR_PRECISION != "fp32" or EVG_PRECISION != "fp32"):
+        dl_are_frontend = _build_guarded_frontend(evg, tokenizer, model)
+    else:
+        dl_are_frontend = DlAreCore(
+            model_name=GENERATOR_MODEL_NAME, tokenizer=tokenizer, model=model, evg=evg,
+            fallback_mode=FALLBACK_GENERATION_MODE, precision=GENERATOR_PRECISION
+        )
+    if os.getenv("CGA_PROFILE_DECODE") == "1":
+        set_decode_profiling_hook(_observe_decode_step)
+    return dl_are_frontend
+
+def _build_guarded_frontend(evg: "ExpectationVectorGenerator", tokenizer, model) -> "DlAreCore":
+    """fp32 기준 엔진과 저정밀도 엔진의 정확도를 비교하여, 기준을 통과하면 저정밀도 엔진을 사용합니다."""
+    global precision_report
+    import copy
+    from dl_are_core import DlAreCore
+    from evg import ExpectationVectorGenerator
+    from precision_guard import compare_precision
+
+    # 저정밀도 변환은 모델/인코더를 제자리에서 바꾸므로 기준 엔진은 사본을 사용
+    reference = DlAreCore(
+        model_name=GENERATOR_MODEL_NAME, tokenizer=tokenizer,
+        model=copy.deepcopy(model) if GENERATOR_PRECISION != "fp32" else model,
+        evg=evg, fallback_mode=FALLBACK_GENERATION_MODE
+    )
+    candidate_evg = evg
+    if EVG_PRECISION != "fp32":
+        candidate_evg = ExpectationVectorGenerator(
+            evg.model_name, evg.device, cache=evg.cache, encoder=copy.deepcopy(evg.encoder), precision=EVG_PRECISION
+        )
+    candidate = DlAreCore(
+        model_name=GENERATOR_MODEL_NAME, tokenizer=tokenizer, model=model, evg=candidate_evg,
+        fallback_mode=FALLBACK_GENERATION_MODE, precision=GENERATOR_PRECISION
+    )
+
+    precision_report = compare_precision(reference, candidate)
+    print(f"🔹 [Precision] generator={precision_report['generator_precision']}, evg={precision_report['evg_precision']}: "
+          f"cosine(min)={precision_report['expectation_cosine']['min']:.4f}, "
+          f"token agreement={precision_report['token_agreement']['mean']:.3f}, speedup={precision_report['speedup']}")
+    if precision_report["passed"]:
+        return candidate
+    print("🚨 [Precision] 정확도 기준 미달. fp32 엔진을 사용합니다.")
+    return reference
+
+def _load_scheduler(frontend: "DlAreCore") -> "BatchGenerationScheduler":
+    global generation_scheduler
+    from batch_scheduler import BatchGenerationScheduler
+    scheduler = BatchGenerationScheduler(
+        frontend, max_batch_size=GENERATION_MAX_BATCH_SIZE, max_wait_ms=GENERATION_MAX_WAIT_MS
+    )
+    scheduler.start()
+    generation_scheduler = scheduler
+    return scheduler
+
+components.register("backend", _load_backend)
+components.register("evg", _load_evg)
+components.register("generator_model", _load_generator_model)
+components.register("frontend", _load_frontend, depends_on=("evg", "generator_model"))
+components.register("scheduler", _load_scheduler, depends_on=("frontend",))
 
 @app.on_event("startup")
 def startup_event():
-    """애플리케이션 시작 시 모든 핵심 엔진을 로드합니다."""
-    global glassbox_backend, dl_are_frontend
-    print("✅ CGA-Enterprise Orchestrator 초기화 시작...")
-    glassbox_backend = MockHybridReasoningEngine()
-    dl_are_frontend = DlAreCore(model_name="gpt2")
+    """
+    애플리케이션 시작 시 핵심 엔진을 병렬로 로드합니다.
+    STARTUP_MODE가 "background"이면 로드 완료를 기다리지 않고 바로 요청을 받습니다. (/health/ready로 확인)
+    """
+    print(f"✅ CGA-Enterprise Orchestrator 초기화 시작... (startup mode: {STARTUP_MODE})")
+    if TORCH_NUM_THREADS:
+        from precision import configure_threads
+        configure_threads(TORCH_NUM_THREADS)
+    components.start()
+    work_queue.start()
+
+    metrics_registry.gauge("cga_evg_cache_hit_rate", "Expectation vector cache hit rate",
+                           lambda: evg_cache.stats()["hit_rate"])
+    metrics_registry.gauge("cga_generation_pending", "Requests waiting to join the generation batch",
+                           lambda: generation_scheduler.stats()["pending_requests"])
+    metrics_registry.gauge("cga_generation_active", "Sequences in the running generation batch",
+                           lambda: generation_scheduler.stats()["active_sequences"])
+    if STARTUP_MODE == "background":
+        print("🔹 구성 요소를 백그라운드에서 로드합니다. 준비 상태는 /health에서 확인할 수 있습니다.")
+        return
+    components.wait()
+    if components.has_failures():
+        raise RuntimeError(f"Component loading failed: {components.status()}")
     print("✅ 모든 컴포넌트가 성공적으로 로드되었습니다.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """애플리케이션 종료 시 작업 큐와 배치 스케줄러를 정리하고 기대 벡터 디스크 캐시를 flush합니다."""
+    await work_queue.stop()
+    if generation_scheduler is not None:
+        generation_scheduler.stop()
+    if evg_cache is not None:
+        evg_cache.close()
+    if isinstance(glassbox_backend, ReasoningWorkerPool):
+        glassbox_backend.close()
+    elif isinstance(glassbox_backend, RemoteReasoningBackend):
+        await glassbox_backend.aclose()
+
+# --- 계측 ---
+@contextmanager
+def stage_timer(timings: Dict[str, float], stage: str) -> Iterator[None]:
+    """블록 실행 시간을 timings[stage]와 단계 지연 히스토그램에 기록합니다."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[stage] = elapsed
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+
+def _observe_session_timings(timings: Dict[str, float]):
+    """DlAreCore.create_session이 기록한 하위 단계 시간을 히스토그램에 반영합니다."""
+    for stage in ("gpe_decode", "evg_embedding"):
+        if stage in timings:
+            STAGE_LATENCY.observe(timings[stage], stage=stage)
+
+def _observe_generation(result: Dict[str, Any]):
+    stats = result.get("generation_stats", {})
+    TOKENS_GENERATED.observe(stats.get("total_tokens", 0))
+    REPROJECTION_EVENTS.observe(stats.get("reprojection_events", 0))
+
+def _observe_decode_step(step: Dict[str, Any]):
+    DECODE_STEP_LATENCY.observe(step["duration_s"], source=step.get("source", "unknown"))
+
+def set_decode_profiling_hook(hook: Optional[Callable[[Dict[str, Any]], None]]):
+    """디코드 루프의 스텝마다 호출될 프로파일링 콜백을 설정합니다. (None이면 해제)"""
+    if dl_are_frontend is None:
+        raise RuntimeError("DL-ARE frontend is not loaded yet.")
+    dl_are_frontend.profiling_hook = hook
+
+def _finish_task(task_id: str, status: str, result: Any, timings: Dict[str, float], pipeline_start: float,
+                 cache_status: Optional[Dict[str, str]] = None):
+    """작업의 최종 상태와 단계별 시간, 캐시 적중 여부를 저장합니다."""
+    timings["total"] = time.perf_counter() - pipeline_start
+    STAGE_LATENCY.observe(timings["total"], stage="total")
+    TASKS_TOTAL.inc(status=status)
+    tasks.set(task_id, {"status": status, "result": result, "timings": timings, "cache": cache_status or {}})
+
+def require_ready():
+    """구성 요소가 아직 로드 중이면 503으로 거부합니다. (background 시작 모드)"""
+    if not components.is_ready():
+        REQUESTS_SHED.inc(status=503)
+        raise HTTPException(
+            status_code=503, detail=f"Service is starting. Components not ready: {components.not_ready()}",
+            headers={"Retry-After": "5"}
+        )
+
+def admit_job(task_id: str, user_id: Optional[str], job: Callable[[], Any]) -> int:
+    """
+    작업을 우선순위 큐에 넣고 대기 순번을 반환합니다.
+    큐가 가득 찼거나 사용자별 한도를 넘으면 Retry-After 헤더와 함께 429/503으로 거부합니다.
+    """
+    require_ready()
+    try:
+        return work_queue.submit(task_id, job, user_id=user_id)
+    except QueueRejectedError as e:
+        REQUESTS_SHED.inc(status=e.status_code)
+        print(f"🚫 [Admission] 요청 거부 ({e.status_code}): {e}")
+        raise HTTPException(
+            status_code=e.status_code, detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after_s)))}
+        )
+
+def enqueue_task(task_id: str, user_id: Optional[str], job: Callable[[], Any]) -> int:
+    """admit_job으로 작업을 큐에 넣고, 결과 조회(/results)용 대기 상태를 저장합니다."""
+    position = admit_job(task_id, user_id, job)
+    tasks.set(task_id, {
+        "status": "queued", "queue_position": position,
+        "estimated_wait_s": work_queue.estimated_wait_s(position)
+    })
+    return position
+
 # --- 서킷 브레이커가 적용된 백엔드 호출 함수 ---
-@circuit_breaker(failure_threshold=3, recovery_timeout=60)
-async def call_backend_with_breaker(query: str) -> Dict[str, Any]:
+@backend_breaker
+async def call_backend_with_breaker(query: str, user_id: Optional[str] = None) -> Dict[str, Any]:
     """
     서킷 브레이커를 통해 백엔드 추론 엔진을 호출합니다.
-    장애 발생 시 CircuitBreakerOpenError를 발생시킵니다.
+    브레이커가 열려 있으면 CircuitBreakerOpenError, 시간 예산을 넘기면 CallTimeoutError,
+    원격 백엔드가 부하 차단(429/503)으로 거부하면 BackendOverloadedError를 발생시킵니다.
     """
     print("📞 [CircuitBreaker] 백엔드 서비스 호출 시도...")
-    # asyncio.to_thread를 사용하여 동기 함수를 비동기 이벤트 루프에서 안전하게 실행
-    gpe_payload = await asyncio.to_thread(glassbox_backend.reason, query)
+    if isinstance(glassbox_backend, RemoteReasoningBackend):
+        # 원격 호출은 이벤트 루프에서 직접 대기 (시간 초과/헤지 취소 시 요청도 함께 취소됨)
+        # 요청 사용자를 그대로 전달하여 백엔드의 사용자별 한도가 사용자 단위로 적용되도록 함
+        gpe_payload = await glassbox_backend.reason(query, user_id=user_id)
+    else:
+        # asyncio.to_thread를 사용하여 동기 함수를 비동기 이벤트 루프에서 안전하게 실행
+        # (process 모드에서는 스레드가 유휴 워커 프로세스의 응답을 기다리기만 하므로 GIL을 점유하지 않음)
+        gpe_payload = await asyncio.to_thread(glassbox_backend.reason, query)
     print("👍 [CircuitBreaker] 백엔드 서비스 호출 성공.")
     return gpe_payload
 
+def build_fallback_payload(query: str, reason: str = "Backend service unavailable") -> Dict[str, Any]:
+    """GPE의 부재를 알리는 폴백 페이로드를 생성합니다."""
+    return {
+        "payload_type": "fallback_v1.0",
+        "generative_payload": {
+            "raw_context": f"System is under high load. Providing a direct answer for: {query}"
+        },
+        "metadata": {"reason": reason}
+    }
+
+def _fallback_reason(error: Exception) -> str:
+    if isinstance(error, CallTimeoutError):
+        BACKEND_FALLBACKS.inc(reason="timeout")
+        return "Backend call timed out"
+    if isinstance(error, BackendOverloadedError):
+        BACKEND_FALLBACKS.inc(reason="backend_overloaded")
+        return "Backend service is overloaded"
+    BACKEND_FALLBACKS.inc(reason="breaker_open")
+    return "Backend service unavailable"
+
 # --- 비동기 파이프라인 작업 함수 ---
-async def run_full_pipeline_task(task_id: str, query: str):
+class PipelineStageError(Exception):
+    """파이프라인 단계 실패. 메시지는 그대로 작업 결과(error_message)로 저장됩니다."""
+
+def _result_cache_key(query: str, policy: DriftPolicy) -> Tuple[Any, ...]:
+    """최종 결과 캐시 키. 결과를 바꾸는 생성 설정은 모두 키에 포함해야 합니다."""
+    return (query, GENERATION_MAX_NEW_TOKENS, policy.cache_key())
+
+def drift_policy_for(request: ReasoningRequest) -> DriftPolicy:
+    """요청의 config_overrides로 Drift-Loop 정책을 만듭니다. 잘못된 값은 422로 거부합니다."""
+    try:
+        return DriftPolicy.from_overrides(request.config_overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid config_overrides: {e}")
+
+def _is_cacheable_result(result: Dict[str, Any]) -> bool:
+    # 폴백 응답은 백엔드가 복구되면 달라지므로 저장하지 않음 (동시 대기 요청과는 공유)
+    return not result.get("fallback", False)
+
+async def fetch_gpe_payload(query: str, user_id: Optional[str] = None) -> Tuple[Any, str]:
+    """GPE 페이로드 캐시를 거쳐 백엔드를 호출합니다. 같은 쿼리의 동시 호출은 하나로 합쳐집니다."""
+    payload, source = await gpe_cache.get_or_compute(query, lambda: call_backend_with_breaker(query, user_id))
+    CACHE_LOOKUPS.inc(stage="gpe", outcome=source)
+    return payload, source
+
+async def _run_pipeline_stages(task_id: str, query: str, timings: Dict[str, float],
+                               cache_status: Dict[str, str], policy: DriftPolicy,
+                               user_id: Optional[str] = None) -> Dict[str, Any]:
     """
-    백그라운드에서 전체 파이프라인을 실행하며, 서킷 브레이커를 통한 장애 복구를 포함합니다.
+    백엔드 추론(GPE) -> 세션 생성 -> 배치 생성 단계를 실행하고 최종 결과를 반환합니다.
+    Drift-Loop가 꺼진 정책이면 기대 벡터가 필요 없으므로 백엔드 호출을 생략합니다.
     """
-    print(f"🔹 [Task: {task_id}] 전체 파이프라인 시작...")
-    tasks[task_id] = {"status": "processing", "stage": "backend_reasoning"}
-    
     gpe_payload = None
     is_fallback = False
     
     try:
-        # 1. 서킷 브레이커를 통해 백엔드 호출
-        gpe_payload = await call_backend_with_breaker(query)
-        print(f"   [Task: {task_id}] 백엔드 추론 및 GPE 인코딩 완료.")
+        if not policy.enabled:
+            cache_status["gpe"] = "skipped"
+            print(f"   [Task: {task_id}] Drift-Loop 비활성 요청. 백엔드 추론을 생략합니다.")
+        else:
+            # 1. 서킷 브레이커를 통해 백엔드 호출 (GPE 캐시 적중 시 생략)
+            with stage_timer(timings, "backend_reasoning"):
+                gpe_payload, cache_status["gpe"] = await fetch_gpe_payload(query, user_id)
+            print(f"   [Task: {task_id}] 백엔드 추론 및 GPE 인코딩 완료. (cache: {cache_status['gpe']})")
 
-    except CircuitBreakerOpenError:
-        print(f"🚨 [Task: {task_id}] 서킷 브레이커가 열렸습니다! 백엔드 장애 감지.")
+    except (CircuitBreakerOpenError, CallTimeoutError, BackendOverloadedError) as e:
+        print(f"🚨 [Task: {task_id}] 백엔드 장애 감지 ({e}) 폴백 모드로 전환합니다.")
         is_fallback = True
         # 2. 폴백(Fallback) 메커니즘: GPE 없이 단순 컨텍스트 생성
         # GPE의 부재를 알리는 특별한 페이로드 생성
-        gpe_payload = {
-            "payload_type": "fallback_v1.0",
-            "generative_payload": {
-                "raw_context": f"System is under high load. Providing a direct answer for: {query}"
-            },
-            "metadata": {"reason": "Backend service unavailable"}
-        }
+        gpe_payload = build_fallback_payload(query, _fallback_reason(e))
         print(f"   [Task: {task_id}] 폴백 GPE 페이로드 생성 완료.")
 
     except Exception as e:
         # 기타 예외 처리
-        error_message = f"Unhandled error in backend: {e}"
-        tasks[task_id] = {"status": "failed", "result": error_message}
         print(f"❌ [Task: {task_id}] 백엔드 작업 중 심각한 오류 발생: {e}")
-        return
+        raise PipelineStageError(f"Unhandled error in backend: {e}") from e
 
     # 3. 프론트엔드 제어기 실행
-    tasks[task_id]["stage"] = "frontend_generation"
+    tasks.update(task_id, stage="frontend_generation", timings=timings)
     try:
         # DL-ARE는 GPE 페이로드의 타입에 따라 다르게 초기화됨
-        await asyncio.to_thread(dl_are_frontend.initialize_with_gpe, gpe_payload)
+        # (요청 전용 세션을 사용하므로 동시 요청 간에 제어 상태가 섞이지 않음)
+        session = await asyncio.to_thread(dl_are_frontend.create_session, gpe_payload, timings, policy)
+        _observe_session_timings(timings)
         
-        # 제어된 텍스트 생성
-        final_result = await asyncio.to_thread(
-            dl_are_frontend.generate_controlled_text, prompt=query, max_new_tokens=100
+        # 제어된 텍스트 생성 (다른 요청들과 하나의 배치로 묶여 디코딩됨)
+        QUEUE_DEPTH.observe(generation_scheduler.stats()["pending_requests"])
+        with stage_timer(timings, "generation"):
+            final_result = await asyncio.wrap_future(
+                generation_scheduler.submit(query, session, max_new_tokens=GENERATION_MAX_NEW_TOKENS)
+            )
+        _observe_generation(final_result)
+    except Exception as e:
+        print(f"❌ [Task: {task_id}] 프론트엔드 작업 실패: {e}")
+        raise PipelineStageError(f"Error during frontend generation: {e}") from e
+
+    if is_fallback:
+        final_result["fallback"] = True
+        final_result["notes"] = "This response was generated in fallback mode due to backend issues."
+    print(f"   [Task: {task_id}] 프론트엔드 제어 생성 완료.")
+    return final_result
+
+async def run_full_pipeline_task(task_id: str, query: str, enqueued_at: Optional[float] = None,
+                                 policy: DriftPolicy = DEFAULT_DRIFT_POLICY, user_id: Optional[str] = None):
+    """
+    백그라운드에서 전체 파이프라인을 실행하며, 서킷 브레이커를 통한 장애 복구를 포함합니다.
+    enqueued_at(time.perf_counter 기준)이 주어지면 작업 큐 대기 시간도 기록합니다.
+    같은 쿼리/Drift-Loop 정책의 최종 결과가 캐시에 있거나 이미 실행 중이면 그 결과를 재사용합니다.
+    """
+    print(f"🔹 [Task: {task_id}] 전체 파이프라인 시작...")
+    tasks.set(task_id, {"status": "processing", "stage": "backend_reasoning"})
+    
+    timings: Dict[str, float] = {}
+    cache_status: Dict[str, str] = {}
+    pipeline_start = time.perf_counter()
+    if enqueued_at is not None:
+        timings["queue_wait"] = pipeline_start - enqueued_at
+        STAGE_LATENCY.observe(timings["queue_wait"], stage="queue_wait")
+
+    try:
+        final_result, cache_status["result"] = await result_cache.get_or_compute(
+            _result_cache_key(query, policy),
+            lambda: _run_pipeline_stages(task_id, query, timings, cache_status, policy, user_id),
+            cacheable=_is_cacheable_result,
         )
-        if is_fallback:
-            final_result["notes"] = "This response was generated in fallback mode due to backend issues."
-            
-        print(f"   [Task: {task_id}] 프론트엔드 제어 생성 완료.")
-        tasks[task_id] = {"status": "completed", "result": final_result}
-        print(f"✅ [Task: {task_id}] 모든 작업 완료. 최종 결과가 저장되었습니다.")
+    except PipelineStageError as e:
+        _finish_task(task_id, "failed", str(e), timings, pipeline_start, cache_status)
+        return
+    except Exception as e:
+        _finish_task(task_id, "failed", f"Unhandled pipeline error: {e}", timings, pipeline_start, cache_status)
+        print(f"❌ [Task: {task_id}] 파이프라인 실패: {e}")
+        return
+
+    CACHE_LOOKUPS.inc(stage="result", outcome=cache_status["result"])
+    # 캐시/공유된 결과 객체는 다른 요청과 공유되므로 복사해서 저장
+    _finish_task(task_id, "completed", dict(final_result), timings, pipeline_start, cache_status)
+    print(f"✅ [Task: {task_id}] 모든 작업 완료. 최종 결과가 저장되었습니다. (cache: {cache_status['result']})")
+
+# --- 스트리밍 파이프라인 ---
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Server-Sent Events 형식의 메시지 한 건을 만듭니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_full_pipeline(task_id: str, query: str, policy: DriftPolicy = DEFAULT_DRIFT_POLICY,
+                               user_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    전체 파이프라인을 실행하면서 단계 전환과 생성 토큰을 SSE 이벤트로 즉시 내보냅니다.
+    토큰 생성은 요청 전용 세션으로 워커 스레드에서 실행되며, 클라이언트가 연결을 끊으면 중단됩니다.
+    """
+    print(f"🔹 [Task: {task_id}] 스트리밍 파이프라인 시작...")
+    cache_key = _result_cache_key(query, policy)
+    cached_result = result_cache.get(cache_key)
+    if cached_result is not None:
+        # 같은 쿼리의 최종 결과가 캐시에 있으면 생성 없이 바로 완료 이벤트를 보냄
+        CACHE_LOOKUPS.inc(stage="result", outcome="hit")
+        yield _sse_event("done", {**cached_result, "cache": {"result": "hit"}})
+        return
+    yield _sse_event("stage", {"task_id": task_id, "stage": "backend_reasoning"})
 
+    is_fallback = False
+    timings: Dict[str, float] = {}
+    cache_status: Dict[str, str] = {}
+    gpe_payload = None
+    try:
+        if not policy.enabled: # Drift-Loop 비활성: 기대 벡터가 필요 없으므로 백엔드 호출 생략
+            cache_status["gpe"] = "skipped"
+        else:
+            with stage_timer(timings, "backend_reasoning"):
+                gpe_payload, cache_status["gpe"] = await fetch_gpe_payload(query, user_id)
+    except (CircuitBreakerOpenError, CallTimeoutError, BackendOverloadedError) as e:
+        print(f"🚨 [Task: {task_id}] 백엔드 장애 감지 ({e}) 폴백 모드로 스트리밍합니다.")
+        is_fallback = True
+        gpe_payload = build_fallback_payload(query, _fallback_reason(e))
     except Exception as e:
-        error_message = f"Error during frontend generation: {e}"
-        tasks[task_id] = {"status": "failed", "result": error_message}
-        print(f"❌ [Task: {task_id}] 프론트엔드 작업 실패: {e}")
+        print(f"❌ [Task: {task_id}] 백엔드 작업 중 심각한 오류 발생: {e}")
+        yield _sse_event("error", {"task_id": task_id, "error_message": f"Unhandled error in backend: {e}"})
+        return
+
+    yield _sse_event("stage", {"task_id": task_id, "stage": "frontend_generation", "fallback": is_fallback})
+    try:
+        session = await asyncio.to_thread(dl_are_frontend.create_session, gpe_payload, timings, policy)
+        _observe_session_timings(timings)
+    except Exception as e:
+        yield _sse_event("error", {"task_id": task_id, "error_message": f"Error during frontend generation: {e}"})
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+    finished = object()
+
+    def produce():
+        try:
+            for event in dl_are_frontend.stream_controlled_text(
+                query, max_new_tokens=GENERATION_MAX_NEW_TOKENS, session=session
+            ):
+                if cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                print(f"❌ [Task: {task_id}] 스트리밍 생성 실패: {item}")
+                yield _sse_event("error", {"task_id": task_id, "error_message": f"Error during frontend generation: {item}"})
+                break
+            event_type = item.pop("type")
+            if event_type == "done":
+                _observe_generation(item)
+                if is_fallback:
+                    item["fallback"] = True
+                    item["notes"] = "This response was generated in fallback mode due to backend issues."
+                else:
+                    result_cache.put(cache_key, dict(item))
+                item["timings"] = timings
+                item["cache"] = cache_status
+            yield _sse_event(event_type, item)
+        print(f"✅ [Task: {task_id}] 스트리밍 완료.")
+    finally:
+        # 클라이언트 연결 종료 시 생성 스레드도 다음 스텝에서 중단
+        cancelled.set()
+
+
+async def _pump_stream(task_id: str, events: AsyncIterator[str], sink: asyncio.Queue,
+                       disconnected: asyncio.Event):
+    """
+    작업 큐 워커에서 스트리밍 파이프라인을 실행하고 SSE 메시지를 응답 쪽 큐(sink)로 넘깁니다.
+    스트림은 끝날 때까지 워커 하나를 차지하므로 동시 디코딩 수가 큐 워커 수로 제한됩니다.
+    대기 중에 클라이언트가 떠났으면 파이프라인을 시작하지 않습니다.
+    """
+    try:
+        if disconnected.is_set():
+            return
+        async for message in events:
+            sink.put_nowait(message)
+            if disconnected.is_set():
+                break
+    except Exception as e:
+        print(f"❌ [Task: {task_id}] 스트리밍 파이프라인 실패: {e}")
+        sink.put_nowait(_sse_event("error", {"task_id": task_id, "error_message": f"Unhandled pipeline error: {e}"}))
+    finally:
+        await events.aclose() # 생성 스레드 중단 (stream_full_pipeline의 finally)
+        sink.put_nowait(None)
 
+async def _relay_stream(task_id: str, position: int, sink: asyncio.Queue,
+                        disconnected: asyncio.Event) -> AsyncIterator[str]:
+    """대기 순번 이벤트를 먼저 보낸 뒤 워커가 넘겨주는 SSE 메시지를 클라이언트로 전달합니다."""
+    try:
+        yield _sse_event("queued", {
+            "task_id": task_id, "queue_position": position,
+            "estimated_wait_s": work_queue.estimated_wait_s(position)
+        })
+        while True:
+            message = await sink.get()
+            if message is None:
+                break
+            yield message
+    finally:
+        disconnected.set()
 
 # --- API 엔드포인트 ---
 @app.post("/generate", response_model=TaskResponse, status_code=202)
-async def request_generation(request: ReasoningRequest, background_tasks: BackgroundTasks):
-    """최종 사용자 요청을 받아 전체 생성 파이프라인을 시작합니다."""
+async def request_generation(request: ReasoningRequest):
+    """
+    최종 사용자 요청을 작업 큐에 넣습니다. 큐가 가득 차면 503, 사용자별 한도를 넘으면 429를 반환합니다.
+    """
+    policy = drift_policy_for(request)
     task_id = f"task_{uuid.uuid4().hex[:8]}"
-    background_tasks.add_task(run_full_pipeline_task, task_id, request.query)
+    enqueued_at = time.perf_counter()
+    position = enqueue_task(
+        task_id, request.user_id,
+        lambda: run_full_pipeline_task(task_id, request.query, enqueued_at, policy, request.user_id)
+    )
     return TaskResponse(
         task_id=task_id,
         status="accepted",
-        message="Task accepted and is processing in the background. Check status at /results/{task_id}"
+        message="Task accepted and queued. Check status at /results/{task_id}",
+        queue_position=position,
+        estimated_wait_s=work_queue.estimated_wait_s(position)
+    )
+
+@app.post("/generate/stream")
+async def request_generation_stream(request: ReasoningRequest):
+    """
+    전체 생성 파이프라인을 실행하고 결과를 Server-Sent Events로 스트리밍합니다.
+    /generate와 같은 작업 큐를 거치므로 큐가 가득 차면 503, 사용자별 한도를 넘으면 429를 반환합니다.
+    이벤트: queued(대기 순번), stage(단계 전환), token(토큰 + Drift 통계), done(최종 결과), error
+    """
+    policy = drift_policy_for(request)
+    task_id = f"task_{uuid.uuid4().hex[:8]}"
+    sink: asyncio.Queue = asyncio.Queue()
+    disconnected = asyncio.Event()
+    position = admit_job(
+        task_id, request.user_id,
+        lambda: _pump_stream(
+            task_id, stream_full_pipeline(task_id, request.query, policy, request.user_id), sink, disconnected
+        )
+    )
+    return StreamingResponse(
+        _relay_stream(task_id, position, sink, disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 @app.get("/results/{task_id}", response_model=ResultResponse)
@@ -160,14 +729,56 @@ async def get_generation_result(task_id: str):
     task = tasks.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    queue_position = estimated_wait_s = None
+    if task["status"] == "queued":
+        # 이 프로세스의 큐에 있으면 현재 순번을, 아니면(다른 워커 프로세스) 접수 시점 값을 반환
+        queue_position = work_queue.position(task_id) or task.get("queue_position")
+        estimated_wait_s = (
+            work_queue.estimated_wait_s(queue_position) if queue_position else task.get("estimated_wait_s")
+        )
     return ResultResponse(
         task_id=task_id, status=task["status"], result=task.get("result"),
-        error_message=task.get("result") if task.get("status") == "failed" else None
+        error_message=task.get("result") if task.get("status") == "failed" else None,
+        timings=task.get("timings"),
+        cache=task.get("cache"),
+        queue_position=queue_position, estimated_wait_s=estimated_wait_s
     )
 
+@app.get("/metrics")
+def get_metrics(format: str = "json"):
+    """
+    단계별 지연, 생성 토큰 수, 재투영 이벤트, 큐 깊이, 캐시 적중률 메트릭을 반환합니다.
+    format=prometheus이면 Prometheus 텍스트 형식으로 반환합니다.
+    """
+    if format == "prometheus":
+        return PlainTextResponse(metrics_registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+    return metrics_registry.snapshot()
+
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "components_loaded": all([glassbox_backend, dl_are_frontend])}
+    ready = components.is_ready()
+    return {
+        "status": "ok" if ready else ("failed" if components.has_failures() else "starting"),
+        "components_loaded": ready,
+        "components": components.status(),
+        "work_queue": work_queue.stats(),
+        "backend_breaker": backend_breaker.stats(),
+        "result_cache": {"gpe": gpe_cache.stats(), "result": result_cache.stats()},
+        "backend_pool": glassbox_backend.stats() if isinstance(glassbox_backend, ReasoningWorkerPool) else None,
+        "remote_backend": glassbox_backend.stats() if isinstance(glassbox_backend, RemoteReasoningBackend) else None,
+        "precision": {
+            "generator": dl_are_frontend.precision if dl_are_frontend is not None else GENERATOR_PRECISION,
+            "evg": dl_are_frontend.evg.precision if dl_are_frontend is not None else EVG_PRECISION,
+            "guard": precision_report,
+        },
+    }
+
+@app.get("/health/ready")
+def readiness_check():
+    """모든 구성 요소가 준비되면 200, 아니면 503 (롤링 배포/오토스케일의 readiness probe용)"""
+    if components.is_ready():
+        return {"ready": True}
+    return JSONResponse(status_code=503, content={"ready": False, "not_ready": components.not_ready()})
 
 # --- 로컬 실행을 위한 코드 ---
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+# 파일명: metrics.py
+import bisect
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (레이블 조합별 누적 버킷 카운트, 합계, 개수)"""
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {} # [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            series_items = [(key, list(series)) for key, series in self._series.items()]
+        result = {}
+        for key, series in series_items:
+            counts, total = series[:-1], series[-1]
+            cumulative, running = {}, 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], counts):
+                running += count
+                cumulative[str(bound)] = running
+            result[_format_labels(key) or "all"] = {"buckets": cumulative, "count": running, "sum": total}
+        return result
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in series_items:
+            running = 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], series[:-1]):
+                running += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', str(bound)),))} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {running}")
+        return lines
+
+
+class Counter:
+    """단조 증가 카운터"""
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {_format_labels(key) or "all": value for key, value in self._values.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines.extend(f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items())
+        return lines
+
+
+class Gauge:
+    """조회 시점에 콜백으로 값을 읽는 게이지 (큐 깊이, 캐시 적중률 등)"""
+    def __init__(self, name: str, description: str, callback: Callable[[], float]):
+        self.name = name
+        self.description = description
+        self.callback = callback
+
+    def value(self) -> float:
+        try:
+            return float(self.callback())
+        except Exception:
+            return float("nan") # 아직 로드되지 않은 컴포넌트 등
+
+    def snapshot(self) -> Any:
+        value = self.value()
+        return None if value != value else value # NaN은 JSON으로 표현할 수 없으므로 None
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge", f"{self.name} {self.value()}"]
+
+
+class MetricsRegistry:
+    """프로세스 내 메트릭 모음. 같은 이름으로 다시 등록하면 기존 메트릭을 반환합니다."""
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, description, buckets))
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._register(name, lambda: Counter(name, description))
+
+    def gauge(self, name: str, description: str, callback: Callable[[], float]) -> Gauge:
+        with self._lock:
+            gauge = self._metrics[name] = Gauge(name, description, callback) # 콜백은 최신 것으로 교체
+            return gauge
+
+    def _register(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON 직렬화 가능한 형태의 전체 메트릭"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render_prometheus(self) -> str:
+        """Prometheus 텍스트 노출 형식"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 프로세스 기본 레지스트리
+registry = MetricsRegistry()
@@ -0,0 +1,110 @@
+# 파일명: precision.py
+import copy
+from typing import Any, Optional, Tuple
+
+import torch
+
+try:
+    from torch.ao.quantization import quantize_dynamic
+except ImportError: # 구버전 torch
+    from torch.quantization import quantize_dynamic
+
+FP32 = "fp32"
+INT8 = "int8" # Linear 레이어 동적 int8 양자화 (CPU 전용)
+BF16 = "bf16" # bfloat16 가중치/연산 (bf16을 가속하는 하드웨어에서만)
+PRECISIONS = (FP32, INT8, BF16)
+
+def configure_threads(num_threads: Optional[int], num_interop_threads: Optional[int] = None):
+    """
+    이 프로세스의 torch 연산 스레드 수를 설정합니다.
+    uvicorn 워커를 여러 개 띄우는 경우 (코어 수 / 워커 수)로 맞추면 스레드 과다 경합을 피할 수 있습니다.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError as e: # 병렬 작업이 이미 시작된 뒤에는 변경 불가
+            print(f"WARNING: interop 스레드 수를 변경할 수 없습니다 ({e}).")
+    print(f"🔹 torch 스레드: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}")
+
+def bf16_supported(device: str = "cpu") -> bool:
+    """장치가 bf16 연산을 가속하는지 확인합니다. (가속이 없으면 에뮬레이션되어 fp32보다 느림)"""
+    if str(device).startswith("cuda"):
+        return torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+    for probe_name in ("_is_avx512_bf16_supported", "_is_amx_tile_supported"):
+        probe = getattr(torch.cpu, probe_name, None)
+        try:
+            if probe is not None and probe():
+                return True
+        except Exception:
+            pass
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+def resolve_precision(precision: str, device: str = "cpu") -> str:
+    """요청한 정밀도를 장치에서 실제로 사용할 정밀도로 결정합니다. 사용할 수 없으면 fp32로 대체합니다."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision} (expected one of {PRECISIONS})")
+    if precision == INT8:
+        if not str(device).startswith("cpu"):
+            print(f"WARNING: int8 동적 양자화는 CPU 전용입니다. {device}에서는 fp32를 사용합니다.")
+            return FP32
+        if not torch.backends.quantized.supported_engines or torch.backends.quantized.supported_engines == ["none"]:
+            print("WARNING: 이 torch 빌드는 양자화 엔진을 지원하지 않습니다. fp32를 사용합니다.")
+            return FP32
+    if precision == BF16 and not bf16_supported(device):
+        print(f"WARNING: {device}가 bf16을 가속하지 않습니다. fp32를 사용합니다.")
+        return FP32
+    return precision
+
+def apply_precision(module: Any, precision: str, device: str = "cpu", inplace: bool = True) -> Tuple[Any, str]:
+    """
+    모듈을 지정한 정밀도로 변환하고 (변환된 모듈, 실제 정밀도)를 반환합니다.
+    - int8: nn.Linear(그리고 GPT-2의 Conv1D를 Linear로 바꾼 것)의 가중치를 int8로 양자화하고
+      활성값은 실행 시점에 동적으로 양자화합니다.
+    - bf16: 모든 파라미터를 bfloat16으로 변환합니다.
+    torch 모듈이 아닌 객체(테스트용 인코더 등)는 그대로 두고 fp32로 보고합니다.
+    """
+    precision = resolve_precision(precision, device)
+    if precision == FP32 or not isinstance(module, torch.nn.Module):
+        return module, FP32
+    if not inplace:
+        module = copy.deepcopy(module)
+
+    if precision == BF16:
+        return module.to(torch.bfloat16), BF16
+
+    _select_quantized_engine()
+    _conv1d_to_linear(module)
+    return quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True), INT8
+
+def _select_quantized_engine():
+    engines = torch.backends.quantized.supported_engines
+    if torch.backends.quantized.engine in engines and torch.backends.quantized.engine != "none":
+        return
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return
+
+def _conv1d_to_linear(module: torch.nn.Module):
+    """
+    GPT-2의 Conv1D(y = x @ W + b, W: [in, out])를 같은 연산의 nn.Linear(W^T)로 바꿉니다.
+    동적 양자화는 nn.Linear만 대상으로 하므로, 바꾸지 않으면 어텐션/MLP가 fp32로 남습니다.
+    """
+    for name, child in module.named_children():
+        weight = getattr(child, "weight", None)
+        if type(child).__name__ == "Conv1D" and isinstance(weight, torch.Tensor) and weight.dim() == 2:
+            in_features, out_features = weight.shape
+            linear = torch.nn.Linear(in_features, out_features, bias=child.bias is not None,
+                                     device=weight.device, dtype=weight.dtype)
+            with torch.no_grad():
+                linear.weight.copy_(weight.t())
+                if child.bias is not None:
+                    linear.bias.copy_(child.bias)
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
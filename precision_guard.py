@@ -0,0 +1,101 @@
+# 파일명: precision_guard.py
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from dl_are_core import DlAreCore, GenerationSession
+
+# 저정밀도 모드를 받아들이는 최소 기준 (fp32 대비)
+MIN_EXPECTATION_COSINE = 0.98   # 기대 벡터 코사인 유사도 최솟값
+MIN_TOKEN_AGREEMENT = 0.9       # 생성 토큰 일치율 평균
+
+# 점검용 (프롬프트, 디코딩된 GPE 데이터) 표본
+GUARD_SAMPLES: List[Tuple[str, Dict[str, Any]]] = [
+    ("Explain how the causal graph links the evidence to the hypothesis.", {
+        "conclusion": "The evidence supports the hypothesis through a causal chain of two relations.",
+        "records": [{"entity": "evidence", "relation": "causes", "target": "latent factor"},
+                    {"entity": "latent factor", "relation": "implies", "target": "hypothesis"}],
+    }),
+    ("Summarize the retrieved context about semantic memory.", {
+        "conclusion": "Semantic memory stores concepts and their relations independent of episodes.",
+        "records": [{"concept": "semantic memory", "property": "context-free"},
+                    {"concept": "episodic memory", "property": "time-bound"}],
+    }),
+    ("What does the knowledge graph say about energy policy?", {
+        "conclusion": "Energy policy decisions depend on cost, reliability and emissions.",
+        "records": [{"entity": "energy policy", "factor": "cost"},
+                    {"entity": "energy policy", "factor": "emissions"}],
+    }),
+    ("Describe the drift between the model state and the reasoning context.", {
+        "conclusion": "", # 결론 없이 레코드만 있는 페이로드
+        "records": [{"signal": "drift", "measure": "cosine similarity"},
+                    {"signal": "reprojection", "measure": "blend toward expectation"}],
+    }),
+]
+
+def token_agreement(reference_ids: Sequence[int], candidate_ids: Sequence[int]) -> float:
+    """같은 위치의 토큰이 일치하는 비율 (길이가 다르면 남는 토큰은 불일치)"""
+    length = max(len(reference_ids), len(candidate_ids))
+    if length == 0:
+        return 1.0
+    return sum(1 for a, b in zip(reference_ids, candidate_ids) if a == b) / length
+
+def _first_divergence(reference_ids: Sequence[int], candidate_ids: Sequence[int]) -> int:
+    for i, (a, b) in enumerate(zip(reference_ids, candidate_ids)):
+        if a != b:
+            return i
+    return min(len(reference_ids), len(candidate_ids))
+
+def _generate_ids(core: DlAreCore, prompt: str, expectation_vector: torch.Tensor,
+                  max_new_tokens: int) -> Tuple[List[int], float]:
+    start = time.perf_counter()
+    ids = [
+        event["token_id"]
+        for event in core.stream_controlled_text(prompt, max_new_tokens, session=GenerationSession(expectation_vector))
+        if event["type"] == "token"
+    ]
+    return ids, time.perf_counter() - start
+
+def compare_precision(reference: DlAreCore, candidate: DlAreCore,
+                      samples: Sequence[Tuple[str, Dict[str, Any]]] = GUARD_SAMPLES, max_new_tokens: int = 20,
+                      min_cosine: float = MIN_EXPECTATION_COSINE,
+                      min_token_agreement: float = MIN_TOKEN_AGREEMENT) -> Dict[str, Any]:
+    """
+    fp32 기준 엔진(reference)과 저정밀도 엔진(candidate)을 같은 표본으로 실행하여 정확도 손실을 측정합니다.
+    - expectation_cosine: 같은 GPE 데이터로 만든 기대 벡터의 코사인 유사도 (EVG 정밀도 영향)
+    - token_agreement: 각자의 기대 벡터로 Drift-Loop 생성한 토큰의 위치별 일치율 (종단간 영향)
+    - speedup: 같은 생성의 기준 대비 속도 비율
+    passed는 최소 코사인과 평균 토큰 일치율이 기준 이상인지 여부입니다.
+    """
+    cosines: List[float] = []
+    agreements: List[float] = []
+    divergences: List[int] = []
+    reference_time = candidate_time = 0.0
+    with torch.no_grad():
+        for prompt, decoded_data in samples:
+            reference_vector = reference.evg.build_from_decoded_gpe(decoded_data)
+            candidate_vector = candidate.evg.build_from_decoded_gpe(decoded_data)
+            cosines.append(F.cosine_similarity(reference_vector.float(), candidate_vector.float(), dim=0).item())
+
+            reference_ids, elapsed = _generate_ids(reference, prompt, reference_vector, max_new_tokens)
+            reference_time += elapsed
+            candidate_ids, elapsed = _generate_ids(candidate, prompt, candidate_vector, max_new_tokens)
+            candidate_time += elapsed
+            agreements.append(token_agreement(reference_ids, candidate_ids))
+            divergences.append(_first_divergence(reference_ids, candidate_ids))
+
+    mean_agreement = sum(agreements) / len(agreements) if agreements else 1.0
+    min_cos = min(cosines) if cosines else 1.0
+    return {
+        "generator_precision": candidate.precision,
+        "evg_precision": candidate.evg.precision,
+        "samples": len(samples),
+        "expectation_cosine": {"mean": sum(cosines) / len(cosines) if cosines else 1.0, "min": min_cos},
+        "token_agreement": {"mean": mean_agreement, "min": min(agreements) if agreements else 1.0},
+        "mean_first_divergence": sum(divergences) / len(divergences) if divergences else 0.0,
+        "speedup": reference_time / candidate_time if candidate_time > 0 else None,
+        "thresholds": {"min_cosine": min_cosine, "min_token_agreement": min_token_agreement},
+        "passed": min_cos >= min_cosine and mean_agreement >= min_token_agreement,
+    }
@@ -1,6 +1,6 @@
 # 파일명: reasoning_engine.py
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from gpe_encoder import GpeEncoder
 
@@ -9,20 +9,34 @@ class MockHybridReasoningEngine:
     GlassBox의 추론 과정을 모사하는 엔진.
     결과를 GPE로 인코딩합니다.
     """
-    def __init__(self):
+    def __init__(self, load_delay: float = 2.0, reasoning_delay: float = 1.5):
         self.gpe_encoder = GpeEncoder()
+        self.reasoning_delay = reasoning_delay
         # 실제로는 여기에 무거운 모델(GNN, KG 등)이 로드됩니다.
-        time.sleep(2) # 모델 로딩 시간 모사
+        time.sleep(load_delay) # 모델 로딩 시간 모사
 
-    def reason(self, query: str) -> Dict[str, Any]:
+    def reason(self, query: str, wire_format: str = "json", codec: Optional[str] = None) -> Dict[str, Any] | bytes:
         """
         쿼리를 분석하고, 구조화된 결과를 생성한 뒤 GPE로 인코딩합니다.
+        wire_format="binary"이면 JSON 봉투 대신 바이너리 프레임 바이트열을 반환합니다.
         """
         # 1. 추론 과정 모사
-        time.sleep(1.5) # 실제 추론 시간 모사
+        time.sleep(self.reasoning_delay) # 실제 추론 시간 모사
+        
+        # 2. 구조적 데이터 생성
+        reasoning_result = self.build_reasoning_result(query)
+        
+        # 3. GPE 인코딩
+        if wire_format == "binary":
+            return self.gpe_encoder.encode_binary(reasoning_result, codec=codec)
+        gpe_payload = self.gpe_encoder.encode(reasoning_result)
+        return gpe_payload
+
+    def build_reasoning_result(self, query: str) -> Dict[str, Any]:
+        """추론 결과(인코딩 전 구조적 데이터)를 생성합니다."""
         related_concepts = query.split()
         
-        # 2. 구조적 데이터 생성 (GPE 테스트용)
+        # GPE 테스트용 반복 데이터
         num_records = len(query) # 쿼리 길이에 따라 반복 횟수 결정
         reasoning_result = {
             "conclusion": f"Query '{query}' involves {len(related_concepts)} concepts.",
@@ -31,7 +45,4 @@ class MockHybridReasoningEngine:
                 for i, concept in enumerate(related_concepts)
             ] * (num_records // len(related_concepts) + 1) # 반복 데이터 생성
         }
-        
-        # 3. GPE 인코딩
-        gpe_payload = self.gpe_encoder.encode(reasoning_result)
-        return gpe_payload
+        return reasoning_result
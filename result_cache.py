@@ -0,0 +1,89 @@
+# 파일명: result_cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+CACHE_HIT = "hit"             # 캐시에 저장된 결과를 사용
+CACHE_COALESCED = "coalesced" # 동시에 실행 중이던 같은 키의 계산 결과를 공유
+CACHE_MISS = "miss"           # 직접 계산
+
+class ResultCache:
+    """
+    키 기반 결과 캐시 (LRU + TTL)와 단일 실행(single-flight) 합치기.
+    같은 키의 요청이 동시에 들어오면 첫 요청만 계산하고 나머지는 그 결과를 기다려 공유합니다.
+    asyncio 이벤트 루프 안에서만 사용하므로 별도의 잠금을 두지 않습니다.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict() # key -> (value, stored_at)
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._counters = {CACHE_HIT: 0, CACHE_COALESCED: 0, CACHE_MISS: 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    async def get_or_compute(self, key: Hashable, factory: Callable[[], Awaitable[Any]],
+                             cacheable: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, str]:
+        """
+        캐시된 값 또는 계산 결과를 (값, 출처)로 반환합니다. 출처는 CACHE_HIT/CACHE_COALESCED/CACHE_MISS.
+        cacheable(value)가 False인 결과(폴백 응답 등)는 대기 중인 요청과 공유하되 저장하지 않습니다.
+        계산이 예외로 끝나면 같은 키를 기다리던 요청들에도 같은 예외가 전달됩니다.
+        계산은 처음 요청한 쪽과 분리된 태스크에서 실행되므로, 그 요청이 취소되어도(스트리밍 연결 종료 등)
+        계산은 끝까지 진행되어 나머지 대기 요청과 캐시에 결과를 남깁니다.
+        """
+        value = self.get(key)
+        if value is not None:
+            self._counters[CACHE_HIT] += 1
+            return value, CACHE_HIT
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self._counters[CACHE_COALESCED] += 1
+            # shield: 대기 중인 요청이 취소되어도 공유 중인 계산은 취소되지 않음
+            return await asyncio.shield(in_flight), CACHE_COALESCED
+
+        self._counters[CACHE_MISS] += 1
+        task = asyncio.ensure_future(factory())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t, cacheable))
+        return await asyncio.shield(task), CACHE_MISS
+
+    def _finish(self, key: Hashable, task: "asyncio.Future", cacheable: Optional[Callable[[Any], bool]]):
+        """계산 태스크 완료 콜백: 실행 중 목록에서 빼고, 저장 가능한 결과는 캐시에 넣습니다."""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # 기다리는 요청이 모두 떠났어도 'exception was never retrieved' 경고가 나지 않도록 예외를 소비
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if cacheable is None or cacheable(value):
+            self.put(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters[CACHE_HIT] + self._counters[CACHE_COALESCED] + self._counters[CACHE_MISS]
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            **self._counters,
+            "hit_rate": (self._counters[CACHE_HIT] + self._counters[CACHE_COALESCED]) / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,161 @@
+# 파일명: task_store.py
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class TaskStore(ABC):
+    """
+    작업 상태/결과 저장소 인터페이스.
+    모든 구현은 TTL과 최대 항목 수 기준으로 오래된 작업을 제거합니다.
+    """
+    def __init__(self, ttl_seconds: float = 3600.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """작업 레코드를 반환합니다. 없거나 만료된 경우 None."""
+
+    @abstractmethod
+    def set(self, task_id: str, record: Dict[str, Any]):
+        """작업 레코드를 저장(덮어쓰기)합니다."""
+
+    @abstractmethod
+    def delete(self, task_id: str):
+        """작업 레코드를 삭제합니다."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """현재 저장된 작업 수"""
+
+    def update(self, task_id: str, **fields: Any):
+        """기존 레코드의 일부 필드만 갱신합니다. 레코드가 없으면 새로 만듭니다."""
+        record = self.get(task_id) or {}
+        record.update(fields)
+        self.set(task_id, record)
+
+    @staticmethod
+    def _serialize(record: Dict[str, Any]) -> str:
+        """공백 없는 compact JSON으로 직렬화합니다."""
+        return json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class InMemoryTaskStore(TaskStore):
+    """단일 프로세스용 저장소. 레코드는 compact JSON 문자열로 보관합니다."""
+    def __init__(self, ttl_seconds: float = 3600.0, max_entries: int = 10000):
+        super().__init__(ttl_seconds, max_entries)
+        self._records: "OrderedDict[str, Tuple[str, float]]" = OrderedDict() # task_id -> (json, updated_at)
+        self._lock = threading.Lock()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._records.get(task_id)
+            if entry is None:
+                return None
+            data, updated_at = entry
+            if time.time() - updated_at > self.ttl_seconds:
+                del self._records[task_id]
+                return None
+            return json.loads(data)
+
+    def set(self, task_id: str, record: Dict[str, Any]):
+        data = self._serialize(record)
+        now = time.time()
+        with self._lock:
+            self._records.pop(task_id, None)
+            self._records[task_id] = (data, now)
+            self._evict(now)
+
+    def delete(self, task_id: str):
+        with self._lock:
+            self._records.pop(task_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def _evict(self, now: float):
+        # 레코드는 갱신 순서로 정렬되어 있으므로 앞쪽부터 만료/초과분을 제거
+        while self._records:
+            oldest_id, (_, updated_at) = next(iter(self._records.items()))
+            if len(self._records) > self.max_entries or now - updated_at > self.ttl_seconds:
+                del self._records[oldest_id]
+            else:
+                break
+
+
+class SqliteTaskStore(TaskStore):
+    """
+    SQLite(WAL 모드) 파일 기반 저장소.
+    같은 호스트의 여러 uvicorn 워커가 하나의 파일을 공유하므로 어느 워커에서든 결과를 조회할 수 있습니다.
+    """
+    def __init__(self, path: str = "cga_tasks.db", ttl_seconds: float = 3600.0, max_entries: int = 10000,
+                 evict_interval: int = 100):
+        super().__init__(ttl_seconds, max_entries)
+        self.path = path
+        self.evict_interval = evict_interval
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " task_id TEXT PRIMARY KEY, record TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드 간에 공유하지 않고 스레드마다 하나씩 사용
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT record, updated_at FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def set(self, task_id: str, record: Dict[str, Any]):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO tasks (task_id, record, updated_at) VALUES (?, ?, ?)",
+            (task_id, self._serialize(record), time.time()),
+        )
+        self._writes += 1
+        if self._writes % self.evict_interval == 0:
+            self._evict(conn)
+
+    def delete(self, task_id: str):
+        self._connection().execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection):
+        """만료된 레코드와 max_entries를 초과하는 오래된 레코드를 삭제합니다."""
+        conn.execute("DELETE FROM tasks WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM tasks WHERE task_id IN ("
+            " SELECT task_id FROM tasks ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+def create_task_store(backend: str = "memory", **kwargs: Any) -> TaskStore:
+    """설정 문자열("memory" 또는 "sqlite")로 작업 저장소를 생성합니다."""
+    if backend == "memory":
+        kwargs.pop("path", None)
+        return InMemoryTaskStore(**kwargs)
+    if backend == "sqlite":
+        return SqliteTaskStore(**kwargs)
+    raise ValueError(f"Unknown task store backend: {backend}")
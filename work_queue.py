@@ -0,0 +1,168 @@
+# 파일명: work_queue.py
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+ANONYMOUS_USER = "anonymous"
+
+class QueueRejectedError(Exception):
+    """부하 차단으로 작업이 거부되었을 때 발생합니다. status_code는 그대로 HTTP 응답 코드(429/503)로 사용합니다."""
+    def __init__(self, message: str, status_code: int, retry_after_s: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after_s = retry_after_s
+
+def parse_user_priorities(spec: str) -> Dict[str, int]:
+    """'alice:0,bob:2' 형식의 설정 문자열을 {user_id: 우선순위}로 변환합니다. (작을수록 먼저 처리)"""
+    priorities: Dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        user_id, _, priority = item.rpartition(":")
+        if not user_id:
+            raise ValueError(f"Invalid user priority entry: '{item}' (expected 'user_id:priority')")
+        priorities[user_id] = int(priority)
+    return priorities
+
+
+class PriorityWorkQueue:
+    """
+    크기가 제한된 비동기 우선순위 작업 큐와 고정 크기 워커 풀.
+    - 처리 순서: (사용자 우선순위, 넣을 당시 해당 사용자의 대기 작업 수, 도착 순서)
+      같은 우선순위 안에서는 사용자별로 번갈아 처리되므로 한 사용자가 큐를 독점하지 못합니다.
+    - 부하 차단: 사용자별 대기 한도를 넘으면 429, 전체 큐가 가득 차면 503으로 거부합니다.
+    - 대기 시간 추정: 최근 작업 처리 시간의 EMA와 앞선 작업 수로 계산합니다.
+    - 작업이 처리되지 않은 예외(작업 내부의 취소 포함)로 끝나면 on_job_failed(task_id, 메시지)로 알리고
+      워커는 계속 동작합니다. 워커는 stop()으로만 종료됩니다.
+    """
+    def __init__(self, num_workers: int = 4, max_depth: int = 64, max_per_user: int = 16,
+                 user_priorities: Optional[Dict[str, int]] = None, default_priority: int = 1,
+                 initial_service_s: float = 1.0, on_job_failed: Optional[Callable[[str, str], None]] = None):
+        self.num_workers = num_workers
+        self.max_depth = max_depth
+        self.max_per_user = max_per_user
+        self.user_priorities = user_priorities or {}
+        self.default_priority = default_priority
+        self.on_job_failed = on_job_failed
+
+        self._heap: List[Tuple[Tuple[int, int, int], str, str, Callable[[], Awaitable[Any]]]] = []
+        self._queued_keys: Dict[str, Tuple[int, int, int]] = {} # task_id -> 정렬 키
+        self._user_pending: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._available: asyncio.Semaphore | None = None
+        self._workers: List[asyncio.Task] = []
+        self._stopping = False
+        self._busy = 0
+        self._avg_service_s = initial_service_s
+        self._rejected = {429: 0, 503: 0}
+        self._failed_jobs = 0
+
+    def priority_for(self, user_id: str) -> int:
+        return self.user_priorities.get(user_id, self.default_priority)
+
+    def start(self):
+        """워커 태스크를 시작합니다. 실행 중인 이벤트 루프 안에서 호출해야 합니다."""
+        if self._workers:
+            return
+        self._stopping = False
+        self._available = asyncio.Semaphore(len(self._heap))
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+        print(f"✅ [WorkQueue] 워커 {self.num_workers}개 시작 (max_depth={self.max_depth}, max_per_user={self.max_per_user})")
+
+    async def stop(self):
+        """워커를 취소합니다. 아직 시작하지 않은 대기 작업은 버려집니다."""
+        workers, self._workers = self._workers, []
+        self._stopping = True # 이후의 CancelledError는 워커 종료 요청
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def submit(self, task_id: str, job: Callable[[], Awaitable[Any]], user_id: Optional[str] = None) -> int:
+        """
+        작업(코루틴 팩토리)을 큐에 넣고 1부터 시작하는 대기 순번을 반환합니다.
+        받아들일 수 없으면 QueueRejectedError를 발생시킵니다.
+        """
+        user = user_id or ANONYMOUS_USER
+        if not self._workers:
+            raise QueueRejectedError("Work queue is not running.", 503, 1.0)
+        if len(self._heap) >= self.max_depth:
+            self._rejected[503] += 1
+            raise QueueRejectedError(
+                "Server is overloaded: the work queue is full.", 503, self.estimated_wait_s(len(self._heap) + 1)
+            )
+        pending = self._user_pending.get(user, 0)
+        if pending >= self.max_per_user:
+            self._rejected[429] += 1
+            raise QueueRejectedError(
+                f"Too many queued requests for user '{user}' (limit {self.max_per_user}).", 429,
+                self.estimated_wait_s(len(self._heap) + 1)
+            )
+
+        key = (self.priority_for(user), pending, next(self._sequence))
+        self._user_pending[user] = pending + 1
+        self._queued_keys[task_id] = key
+        heapq.heappush(self._heap, (key, task_id, user, job))
+        self._available.release()
+        return self.position(task_id)
+
+    def position(self, task_id: str) -> Optional[int]:
+        """대기 중인 작업의 순번(1부터). 이미 실행 중이거나 알 수 없는 작업이면 None."""
+        key = self._queued_keys.get(task_id)
+        if key is None:
+            return None
+        return 1 + sum(1 for entry in self._heap if entry[0] < key)
+
+    def estimated_wait_s(self, position: int) -> float:
+        """주어진 순번의 작업이 워커를 얻기까지의 예상 대기 시간(초)"""
+        jobs_ahead = position - 1 + self._busy
+        if jobs_ahead < self.num_workers:
+            return 0.0
+        rounds = math.ceil((jobs_ahead - self.num_workers + 1) / self.num_workers)
+        return rounds * self._avg_service_s
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._heap),
+            "busy_workers": self._busy,
+            "num_workers": self.num_workers,
+            "avg_service_s": self._avg_service_s,
+            "rejected_429": self._rejected[429],
+            "rejected_503": self._rejected[503],
+            "failed_jobs": self._failed_jobs,
+        }
+
+    async def _worker(self):
+        while True:
+            await self._available.acquire()
+            _, task_id, user, job = heapq.heappop(self._heap)
+            del self._queued_keys[task_id]
+            self._user_pending[user] -= 1
+            if self._user_pending[user] == 0:
+                del self._user_pending[user]
+
+            self._busy += 1
+            start = time.perf_counter()
+            try:
+                await job()
+            except asyncio.CancelledError:
+                if self._stopping:
+                    raise
+                # 작업 내부에서 전파된 취소(공유 중인 계산의 취소 등): 작업만 실패로 기록하고 워커는 유지
+                self._job_failed(task_id, "Task was cancelled.")
+            except Exception as e:
+                # 작업 함수가 스스로 실패 상태를 기록하지 못한 경우에도 워커는 계속 동작
+                self._job_failed(task_id, f"Unhandled error: {e}")
+            finally:
+                self._busy -= 1
+                self._avg_service_s = 0.8 * self._avg_service_s + 0.2 * (time.perf_counter() - start)
+
+    def _job_failed(self, task_id: str, message: str):
+        self._failed_jobs += 1
+        print(f"❌ [WorkQueue] 작업 {task_id} 실행 중 처리되지 않은 예외: {message}")
+        if self.on_job_failed is None:
+            return
+        try:
+            self.on_job_failed(task_id, message)
+        except Exception as e:
+            print(f"❌ [WorkQueue] 작업 {task_id}의 실패 상태 기록 실패: {e}")